@@ -1,15 +1,53 @@
 from django.contrib import admin
-from .models import AssistantMemory
+from django.db import transaction
+from .models import AssistantMemory, KnowledgeBaseState, KnowledgeDocument
+from .services.vector_index import record_write
 
 
 @admin.register(AssistantMemory)
 class AssistantMemoryAdmin(admin.ModelAdmin):
-    list_display = ('id', 'type', 'content_preview', 'created_at')
-    list_filter = ('type', 'created_at')
-    search_fields = ('content',)
+    list_display = ('id', 'type', 'role', 'conversation_id', 'content_preview', 'created_at')
+    list_filter = ('type', 'role', 'embedding_model', 'created_at')
+    search_fields = ('content', 'conversation_id')
     readonly_fields = ('created_at',)
     
     def content_preview(self, obj):
         return obj.content[:100] + '...' if len(obj.content) > 100 else obj.content
     content_preview.short_description = 'Content'
+    
+    def delete_model(self, request, obj):
+        # Other workers drop the deleted rows from their in-process vector index
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            record_write([obj.type], rebuild=True)
+    
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            memory_types = set(queryset.values_list('type', flat=True))
+            super().delete_queryset(request, queryset)
+            record_write(memory_types, rebuild=True)
+
+
+
+@admin.register(KnowledgeDocument)
+class KnowledgeDocumentAdmin(admin.ModelAdmin):
+    list_display = ('source', 'chunk_count', 'token_count', 'size_bytes', 'ingested_at')
+    search_fields = ('source',)
+    readonly_fields = ('content_hash', 'ingested_at')
+    
+    def delete_model(self, request, obj):
+        # Deleting a document deletes its chunks
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            record_write(['knowledge'], rebuild=True)
+    
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            super().delete_queryset(request, queryset)
+            record_write(['knowledge'], rebuild=True)
+
 
+@admin.register(KnowledgeBaseState)
+class KnowledgeBaseStateAdmin(admin.ModelAdmin):
+    list_display = ('version', 'chunk_count', 'embedding_model', 'status', 'ingest_started_at', 'updated_at')
+    readonly_fields = ('updated_at',)
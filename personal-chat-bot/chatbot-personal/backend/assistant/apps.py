@@ -5,3 +5,9 @@ class AssistantConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'assistant'
 
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from assistant.services.metrics import install_query_counter
+        
+        # Per-request query counts (Server-Timing `db` entry, see services/metrics.py)
+        connection_created.connect(install_query_counter, dispatch_uid='assistant_query_counter')
@@ -0,0 +1,10 @@
+"""
+Offline benchmark suite (run with `python manage.py benchmark`).
+
+Everything runs without network access: the OpenAI client is pointed at a
+local stub server (stub_server.py) that returns deterministic embeddings and
+canned completions after a configurable delay, and the knowledge base is
+filled with synthetic corpora (corpus.py) in a throwaway test database.
+runner.py times the pipeline and writes JSON results that can be compared
+between commits.
+"""
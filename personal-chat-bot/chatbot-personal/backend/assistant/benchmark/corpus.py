@@ -0,0 +1,112 @@
+"""
+Synthetic knowledge corpora for the benchmarks.
+
+Rows are random sequences of CV vocabulary. Their embeddings are computed
+locally with the stub server's word vectors (one matrix product per batch),
+so a 1M-row corpus needs no embedding requests and matches what the stub
+returns for the same text. With a local embedding provider
+(EMBEDDING_PROVIDER=hashing) the provider embeds the rows itself.
+"""
+import numpy as np
+from django.conf import settings
+from assistant.models import AssistantMemory
+from assistant.services.embedding_providers import get_provider
+from assistant.services.embeddings import embedding_fields
+from assistant.services.pgvector_search import store_vectors
+from assistant.services.vector_index import record_write
+from assistant.benchmark.stub_server import word_vector
+
+VOCABULARY = (
+    "python django flask fastapi rest api graphql postgresql mysql sqlite redis celery rabbitmq kafka docker "
+    "kubernetes helm terraform aws gcp azure lambda s3 linux bash git github gitlab ci cd pipeline testing "
+    "pytest unittest integration deployment monitoring logging prometheus grafana nginx gunicorn uvicorn asgi "
+    "wsgi async concurrency caching indexing search embeddings vector retrieval llm openai prompt chatbot "
+    "assistant machine learning model training inference pandas numpy scipy sklearn pytorch tensorflow data "
+    "analysis etl warehouse dashboard react javascript typescript html css frontend backend fullstack mobile "
+    "android kotlin java spring microservices architecture design patterns refactoring performance profiling "
+    "optimization latency throughput scalability reliability security authentication oauth jwt encryption "
+    "university bachelor master degree computer science engineering mathematics statistics thesis research "
+    "internship developer engineer senior junior lead team mentoring agile scrum kanban jira product client "
+    "startup company project portfolio open source contributor hackathon award certificate course language "
+    "english german albanian communication leadership collaboration problem solving ownership delivery "
+    "migration database schema query transaction replication backup automation scripting scheduling reporting"
+).split()
+
+
+def vocabulary_matrix(dimensions: int) -> np.ndarray:
+    """
+    Word vectors of the vocabulary, one row per word.
+    """
+    return np.stack([word_vector(word, dimensions) for word in VOCABULARY])
+
+
+def random_texts(rng: np.random.Generator, count: int, words: int = 24) -> tuple:
+    """
+    Random vocabulary texts.
+
+    Returns:
+        Tuple of (texts, word id matrix of shape (count, words))
+    """
+    ids = rng.integers(0, len(VOCABULARY), size=(count, words))
+    texts = [' '.join(VOCABULARY[word_id] for word_id in row) for row in ids]
+    return texts, ids
+
+
+def embed_texts(ids: np.ndarray, vocabulary: np.ndarray) -> np.ndarray:
+    """
+    Stub embeddings of random_texts() rows (normalized sums of their word vectors).
+    """
+    counts = np.zeros((ids.shape[0], vocabulary.shape[0]), dtype=np.float32)
+    np.add.at(counts, (np.repeat(np.arange(ids.shape[0]), ids.shape[1]), ids.ravel()), 1)
+    vectors = counts @ vocabulary
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def corpus_embeddings(texts: list, ids: np.ndarray, vocabulary: np.ndarray = None) -> list:
+    """
+    Embeddings of random_texts() rows as the active embedding provider returns them
+    (the stub server's vectors for the OpenAI provider).
+    """
+    provider = get_provider()
+    if not provider.remote:
+        return provider.embed(texts)
+    if vocabulary is None:
+        vocabulary = vocabulary_matrix(provider.dimensions)
+    return list(embed_texts(ids, vocabulary))
+
+
+def create_corpus(size: int, seed: int = 0, batch_size: int = 2000, dimensions: int = None) -> int:
+    """
+    Grow the synthetic knowledge corpus to `size` rows (rows already present are kept).
+
+    Args:
+        size: Number of synthetic knowledge rows wanted
+        seed: Random seed (the corpus for a seed is always the same)
+        batch_size: Rows per bulk insert
+        dimensions: Stub embedding dimensions (default settings.EMBEDDING_DIMENSIONS;
+            ignored by local embedding providers)
+
+    Returns:
+        Number of rows inserted
+    """
+    dimensions = dimensions or settings.EMBEDDING_DIMENSIONS
+    vocabulary = vocabulary_matrix(dimensions) if get_provider().remote else None
+    existing = AssistantMemory.objects.filter(
+        type='knowledge', document__isnull=True, embedding_model=get_provider().name
+    ).count()
+    # Seeded per batch, so the same seed and sizes always give the same corpus
+    inserted = 0
+    for start in range(existing, size, batch_size):
+        count = min(batch_size, size - start)
+        rng = np.random.default_rng([seed, start])
+        texts, ids = random_texts(rng, count)
+        vectors = corpus_embeddings(texts, ids, vocabulary)
+        memories = AssistantMemory.objects.bulk_create([
+            AssistantMemory(content=text, **embedding_fields(vector), type='knowledge')
+            for text, vector in zip(texts, vectors)
+        ])
+        store_vectors(memories)
+        record_write(['knowledge'])
+        inserted += count
+    return inserted
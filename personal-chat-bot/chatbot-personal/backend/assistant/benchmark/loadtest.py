@@ -0,0 +1,216 @@
+"""
+Concurrent load generator for the chat API.
+
+Virtual users are started one by one over the ramp-up period and then loop
+until the test ends. Each one has its own HTTP client (and so its own
+session cookie and conversation) and picks its next request from the
+endpoint mix: POST /api/chat/, GET /api/chat/history/ or GET /api/memory/.
+Chat questions come from a question list; a share of them is made unique
+so the semantic response cache does not answer everything.
+
+Every request records its latency, status and the database query count
+from the `db` entry of its Server-Timing header. The report has throughput,
+latency percentiles, error rate and queries per request for each endpoint,
+plus latency by the number of users active when the request was sent, which
+shows the concurrency at which p99 starts to climb.
+"""
+import re
+import threading
+import time
+import httpx
+import numpy as np
+from assistant.benchmark.corpus import VOCABULARY
+
+ENDPOINTS = {
+    'chat': ('POST', '/api/chat/'),
+    'history': ('GET', '/api/chat/history/'),
+    'memory': ('GET', '/api/memory/'),
+}
+
+DEFAULT_QUESTIONS = [
+    "What is your experience?",
+    "What programming languages do you know?",
+    "Tell me about your education.",
+    "Which projects have you worked on?",
+    "What do you know about Django?",
+    "Have you used PostgreSQL in production?",
+    "What is your strongest technical skill?",
+    "Describe your most recent role.",
+    "Do you have machine learning experience?",
+    "Which languages do you speak?",
+    "What kind of team do you like to work in?",
+    "Have you built REST APIs?",
+]
+
+DB_TIMING = re.compile(r'(?:^|,)\s*db;[^,]*desc="(\d+) queries"')
+
+
+def parse_mix(mix: str) -> dict:
+    """
+    Parse an endpoint mix such as 'chat=6,history=3,memory=1' into normalized weights.
+    """
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}' (expected one of {', '.join(ENDPOINTS)})")
+        weights[name] = float(weight or 1)
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("The endpoint mix needs a positive weight")
+    return {name: weight / total for name, weight in weights.items()}
+
+
+def db_queries(server_timing: str):
+    """
+    Query count from a Server-Timing header (None if the server did not report it).
+    """
+    match = DB_TIMING.search(server_timing or '')
+    return int(match.group(1)) if match else None
+
+
+def _percentiles(values: list) -> dict:
+    if not values:
+        return {}
+    p50, p95, p99 = np.percentile(np.asarray(values) * 1000, [50, 95, 99]).tolist()
+    return {'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99, 'max_ms': max(values) * 1000}
+
+
+class LoadTest:
+    """
+    One load test run against a running server.
+    """
+
+    def __init__(self, base_url: str, concurrency: int = 10, duration: float = 60, ramp_up: float = 10,
+                 mix: dict = None, questions: list = None, unique_ratio: float = 0.5, think_time: float = 0.0,
+                 timeout: float = 60, seed: int = 0):
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = concurrency
+        self.duration = duration
+        self.ramp_up = min(ramp_up, duration)
+        self.mix = mix or parse_mix('chat=6,history=3,memory=1')
+        self.questions = questions or DEFAULT_QUESTIONS
+        self.unique_ratio = unique_ratio
+        self.think_time = think_time
+        self.timeout = timeout
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._active = 0
+        self.samples = []  # (endpoint, started offset, seconds, status, queries, active users)
+
+    def _question(self, rng: np.random.Generator) -> str:
+        question = self.questions[rng.integers(len(self.questions))]
+        if rng.random() < self.unique_ratio:
+            words = ' '.join(VOCABULARY[i] for i in rng.integers(0, len(VOCABULARY), size=4))
+            question = f"{question} Especially regarding {words}."
+        return question
+
+    def _user(self, user_id: int, started: float, deadline: float):
+        rng = np.random.default_rng([self.seed, user_id])
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+
+        with httpx.Client(base_url=self.base_url, timeout=self.timeout) as client:
+            with self._lock:
+                self._active += 1
+            try:
+                while time.perf_counter() < deadline:
+                    endpoint = names[rng.choice(len(names), p=weights)]
+                    method, path = ENDPOINTS[endpoint]
+                    with self._lock:
+                        active = self._active
+                    sent = time.perf_counter()
+                    try:
+                        if method == 'POST':
+                            response = client.post(path, json={'message': self._question(rng)})
+                        else:
+                            response = client.get(path, params={'limit': 20})
+                        status = response.status_code
+                        queries = db_queries(response.headers.get('Server-Timing'))
+                    except httpx.HTTPError:
+                        status, queries = 0, None
+                    elapsed = time.perf_counter() - sent
+                    with self._lock:
+                        self.samples.append((endpoint, sent - started, elapsed, status, queries, active))
+                    if self.think_time:
+                        time.sleep(rng.exponential(self.think_time))
+            finally:
+                with self._lock:
+                    self._active -= 1
+
+    def run(self) -> dict:
+        """
+        Run the test and return the report (see report()).
+        """
+        started = time.perf_counter()
+        deadline = started + self.duration
+        threads = []
+        for user_id in range(self.concurrency):
+            # Start users evenly spread over the ramp-up period
+            start_at = started + (self.ramp_up * user_id / self.concurrency if self.concurrency > 1 else 0)
+            delay = start_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            thread = threading.Thread(target=self._user, args=(user_id, started, deadline), daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed: float) -> dict:
+        """
+        Summarize the samples per endpoint and per concurrency level.
+
+        Returns:
+            Dictionary with 'parameters', 'elapsed_seconds', 'endpoints'
+            (requests, throughput_rps, error_rate, latency percentiles and
+            db_queries_mean / db_queries_max per endpoint and 'all') and
+            'concurrency' (latency percentiles by active users)
+        """
+        def summarize(samples):
+            latencies = [sample[2] for sample in samples]
+            errors = sum(1 for sample in samples if not 200 <= sample[3] < 300)
+            queries = [sample[4] for sample in samples if sample[4] is not None]
+            return {
+                'requests': len(samples),
+                'throughput_rps': len(samples) / elapsed if elapsed else 0.0,
+                'error_rate': errors / len(samples) if samples else 0.0,
+                **_percentiles(latencies),
+                'db_queries_mean': float(np.mean(queries)) if queries else None,
+                'db_queries_max': max(queries) if queries else None,
+            }
+
+        endpoints = {name: summarize([s for s in self.samples if s[0] == name]) for name in self.mix}
+        endpoints['all'] = summarize(self.samples)
+
+        # Latency by concurrency level, in power-of-two buckets of active users
+        levels = {}
+        for sample in self.samples:
+            level = 1 << max(0, int(sample[5]).bit_length() - 1)
+            levels.setdefault(level, []).append(sample)
+        concurrency = {
+            f"{level}-{min(level * 2 - 1, self.concurrency)}": {
+                'requests': len(samples),
+                'error_rate': sum(1 for s in samples if not 200 <= s[3] < 300) / len(samples),
+                **_percentiles([s[2] for s in samples]),
+            }
+            for level, samples in sorted(levels.items())
+        }
+
+        return {
+            'parameters': {
+                'base_url': self.base_url,
+                'concurrency': self.concurrency,
+                'duration': self.duration,
+                'ramp_up': self.ramp_up,
+                'mix': self.mix,
+                'unique_ratio': self.unique_ratio,
+                'think_time': self.think_time,
+                'questions': len(self.questions),
+            },
+            'elapsed_seconds': elapsed,
+            'endpoints': endpoints,
+            'concurrency': concurrency,
+        }
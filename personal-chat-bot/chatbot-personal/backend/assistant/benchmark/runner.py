@@ -0,0 +1,254 @@
+"""
+Benchmarks of the chat pipeline against the stub server and synthetic corpora.
+
+Timed operations:
+
+- chunk_text over a large document (the resume repeated)
+- ingest_resume from an empty knowledge base with cold embedding caches
+- per corpus size: the first search (index build), search_similar_memories
+  with precomputed query embeddings, get_relevant_context (query embedding
+  through the stub, vector and full-text search) and POST /api/chat/ end to
+  end, with the per-stage breakdown from services/metrics.py
+
+Results are plain dictionaries of millisecond statistics so two runs can be
+diffed with compare_results().
+"""
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+import django
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from assistant.models import AssistantMemory, EmbeddingCacheEntry, KnowledgeDocument
+from assistant.services.chunking import chunk_text
+from assistant.services.embedding_cache import embedding_cache
+from assistant.services.embedding_providers import get_provider
+from assistant.services.ingest_resume import get_resume_path, ingest_resume
+from assistant.services.knowledge_base import record_ingestion
+from assistant.services.memory_writer import memory_writer
+from assistant.services.metrics import registry
+from assistant.services.response_cache import response_cache
+from assistant.services.vector_index import invalidate_index
+from assistant.services.vector_search import get_relevant_context, search_similar_memories
+from assistant.benchmark.corpus import corpus_embeddings, create_corpus, random_texts
+
+RESULTS_FORMAT_VERSION = 1
+
+
+def timing_stats(samples: list) -> dict:
+    """
+    Summarize durations in seconds as millisecond statistics.
+    """
+    values = np.asarray(samples, dtype=np.float64) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]).tolist()
+    return {
+        'count': len(values),
+        'mean_ms': float(values.mean()),
+        'p50_ms': p50,
+        'p95_ms': p95,
+        'p99_ms': p99,
+        'min_ms': float(values.min()),
+        'max_ms': float(values.max()),
+    }
+
+
+def measure(fn, repeat: int, warmup: int = 1) -> dict:
+    """
+    Time fn(i) for i in range(repeat) after `warmup` untimed calls.
+    """
+    for i in range(warmup):
+        fn(i)
+    samples = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - started)
+    return timing_stats(samples)
+
+
+def environment() -> dict:
+    """
+    Describe the code and machine the results were measured on.
+    """
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': sys.version.split()[0],
+        'django': django.get_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'database': connection.vendor,
+        'vector_search_backend': settings.VECTOR_SEARCH_BACKEND,
+        'embedding_provider': get_provider().name,
+        'embedding_storage_dtype': settings.EMBEDDING_STORAGE_DTYPE,
+        'hybrid_search': settings.HYBRID_SEARCH_ENABLED,
+    }
+
+
+def bench_chunk_text(repeat: int, copies: int = 10) -> dict:
+    """
+    Chunk the resume repeated `copies` times.
+    """
+    text = '\n\n'.join([get_resume_path().read_text(encoding='utf-8')] * copies)
+    stats = measure(
+        lambda i: chunk_text(text, settings.CHUNK_MAX_TOKENS, settings.CHUNK_OVERLAP_TOKENS, settings.EMBEDDING_MODEL),
+        repeat
+    )
+    stats['characters'] = len(text)
+    return stats
+
+
+def _reset_knowledge():
+    KnowledgeDocument.objects.all().delete()
+    AssistantMemory.objects.filter(type='knowledge').delete()
+    EmbeddingCacheEntry.objects.all().delete()
+    embedding_cache.clear()
+    invalidate_index()
+    response_cache.invalidate()
+
+
+def bench_ingest_resume(repeat: int) -> dict:
+    """
+    Ingest the resume into an empty knowledge base, with cold embedding caches each time.
+    """
+    samples = []
+    chunks = 0
+    for _ in range(repeat):
+        _reset_knowledge()
+        started = time.perf_counter()
+        report = ingest_resume()
+        samples.append(time.perf_counter() - started)
+        chunks = report['chunks']
+    _reset_knowledge()
+    stats = timing_stats(samples)
+    stats['chunks'] = chunks
+    return stats
+
+
+def bench_corpus(size: int, repeat: int, seed: int) -> dict:
+    """
+    Grow the synthetic corpus to `size` rows and time search and chat over it.
+    """
+    started = time.perf_counter()
+    create_corpus(size, seed=seed)
+    corpus_seconds = time.perf_counter() - started
+    record_ingestion(changed=True)
+    invalidate_index()
+    response_cache.invalidate()
+
+    rng = np.random.default_rng([seed, size])
+    # Distinct questions per call, so the embedding cache does not hide the embedding request
+    query_texts, query_ids = random_texts(rng, repeat + 1, words=6)
+    query_vectors = [np.asarray(vector).tolist() for vector in corpus_embeddings(query_texts, query_ids)]
+    questions = [f"What experience with {text}?" for text in random_texts(rng, repeat + 1, words=6)[0]]
+
+    started = time.perf_counter()
+    search_similar_memories(limit=10, memory_type='knowledge', query_embedding=query_vectors[0])
+    index_build_ms = (time.perf_counter() - started) * 1000
+
+    results = {
+        'rows': AssistantMemory.objects.filter(type='knowledge').count(),
+        'corpus_build_seconds': corpus_seconds,
+        'index_build_ms': index_build_ms,
+        'search_similar_memories': measure(
+            lambda i: search_similar_memories(limit=10, memory_type='knowledge', query_embedding=query_vectors[i + 1]),
+            repeat, warmup=0
+        ),
+        'get_relevant_context': measure(lambda i: get_relevant_context(query_texts[i + 1]), repeat, warmup=0),
+    }
+
+    client = Client()
+    errors = []
+
+    def chat(i):
+        response = client.post('/api/chat/', {'message': questions[i]}, content_type='application/json')
+        if response.status_code != 200:
+            errors.append(response.status_code)
+
+    chat(repeat)  # Warm-up with the spare question
+    registry.reset()
+    results['chat'] = measure(chat, repeat, warmup=0)
+    memory_writer.flush()
+    results['chat']['errors'] = len(errors)
+    results['chat']['stages'] = {
+        dict(labels)['stage']: {
+            key if key == 'count' else f"{key}_ms": value if key == 'count' else value * 1000
+            for key, value in stats.items()
+        }
+        for labels, stats in registry.summary('chat_stage_seconds').items()
+    }
+    return results
+
+
+def run_benchmarks(sizes: list, repeat: int = 20, seed: int = 0, log=print) -> dict:
+    """
+    Run the whole suite (expects the stub server and a throwaway database).
+
+    Args:
+        sizes: Corpus sizes, e.g. [1000, 10000, 100000, 1000000]
+        repeat: Timed calls per operation
+        seed: Seed of the synthetic corpus and questions
+        log: Progress callback
+
+    Returns:
+        Results dictionary (see compare_results)
+    """
+    results = {
+        'format': RESULTS_FORMAT_VERSION,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'environment': environment(),
+        'parameters': {'sizes': sizes, 'repeat': repeat, 'seed': seed},
+        'benchmarks': {},
+    }
+    benchmarks = results['benchmarks']
+
+    log('chunk_text...')
+    benchmarks['chunk_text'] = bench_chunk_text(repeat)
+    log('ingest_resume...')
+    benchmarks['ingest_resume'] = bench_ingest_resume(max(1, min(repeat, 5)))
+
+    benchmarks['corpus'] = {}
+    for size in sorted(sizes):
+        log(f'corpus of {size} rows...')
+        benchmarks['corpus'][str(size)] = bench_corpus(size, repeat, seed)
+    return results
+
+
+def _metrics(results: dict, prefix: str = '') -> dict:
+    """
+    Flatten results to {'corpus.1000.chat': stats, ...} for every timing.
+    """
+    found = {}
+    for key, value in results.items():
+        if not isinstance(value, dict):
+            continue
+        name = f"{prefix}.{key}" if prefix else key
+        if 'p50_ms' in value:
+            found[name] = value
+        found.update(_metrics(value, name))
+    return found
+
+
+def compare_results(baseline: dict, current: dict) -> list:
+    """
+    Compare the p50 of every timing present in both result sets.
+
+    Returns:
+        List of (name, baseline p50 ms, current p50 ms, relative change) tuples
+    """
+    before = _metrics(baseline.get('benchmarks', {}))
+    after = _metrics(current.get('benchmarks', {}))
+    rows = []
+    for name in sorted(before.keys() & after.keys()):
+        old, new = before[name]['p50_ms'], after[name]['p50_ms']
+        rows.append((name, old, new, (new - old) / old if old else 0.0))
+    return rows
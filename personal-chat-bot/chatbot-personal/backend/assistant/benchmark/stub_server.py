@@ -0,0 +1,179 @@
+"""
+Local stand-in for the OpenAI embeddings and chat completions endpoints.
+
+Embeddings are deterministic: every word maps to a fixed pseudo-random
+vector (seeded by a hash of the word) and a text's embedding is the
+normalized sum of its words' vectors. Texts that share words are therefore
+close, which keeps vector search results meaningful, and the synthetic
+corpus can compute the same vectors without going through HTTP.
+"""
+import base64
+import hashlib
+import json
+import re
+import socket
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+WORD_PATTERN = re.compile(r"[a-z0-9+#]+")
+STUB_ANSWER = (
+    "Lind has worked as a software engineer building Django and Python services, "
+    "with experience in PostgreSQL, REST APIs and machine learning projects."
+)
+
+
+@lru_cache(maxsize=65536)
+def word_vector(word: str, dimensions: int) -> np.ndarray:
+    """
+    Fixed pseudo-random unit vector of a word.
+    """
+    seed = int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+    vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+    vector /= np.linalg.norm(vector)
+    vector.flags.writeable = False
+    return vector
+
+
+def stub_embedding(text: str, dimensions: int) -> np.ndarray:
+    """
+    Deterministic embedding of a text (normalized sum of its word vectors).
+    """
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for word in WORD_PATTERN.findall(text.lower()):
+        vector += word_vector(word, dimensions)
+    norm = np.linalg.norm(vector)
+    if not norm:
+        return word_vector('', dimensions).copy()
+    return vector / norm
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # Headers and body are separate writes; without this, delayed ACKs add ~40 ms per response
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        request = json.loads(self.rfile.read(length) or b'{}')
+        self.server.stub.requests += 1
+
+        if self.path.endswith('/embeddings'):
+            self._embeddings(request)
+        elif self.path.endswith('/chat/completions'):
+            self._chat(request)
+        else:
+            self.send_error(404)
+
+    def _embeddings(self, request: dict):
+        stub = self.server.stub
+        time.sleep(stub.embedding_latency)
+        texts = request['input'] if isinstance(request['input'], list) else [request['input']]
+        data = []
+        for index, text in enumerate(texts):
+            vector = stub_embedding(text, stub.dimensions)
+            if request.get('encoding_format') == 'base64':
+                embedding = base64.b64encode(vector.astype('<f4').tobytes()).decode('ascii')
+            else:
+                embedding = vector.tolist()
+            data.append({'object': 'embedding', 'index': index, 'embedding': embedding})
+        tokens = sum(len(text.split()) for text in texts)
+        self._send_json({
+            'object': 'list',
+            'data': data,
+            'model': request.get('model'),
+            'usage': {'prompt_tokens': tokens, 'total_tokens': tokens},
+        })
+
+    def _chat(self, request: dict):
+        stub = self.server.stub
+        time.sleep(stub.completion_latency)
+        common = {'id': 'chatcmpl-stub', 'created': int(time.time()), 'model': request.get('model')}
+
+        if not request.get('stream'):
+            self._send_json({
+                **common,
+                'object': 'chat.completion',
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': stub.answer},
+                    'finish_reason': 'stop',
+                }],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        for word in stub.answer.split(' '):
+            chunk = {
+                **common,
+                'object': 'chat.completion.chunk',
+                'choices': [{'index': 0, 'delta': {'content': word + ' '}, 'finish_reason': None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+            time.sleep(stub.token_latency)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+class StubOpenAIServer:
+    """
+    Stub OpenAI API on a local port, served from a background thread.
+
+    Usage:
+        with StubOpenAIServer(embedding_latency=0.02) as stub:
+            settings.OPENAI_BASE_URL = stub.base_url
+    """
+
+    def __init__(self, dimensions: int = 1536, embedding_latency: float = 0.0, completion_latency: float = 0.0,
+                 token_latency: float = 0.0, answer: str = STUB_ANSWER, port: int = 0):
+        self.dimensions = dimensions
+        self.embedding_latency = embedding_latency
+        self.completion_latency = completion_latency
+        self.token_latency = token_latency
+        self.answer = answer
+        self.requests = 0
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stub-openai', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
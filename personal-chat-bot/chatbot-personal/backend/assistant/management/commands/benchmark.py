@@ -0,0 +1,160 @@
+import contextlib
+import io
+import json
+import tempfile
+import time
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from assistant.benchmark.runner import compare_results, run_benchmarks
+from assistant.benchmark.stub_server import StubOpenAIServer
+from assistant.services.openai_client import reset_clients
+
+
+class Command(BaseCommand):
+    help = 'Run the offline benchmark suite against a stub OpenAI server and synthetic corpora (no network needed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='1000,10000',
+            help='Comma-separated synthetic corpus sizes (default: 1000,10000; e.g. 1000,10000,100000,1000000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Timed calls per operation (default: 20)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed of the synthetic corpus and questions (default: 0)'
+        )
+        parser.add_argument(
+            '--embedding-latency',
+            type=float,
+            default=20,
+            help='Stub latency of an embeddings request in ms (default: 20)'
+        )
+        parser.add_argument(
+            '--completion-latency',
+            type=float,
+            default=300,
+            help='Stub latency of a chat completion in ms (default: 300)'
+        )
+        parser.add_argument(
+            '--token-latency',
+            type=float,
+            default=0,
+            help='Stub delay between streamed tokens in ms (default: 0)'
+        )
+        parser.add_argument(
+            '--output',
+            default=None,
+            help='Results file (default: benchmark_results/<timestamp>-<commit>.json)'
+        )
+        parser.add_argument(
+            '--compare',
+            default=None,
+            help='Earlier results file to compare the p50 timings with'
+        )
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help='Keep the benchmark database (and its corpus) between runs'
+        )
+        parser.add_argument(
+            '--verbose',
+            action='store_true',
+            help='Show the pipeline log output while benchmarking'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError('--sizes must be a comma-separated list of integers')
+        baseline = None
+        if options['compare']:
+            baseline = json.loads(Path(options['compare']).read_text(encoding='utf-8'))
+
+        stub = StubOpenAIServer(
+            dimensions=settings.EMBEDDING_DIMENSIONS,
+            embedding_latency=options['embedding_latency'] / 1000,
+            completion_latency=options['completion_latency'] / 1000,
+            token_latency=options['token_latency'] / 1000,
+        )
+
+        # Benchmarks run in a throwaway test database, never the real one
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, keepdb=options['keepdb'])
+        try:
+            with stub, tempfile.TemporaryDirectory() as snapshot_dir, override_settings(
+                OPENAI_BASE_URL=stub.base_url,
+                OPENAI_API_KEY='benchmark',
+                RESPONSE_CACHE_ENABLED=False,
+                AUTO_INGEST_ENABLED=False,
+                MEMORY_RETENTION_INTERVAL=0,
+                VECTOR_SNAPSHOT_DIR=snapshot_dir,
+            ):
+                reset_clients()
+                output = contextlib.nullcontext() if options['verbose'] else contextlib.redirect_stdout(io.StringIO())
+                with output:
+                    results = run_benchmarks(
+                        sizes,
+                        repeat=options['repeat'],
+                        seed=options['seed'],
+                        log=lambda message: self.stderr.write(message)
+                    )
+                results['parameters'].update(
+                    embedding_latency_ms=options['embedding_latency'],
+                    completion_latency_ms=options['completion_latency'],
+                    token_latency_ms=options['token_latency'],
+                    stub_requests=stub.requests,
+                )
+        finally:
+            reset_clients()
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        self._print_results(results)
+
+        output_path = Path(options['output']) if options['output'] else (
+            Path(settings.BASE_DIR) / 'benchmark_results'
+            / f"{time.strftime('%Y%m%d-%H%M%S')}-{(results['environment']['commit'] or 'unknown')[:8]}.json"
+        )
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_text(json.dumps(results, indent=2), encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output_path}"))
+
+        if baseline is not None:
+            self.stdout.write(f"\nComparison with {options['compare']} (p50):")
+            for name, old, new, change in compare_results(baseline, results):
+                style = self.style.ERROR if change > 0.1 else self.style.SUCCESS if change < -0.1 else (lambda text: text)
+                self.stdout.write(style(f"  {name:<55} {old:>10.2f} ms -> {new:>10.2f} ms  {change:+.1%}"))
+
+    def _print_results(self, results: dict):
+        benchmarks = results['benchmarks']
+
+        def line(name, stats):
+            self.stdout.write(
+                f"  {name:<28} p50 {stats['p50_ms']:>9.2f} ms   p95 {stats['p95_ms']:>9.2f} ms   "
+                f"p99 {stats['p99_ms']:>9.2f} ms"
+            )
+
+        self.stdout.write("\nBenchmarks:")
+        line('chunk_text', benchmarks['chunk_text'])
+        line('ingest_resume', benchmarks['ingest_resume'])
+        for size, corpus in benchmarks['corpus'].items():
+            self.stdout.write(f"\nCorpus of {corpus['rows']} rows (index build {corpus['index_build_ms']:.1f} ms):")
+            for name in ('search_similar_memories', 'get_relevant_context', 'chat'):
+                line(name, corpus[name])
+            if corpus['chat']['errors']:
+                self.stdout.write(self.style.ERROR(f"  chat errors: {corpus['chat']['errors']}"))
+            for stage, stats in sorted(corpus['chat']['stages'].items()):
+                line(f"  {stage}", stats)
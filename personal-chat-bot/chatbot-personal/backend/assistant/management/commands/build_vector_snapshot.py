@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from assistant.models import AssistantMemory
+from assistant.services.vector_snapshot import snapshot_paths, write_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Export embeddings to memory-mapped snapshot files that worker processes share at startup'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--type',
+            dest='memory_types',
+            action='append',
+            choices=[choice for choice, _ in AssistantMemory.MEMORY_TYPE_CHOICES],
+            help='Memory type to export (repeatable; default: all types)'
+        )
+        parser.add_argument(
+            '--output',
+            default=None,
+            help=f'Output directory (default: VECTOR_SNAPSHOT_DIR, {settings.VECTOR_SNAPSHOT_DIR})'
+        )
+
+    def handle(self, *args, **options):
+        memory_types = options['memory_types'] or [choice for choice, _ in AssistantMemory.MEMORY_TYPE_CHOICES]
+        
+        for memory_type in memory_types:
+            meta = write_snapshot(memory_type, options['output'])
+            size = snapshot_paths(memory_type, options['output'])['vectors'].stat().st_size
+            self.stdout.write(self.style.SUCCESS(
+                f"{memory_type}: {meta['count']} vectors ({meta['dimensions']} dimensions, "
+                f"{size / 1024 / 1024:.1f} MB) up to id {meta['high_water_id']}"
+            ))
+        
+        self.stdout.write("Restart the workers to pick up the new snapshot; rows added later are loaded from the database.")
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from assistant.models import AssistantMemory
+from assistant.services.retention import compact_memory
+
+
+class Command(BaseCommand):
+    help = 'Summarize and delete chat memory outside the retention policy (MEMORY_RETENTION_* settings)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many messages would be compacted'
+        )
+        parser.add_argument(
+            '--archive',
+            default=None,
+            help=f'Archive deleted rows to this directory (default: MEMORY_ARCHIVE_DIR, {settings.MEMORY_ARCHIVE_DIR or "off"})'
+        )
+        parser.add_argument(
+            '--vacuum',
+            action='store_true',
+            help='Run VACUUM ANALYZE on the memory table afterwards (PostgreSQL only)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = compact_memory(dry_run=options['dry_run'], archive_dir=options['archive'])
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(f'Error compacting memory: {str(e)}')
+            )
+            return
+        
+        if report['skipped']:
+            self.stdout.write(self.style.WARNING('Another compaction run is in progress; nothing done.'))
+            return
+        
+        if options['dry_run']:
+            self.stdout.write(
+                f"Would compact {report['messages_removed']} messages in {report['conversations']} conversations "
+                f"and delete {report['summaries_expired']} expired summaries"
+            )
+            return
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Compacted {report['messages_removed']} messages in {report['conversations']} conversations into "
+            f"{report['summaries_created']} summaries ({report['summaries_folded']} summaries folded, "
+            f"{report['summaries_expired']} expired) in {report['elapsed']:.1f}s"
+        ))
+        if report['embedding_cache_pruned']:
+            self.stdout.write(f"Deleted {report['embedding_cache_pruned']} expired embedding cache entries.")
+        
+        if options['vacuum']:
+            if connection.vendor != 'postgresql':
+                self.stdout.write('VACUUM skipped: only supported on PostgreSQL.')
+                return
+            # VACUUM cannot run inside a transaction; Django's default autocommit is fine
+            with connection.cursor() as cursor:
+                cursor.execute(f'VACUUM ANALYZE {AssistantMemory._meta.db_table}')
+            self.stdout.write('Vacuumed the memory table.')
@@ -1,18 +1,69 @@
-from django.core.management.base import BaseCommand
-from assistant.services.ingest_resume import ingest_resume
+from django.core.management.base import BaseCommand, CommandError
+from assistant.services.ingest_resume import get_resume_path
+from assistant.services.ingestion import ingest_paths
+from assistant.services.embedding_cache import embedding_cache
 
 
 class Command(BaseCommand):
-    help = 'Ingest resume data from resume.txt into the knowledge base'
+    help = 'Ingest documents (default: resume.txt) into the knowledge base'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'targets',
+            nargs='*',
+            help='Files, directories or glob patterns to ingest (default: assistant/resume.txt)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Number of documents processed concurrently (default: INGEST_WORKERS)'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-chunk documents even if the file is unchanged'
+        )
+        parser.add_argument(
+            '--prune',
+            action='store_true',
+            help='Remove documents that are not among the targets from the knowledge base'
+        )
 
     def handle(self, *args, **options):
+        targets = options['targets'] or [get_resume_path()]
+        
         try:
-            ingest_resume()
-            self.stdout.write(
-                self.style.SUCCESS('Successfully ingested resume data!')
+            report = ingest_paths(
+                targets,
+                workers=options['workers'],
+                force=options['force'],
+                prune=options['prune']
             )
         except Exception as e:
-            self.stdout.write(
-                self.style.ERROR(f'Error ingesting resume: {str(e)}')
-            )
-
+            raise CommandError(f'Error ingesting documents: {str(e)}') from e
+        
+        style = self.style.ERROR if report['failed'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"Ingested {report['documents']} documents ({report['skipped']} unchanged, {report['failed']} failed): "
+            f"{report['added']} chunks added, {report['deleted']} removed, {report['unchanged']} unchanged"
+        ))
+        self.stdout.write(
+            f"Throughput: {report['processed_chunks']} chunks, {report['processed_tokens']} tokens in "
+            f"{report['elapsed']:.2f}s ({report['chunks_per_second']:.1f} chunks/s, "
+            f"{report['tokens_per_second']:.0f} tokens/s)"
+        )
+        if report['foreign']:
+            self.stdout.write(self.style.WARNING(
+                f"{report['foreign']} knowledge chunks were embedded by another embedding provider and are "
+                f"ignored by search; ingest their documents again, or remove them with --prune"
+            ))
+        
+        stats = embedding_cache.stats()
+        self.stdout.write(
+            f"Embedding cache: {stats['memory_hits'] + stats['persistent_hits']} hits, "
+            f"{stats['misses']} misses (hit rate {stats['hit_rate']:.0%})"
+        )
+        
+        if report['failed']:
+            raise CommandError(f"{report['failed']} documents failed to ingest")
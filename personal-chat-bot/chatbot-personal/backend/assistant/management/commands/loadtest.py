@@ -0,0 +1,203 @@
+import contextlib
+import io
+import json
+import threading
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+from django.conf import settings
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from assistant.benchmark.corpus import create_corpus
+from assistant.benchmark.loadtest import LoadTest, parse_mix
+from assistant.benchmark.stub_server import StubOpenAIServer
+from assistant.services.ingest_resume import ingest_resume
+from assistant.services.knowledge_base import record_ingestion
+from assistant.services.openai_client import reset_clients
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive /api/chat/, /api/chat/history/ and /api/memory/ with concurrent virtual users and report '
+        'throughput, latency percentiles, error rate and DB queries per endpoint'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            default=None,
+            help='Server to test, e.g. http://127.0.0.1:8000 (start it with OPENAI_BASE_URL pointing at '
+                 '`manage.py stub_openai`); omit together with --serve to test an in-process server'
+        )
+        parser.add_argument(
+            '--serve',
+            action='store_true',
+            help='Start a threaded server with the stub LLM in a throwaway test database and test it'
+        )
+        parser.add_argument('--concurrency', type=int, default=10, help='Virtual users (default: 10)')
+        parser.add_argument('--duration', type=float, default=60, help='Test length in seconds (default: 60)')
+        parser.add_argument(
+            '--ramp-up',
+            type=float,
+            default=10,
+            help='Seconds over which the users are started (default: 10)'
+        )
+        parser.add_argument(
+            '--mix',
+            default='chat=6,history=3,memory=1',
+            help='Endpoint weights (default: chat=6,history=3,memory=1)'
+        )
+        parser.add_argument(
+            '--questions',
+            default=None,
+            help='File with one chat question per line (default: built-in CV questions)'
+        )
+        parser.add_argument(
+            '--unique-ratio',
+            type=float,
+            default=0.5,
+            help='Share of questions made unique so the response cache cannot answer them (default: 0.5)'
+        )
+        parser.add_argument(
+            '--think-time',
+            type=float,
+            default=0,
+            help='Mean pause between a user\'s requests in seconds (default: 0)'
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+        parser.add_argument(
+            '--corpus-size',
+            type=int,
+            default=0,
+            help='With --serve: synthetic knowledge rows added to the ingested resume (default: 0)'
+        )
+        parser.add_argument(
+            '--embedding-latency',
+            type=float,
+            default=20,
+            help='With --serve: stub embeddings latency in ms (default: 20)'
+        )
+        parser.add_argument(
+            '--completion-latency',
+            type=float,
+            default=300,
+            help='With --serve: stub completion latency in ms (default: 300)'
+        )
+        parser.add_argument('--output', default=None, help='Write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        if bool(options['url']) == options['serve']:
+            raise CommandError('Pass either --url or --serve')
+        try:
+            mix = parse_mix(options['mix'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        questions = None
+        if options['questions']:
+            questions = [
+                line.strip() for line in Path(options['questions']).read_text(encoding='utf-8').splitlines()
+                if line.strip()
+            ]
+
+        def run(base_url):
+            load_test = LoadTest(
+                base_url,
+                concurrency=options['concurrency'],
+                duration=options['duration'],
+                ramp_up=options['ramp_up'],
+                mix=mix,
+                questions=questions,
+                unique_ratio=options['unique_ratio'],
+                think_time=options['think_time'],
+                seed=options['seed'],
+            )
+            self.stderr.write(
+                f"Running {options['concurrency']} users for {options['duration']:.0f}s "
+                f"(ramp-up {load_test.ramp_up:.0f}s) against {base_url}..."
+            )
+            return load_test.run()
+
+        if options['url']:
+            report = run(options['url'])
+        else:
+            report = self._run_served(options, run)
+
+        self._print_report(report)
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2), encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    def _run_served(self, options, run) -> dict:
+        """
+        Serve the app with the stub LLM in a test database and run the load test against it.
+        """
+        stub = StubOpenAIServer(
+            dimensions=settings.EMBEDDING_DIMENSIONS,
+            embedding_latency=options['embedding_latency'] / 1000,
+            completion_latency=options['completion_latency'] / 1000,
+        )
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            with stub, override_settings(
+                OPENAI_BASE_URL=stub.base_url,
+                OPENAI_API_KEY='loadtest',
+                AUTO_INGEST_ENABLED=False,
+                MEMORY_RETENTION_INTERVAL=0,
+                ALLOWED_HOSTS=['*'],
+            ), contextlib.redirect_stdout(io.StringIO()):
+                reset_clients()
+                ingest_resume()
+                if options['corpus_size']:
+                    create_corpus(options['corpus_size'], seed=options['seed'])
+                    record_ingestion(changed=True)
+
+                server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+                server.set_app(get_internal_wsgi_application())
+                thread = threading.Thread(target=server.serve_forever, name='loadtest-server', daemon=True)
+                thread.start()
+                try:
+                    host, port = server.server_address[:2]
+                    report = run(f"http://{host}:{port}")
+                finally:
+                    server.shutdown()
+                    server.server_close()
+                report['parameters'].update(
+                    served=True,
+                    corpus_size=options['corpus_size'],
+                    embedding_latency_ms=options['embedding_latency'],
+                    completion_latency_ms=options['completion_latency'],
+                )
+        finally:
+            reset_clients()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        return report
+
+    def _print_report(self, report: dict):
+        def latency(stats):
+            if 'p50_ms' not in stats:
+                return ''
+            return f"p50 {stats['p50_ms']:>8.1f}  p95 {stats['p95_ms']:>8.1f}  p99 {stats['p99_ms']:>8.1f} ms"
+
+        self.stdout.write(f"\nCompleted in {report['elapsed_seconds']:.1f}s\n")
+        self.stdout.write(f"  {'endpoint':<10} {'requests':>8} {'req/s':>8} {'errors':>7} {'queries':>8}  latency")
+        for name, stats in report['endpoints'].items():
+            queries = f"{stats['db_queries_mean']:.1f}" if stats['db_queries_mean'] is not None else '-'
+            style = self.style.ERROR if stats['error_rate'] else (lambda text: text)
+            self.stdout.write(style(
+                f"  {name:<10} {stats['requests']:>8} {stats['throughput_rps']:>8.1f} "
+                f"{stats['error_rate']:>7.1%} {queries:>8}  {latency(stats)}"
+            ))
+
+        self.stdout.write("\n  By active users:")
+        for level, stats in report['concurrency'].items():
+            self.stdout.write(
+                f"  {level:<10} {stats['requests']:>8} {'':>8} {stats['error_rate']:>7.1%} {'':>8}  {latency(stats)}"
+            )
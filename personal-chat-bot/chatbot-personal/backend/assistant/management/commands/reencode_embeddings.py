@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from assistant.models import AssistantMemory
+from assistant.services.pgvector_search import store_vectors
+from assistant.services.vector_codec import DTYPES, decode_embedding, encode_embedding
+from assistant.services.vector_index import invalidate_index, record_write
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Re-encode stored embeddings as float32, float16 or int8 (new rows use EMBEDDING_STORAGE_DTYPE)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dtype',
+            choices=sorted(DTYPES),
+            default=None,
+            help='Target storage dtype (default: EMBEDDING_STORAGE_DTYPE)'
+        )
+
+    def _save(self, batch: list):
+        # Keep the pgvector column in step with the re-encoded (possibly quantized) values
+        with transaction.atomic():
+            AssistantMemory.objects.bulk_update(batch, ['embedding'])
+            store_vectors(batch)
+            record_write(['knowledge', 'memory'], rebuild=True)
+
+    def handle(self, *args, **options):
+        dtype = options['dtype'] or settings.EMBEDDING_STORAGE_DTYPE
+        rows = (
+            AssistantMemory.objects.with_embeddings()
+            .exclude(embedding__isnull=True)
+            .only('id', 'embedding', 'embedding_model')
+        )
+        
+        converted = 0
+        bytes_before = bytes_after = 0
+        batch = []
+        for memory in rows.iterator(chunk_size=BATCH_SIZE):
+            bytes_before += len(memory.embedding)
+            memory.embedding = encode_embedding(decode_embedding(memory.embedding), dtype)
+            bytes_after += len(memory.embedding)
+            batch.append(memory)
+            if len(batch) >= BATCH_SIZE:
+                self._save(batch)
+                converted += len(batch)
+                batch = []
+        if batch:
+            self._save(batch)
+            converted += len(batch)
+        
+        invalidate_index()
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-encoded {converted} embeddings as {dtype}: "
+            f"{bytes_before / 1024:.0f} KB -> {bytes_after / 1024:.0f} KB"
+        ))
@@ -0,0 +1,46 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from assistant.benchmark.stub_server import StubOpenAIServer
+
+
+class Command(BaseCommand):
+    help = 'Serve a stub OpenAI API (deterministic embeddings, canned answers) for load tests without network access'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8100, help='Port to listen on (default: 8100)')
+        parser.add_argument(
+            '--embedding-latency',
+            type=float,
+            default=20,
+            help='Latency of an embeddings request in ms (default: 20)'
+        )
+        parser.add_argument(
+            '--completion-latency',
+            type=float,
+            default=300,
+            help='Latency of a chat completion in ms (default: 300)'
+        )
+        parser.add_argument(
+            '--token-latency',
+            type=float,
+            default=0,
+            help='Delay between streamed tokens in ms (default: 0)'
+        )
+
+    def handle(self, *args, **options):
+        stub = StubOpenAIServer(
+            dimensions=settings.EMBEDDING_DIMENSIONS,
+            embedding_latency=options['embedding_latency'] / 1000,
+            completion_latency=options['completion_latency'] / 1000,
+            token_latency=options['token_latency'] / 1000,
+            port=options['port'],
+        )
+        with stub:
+            self.stdout.write(self.style.SUCCESS(f"Stub OpenAI API listening on {stub.base_url}"))
+            self.stdout.write(f"Start the app with OPENAI_BASE_URL={stub.base_url} and any OPENAI_API_KEY. Ctrl+C to stop.")
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                self.stdout.write(f"Stopped after {stub.requests} requests.")
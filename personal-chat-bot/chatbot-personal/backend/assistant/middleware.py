@@ -0,0 +1,64 @@
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import StreamingHttpResponse
+from assistant.services.metrics import end_request, registry, start_request
+
+
+class TimingMiddleware:
+    """
+    Time every request, record it in the metrics registry and add a
+    Server-Timing header with the per-stage breakdown (e.g. for /api/chat/)
+    and the request's database query count and time.
+
+    Streaming responses are sent before their stages run, so they get no
+    header; their timings are recorded by the chat stream itself.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        started = time.perf_counter()
+        timings, token = start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        return self._finish(request, response, timings, started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        timings, token = start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        return self._finish(request, response, timings, started)
+
+    def _finish(self, request, response, timings, started):
+        total = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view = match.url_name if match and match.url_name else 'other'
+
+        registry.increment(
+            'http_requests_total', {'view': view, 'status': str(response.status_code)},
+            help_text='HTTP requests by view and status code.'
+        )
+        if not isinstance(response, StreamingHttpResponse):
+            registry.observe(
+                'http_request_seconds', total, {'view': view},
+                help_text='Time to produce a (non-streaming) response, in seconds.'
+            )
+            registry.observe(
+                'http_request_db_queries', timings.queries, {'view': view},
+                help_text='Database queries per (non-streaming) request.'
+            )
+            response['Server-Timing'] = timings.server_timing(total)
+        return response
@@ -0,0 +1,73 @@
+# Adds a native pgvector copy of the embeddings with HNSW indexes.
+# The column is only created when the pgvector extension is available on the
+# server; otherwise this migration is a no-op and the numpy backend is used.
+# The JSON `embedding` column stays the source of truth for both backends.
+import json
+from django.db import migrations
+
+DIMENSIONS = 1536
+BATCH_SIZE = 500
+
+
+def add_vector_column(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT EXISTS(SELECT 1 FROM pg_available_extensions WHERE name = 'vector');")
+        if not cursor.fetchone()[0]:
+            print("\n[WARNING] pgvector is not available; skipping embedding_vector column (numpy search will be used).")
+            return
+
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+        cursor.execute(f"ALTER TABLE assistant_memory ADD COLUMN IF NOT EXISTS embedding_vector vector({DIMENSIONS});")
+
+    # Convert existing JSON embeddings into the vector column
+    AssistantMemory = apps.get_model('assistant', 'AssistantMemory')
+    rows = AssistantMemory.objects.exclude(embedding__isnull=True).values_list('id', 'embedding')
+    updates = []
+    with connection.cursor() as cursor:
+        for memory_id, embedding in rows.iterator(chunk_size=BATCH_SIZE):
+            try:
+                vector = json.loads(embedding)
+            except (json.JSONDecodeError, ValueError, TypeError):
+                continue
+            if len(vector) != DIMENSIONS:
+                continue
+            updates.append(('[' + ','.join(str(float(v)) for v in vector) + ']', memory_id))
+            if len(updates) >= BATCH_SIZE:
+                cursor.executemany("UPDATE assistant_memory SET embedding_vector = %s::vector WHERE id = %s;", updates)
+                updates = []
+        if updates:
+            cursor.executemany("UPDATE assistant_memory SET embedding_vector = %s::vector WHERE id = %s;", updates)
+
+        # One partial index per type so filtered top-k queries stay on the index
+        for memory_type in ('knowledge', 'memory'):
+            cursor.execute(f"""
+                CREATE INDEX IF NOT EXISTS assistant_memory_{memory_type}_hnsw
+                ON assistant_memory USING hnsw (embedding_vector vector_cosine_ops)
+                WHERE type = '{memory_type}';
+            """)
+
+
+def remove_vector_column(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    with connection.cursor() as cursor:
+        for memory_type in ('knowledge', 'memory'):
+            cursor.execute(f"DROP INDEX IF EXISTS assistant_memory_{memory_type}_hnsw;")
+        cursor.execute("ALTER TABLE assistant_memory DROP COLUMN IF EXISTS embedding_vector;")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_vector_column, remove_vector_column),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations, models
+
+
+ROLE_PREFIXES = [
+    ('user', 'User: '),
+    ('assistant', 'Assistant: '),
+]
+
+
+def split_role_prefixes(apps, schema_editor):
+    """
+    Move the "User: " / "Assistant: " content prefix of chat messages into the role column.
+    """
+    AssistantMemory = apps.get_model('assistant', 'AssistantMemory')
+    for role, prefix in ROLE_PREFIXES:
+        rows = AssistantMemory.objects.filter(type='memory', role__isnull=True, content__startswith=prefix)
+        for memory in rows.only('id', 'content').iterator():
+            memory.content = memory.content[len(prefix):]
+            memory.role = role
+            memory.save(update_fields=['content', 'role'])
+
+
+def restore_role_prefixes(apps, schema_editor):
+    AssistantMemory = apps.get_model('assistant', 'AssistantMemory')
+    for role, prefix in ROLE_PREFIXES:
+        for memory in AssistantMemory.objects.filter(role=role).only('id', 'content').iterator():
+            memory.content = prefix + memory.content
+            memory.save(update_fields=['content'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0003_embeddingcacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assistantmemory',
+            name='role',
+            field=models.CharField(blank=True, choices=[('user', 'User'), ('assistant', 'Assistant')], max_length=20, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='assistantmemory',
+            index=models.Index(fields=['type', 'created_at'], name='assistant_memory_type_created'),
+        ),
+        migrations.RunPython(split_role_prefixes, restore_role_prefixes),
+    ]
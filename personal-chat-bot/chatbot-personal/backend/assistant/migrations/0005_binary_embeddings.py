@@ -0,0 +1,82 @@
+# Stores embeddings as float32 bytes instead of JSON text (see services/vector_codec.py).
+# The conversion goes through a temporary column because PostgreSQL cannot
+# cast JSON text to bytea in place.
+import json
+import numpy as np
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+def json_to_binary(apps, schema_editor):
+    AssistantMemory = apps.get_model('assistant', 'AssistantMemory')
+    rows = AssistantMemory.objects.exclude(embedding__isnull=True).only('id', 'embedding')
+    batch = []
+    for memory in rows.iterator(chunk_size=BATCH_SIZE):
+        try:
+            memory.embedding_data = np.asarray(json.loads(memory.embedding), dtype='<f4').tobytes()
+        except (json.JSONDecodeError, ValueError, TypeError) as e:
+            print(f"\nSkipping embedding for memory {memory.id}: {e}")
+            continue
+        batch.append(memory)
+        if len(batch) >= BATCH_SIZE:
+            AssistantMemory.objects.bulk_update(batch, ['embedding_data'])
+            batch = []
+    if batch:
+        AssistantMemory.objects.bulk_update(batch, ['embedding_data'])
+
+
+def binary_to_json(apps, schema_editor):
+    AssistantMemory = apps.get_model('assistant', 'AssistantMemory')
+    rows = AssistantMemory.objects.exclude(embedding_data__isnull=True).only('id', 'embedding_data')
+    batch = []
+    for memory in rows.iterator(chunk_size=BATCH_SIZE):
+        memory.embedding = json.dumps(np.frombuffer(memory.embedding_data, dtype='<f4').tolist())
+        batch.append(memory)
+        if len(batch) >= BATCH_SIZE:
+            AssistantMemory.objects.bulk_update(batch, ['embedding'])
+            batch = []
+    if batch:
+        AssistantMemory.objects.bulk_update(batch, ['embedding'])
+
+
+def clear_embedding_cache(apps, schema_editor):
+    # The persistent embedding cache refills itself; it is simpler to drop it than convert it
+    apps.get_model('assistant', 'EmbeddingCacheEntry').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0004_assistantmemory_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assistantmemory',
+            name='embedding_data',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.RunPython(json_to_binary, binary_to_json),
+        migrations.RemoveField(
+            model_name='assistantmemory',
+            name='embedding',
+        ),
+        migrations.RenameField(
+            model_name='assistantmemory',
+            old_name='embedding_data',
+            new_name='embedding',
+        ),
+        migrations.RunPython(clear_embedding_cache, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='embeddingcacheentry',
+            name='embedding',
+        ),
+        migrations.AddField(
+            model_name='embeddingcacheentry',
+            name='embedding',
+            field=models.BinaryField(default=b''),
+            preserve_default=False,
+        ),
+        migrations.RunPython(migrations.RunPython.noop, clear_embedding_cache),
+    ]
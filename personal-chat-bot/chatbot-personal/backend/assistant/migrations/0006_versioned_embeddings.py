@@ -0,0 +1,53 @@
+# Prefixes the stored float32 embeddings with the version header of
+# services/vector_codec.py (format 1, float32, scale 1.0).
+import struct
+from django.db import migrations
+
+BATCH_SIZE = 500
+FLOAT32_HEADER = struct.pack('<BBxxf', 1, 0, 1.0)
+
+
+def add_headers(apps, schema_editor):
+    for model_name in ('AssistantMemory', 'EmbeddingCacheEntry'):
+        model = apps.get_model('assistant', model_name)
+        pk_name = model._meta.pk.name
+        batch = []
+        for row in model.objects.exclude(embedding__isnull=True).only(pk_name, 'embedding').iterator(chunk_size=BATCH_SIZE):
+            row.embedding = FLOAT32_HEADER + bytes(row.embedding)
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                model.objects.bulk_update(batch, ['embedding'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['embedding'])
+
+
+def strip_headers(apps, schema_editor):
+    import numpy as np
+
+    for model_name in ('AssistantMemory', 'EmbeddingCacheEntry'):
+        model = apps.get_model('assistant', model_name)
+        pk_name = model._meta.pk.name
+        batch = []
+        for row in model.objects.exclude(embedding__isnull=True).only(pk_name, 'embedding').iterator(chunk_size=BATCH_SIZE):
+            data = bytes(row.embedding)
+            _, code, scale = struct.unpack_from('<BBxxf', data)
+            vector = np.frombuffer(data, dtype={0: '<f4', 1: '<f2', 2: 'i1'}[code], offset=8).astype('<f4')
+            row.embedding = (vector * scale if code == 2 else vector).astype('<f4').tobytes()
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                model.objects.bulk_update(batch, ['embedding'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['embedding'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0005_binary_embeddings'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_headers, strip_headers),
+    ]
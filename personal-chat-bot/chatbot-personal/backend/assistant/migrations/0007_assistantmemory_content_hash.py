@@ -0,0 +1,28 @@
+import hashlib
+from django.db import migrations, models
+
+
+def hash_knowledge(apps, schema_editor):
+    AssistantMemory = apps.get_model('assistant', 'AssistantMemory')
+    rows = AssistantMemory.objects.filter(type='knowledge').only('id', 'content')
+    batch = []
+    for memory in rows.iterator(chunk_size=500):
+        memory.content_hash = hashlib.sha256(memory.content.encode('utf-8')).hexdigest()
+        batch.append(memory)
+    AssistantMemory.objects.bulk_update(batch, ['content_hash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0006_versioned_embeddings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assistantmemory',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.RunPython(hash_knowledge, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+RESUME_SOURCE = 'assistant/resume.txt'
+
+
+def attach_resume_chunks(apps, schema_editor):
+    # Existing knowledge rows all came from the resume. The empty file hash
+    # makes the next ingestion re-chunk it and diff the chunks by hash.
+    AssistantMemory = apps.get_model('assistant', 'AssistantMemory')
+    KnowledgeDocument = apps.get_model('assistant', 'KnowledgeDocument')
+    chunks = AssistantMemory.objects.filter(type='knowledge', document__isnull=True)
+    if chunks.exists():
+        document = KnowledgeDocument.objects.create(source=RESUME_SOURCE, chunk_count=chunks.count())
+        chunks.update(document=document)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0007_assistantmemory_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KnowledgeDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=500, unique=True)),
+                ('content_hash', models.CharField(blank=True, max_length=64)),
+                ('size_bytes', models.BigIntegerField(default=0)),
+                ('chunk_count', models.IntegerField(default=0)),
+                ('token_count', models.IntegerField(default=0)),
+                ('ingested_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'assistant_knowledge_document',
+                'ordering': ['source'],
+            },
+        ),
+        migrations.AddField(
+            model_name='assistantmemory',
+            name='document',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='assistant.knowledgedocument'),
+        ),
+        migrations.RunPython(attach_resume_chunks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Adds a GIN full-text index on assistant_memory.content for lexical search
+# (see services/lexical_search.py). PostgreSQL only; other databases use the
+# Python fallback in lexical_search.
+from django.db import migrations
+
+INDEX_NAME = 'assistant_memory_content_fts'
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON assistant_memory "
+        f"USING gin (to_tsvector('english', content));"
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {INDEX_NAME};")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0008_knowledgedocument'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+
+def create_state(apps, schema_editor):
+    # Existing knowledge counts as version 1, so workers skip auto-ingestion
+    AssistantMemory = apps.get_model('assistant', 'AssistantMemory')
+    KnowledgeBaseState = apps.get_model('assistant', 'KnowledgeBaseState')
+    chunk_count = AssistantMemory.objects.filter(type='knowledge').count()
+    KnowledgeBaseState.objects.create(pk=1, version=1 if chunk_count else 0, chunk_count=chunk_count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0009_content_fulltext_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KnowledgeBaseState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.IntegerField(default=0)),
+                ('chunk_count', models.IntegerField(default=0)),
+                ('status', models.CharField(choices=[('idle', 'Idle'), ('ingesting', 'Ingesting'), ('failed', 'Failed')], default='idle', max_length=20)),
+                ('ingest_started_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'assistant_knowledge_base_state',
+            },
+        ),
+        migrations.RunPython(create_state, migrations.RunPython.noop),
+    ]
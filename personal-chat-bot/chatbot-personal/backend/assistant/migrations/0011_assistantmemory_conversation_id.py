@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0010_knowledgebasestate'),
+    ]
+
+    operations = [
+        # Existing chat messages keep a null conversation_id (the old shared pool)
+        migrations.AddField(
+            model_name='assistantmemory',
+            name='conversation_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='assistantmemory',
+            index=models.Index(fields=['conversation_id', 'created_at'], name='assistant_memory_conv_created'),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0011_assistantmemory_conversation_id'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='assistantmemory',
+            name='role',
+            field=models.CharField(blank=True, choices=[('user', 'User'), ('assistant', 'Assistant'), ('summary', 'Summary')], max_length=20, null=True),
+        ),
+    ]
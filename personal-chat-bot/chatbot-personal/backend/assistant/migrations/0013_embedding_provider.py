@@ -0,0 +1,40 @@
+from django.db import migrations, models
+
+# Every vector stored so far came from the OpenAI embeddings API
+EMBEDDING_MODEL = 'text-embedding-ada-002'
+DIMENSIONS = 1536
+
+
+def tag_existing_embeddings(apps, schema_editor):
+    AssistantMemory = apps.get_model('assistant', 'AssistantMemory')
+    KnowledgeBaseState = apps.get_model('assistant', 'KnowledgeBaseState')
+    AssistantMemory.objects.filter(embedding__isnull=False).update(
+        embedding_model=EMBEDDING_MODEL, embedding_dimensions=DIMENSIONS
+    )
+    KnowledgeBaseState.objects.filter(chunk_count__gt=0).update(embedding_model=EMBEDDING_MODEL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0012_assistantmemory_summary_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assistantmemory',
+            name='embedding_model',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='assistantmemory',
+            name='embedding_dimensions',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='knowledgebasestate',
+            name='embedding_model',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.RunPython(tag_existing_embeddings, migrations.RunPython.noop),
+    ]
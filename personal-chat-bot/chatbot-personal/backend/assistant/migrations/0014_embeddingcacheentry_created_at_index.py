@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0013_embedding_provider'),
+    ]
+
+    operations = [
+        # Persistent embedding cache rows expire by age (EMBEDDING_CACHE_PERSISTENT_DAYS)
+        migrations.AlterField(
+            model_name='embeddingcacheentry',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0014_embeddingcacheentry_created_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemoryIndexState',
+            fields=[
+                ('memory_type', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('version', models.IntegerField(default=0)),
+                ('generation', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'assistant_memory_index_state',
+            },
+        ),
+    ]
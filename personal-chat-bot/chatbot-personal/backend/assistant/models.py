@@ -1,6 +1,88 @@
 from django.db import models
-# Temporarily using TextField instead of VectorField until pgvector is installed
-# from pgvector.django import VectorField
+
+
+class KnowledgeDocument(models.Model):
+    """
+    A source document of the knowledge base (e.g. the resume or a project write-up).
+    """
+    source = models.CharField(max_length=500, unique=True)  # Path relative to the backend directory
+    content_hash = models.CharField(max_length=64, blank=True)  # Hash of the whole file at last ingestion
+    size_bytes = models.BigIntegerField(default=0)
+    chunk_count = models.IntegerField(default=0)
+    token_count = models.IntegerField(default=0)
+    ingested_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'assistant_knowledge_document'
+        ordering = ['source']
+    
+    def __str__(self):
+        return self.source
+
+
+class KnowledgeBaseState(models.Model):
+    """
+    Single-row record of the knowledge base's version, read by request workers
+    instead of counting knowledge rows. Ingestion bumps the version whenever
+    chunks are added or removed.
+    """
+    STATUS_CHOICES = [
+        ('idle', 'Idle'),
+        ('ingesting', 'Ingesting'),
+        ('failed', 'Failed'),
+    ]
+    
+    version = models.IntegerField(default=0)
+    chunk_count = models.IntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='idle')  # Auto-ingestion job
+    embedding_model = models.CharField(max_length=100, null=True, blank=True)  # Provider that embedded the chunks
+    ingest_started_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'assistant_knowledge_base_state'
+    
+    def __str__(self):
+        return f"version {self.version} ({self.chunk_count} chunks, {self.status})"
+    
+    @classmethod
+    def load(cls):
+        """
+        Get the state row, creating it if needed.
+        """
+        state, _ = cls.objects.get_or_create(pk=1)
+        return state
+
+
+class MemoryIndexState(models.Model):
+    """
+    Per memory type change counters, read by every worker's in-process vector
+    index (see services/vector_index.py) to notice rows written or deleted by
+    other processes.
+    """
+    memory_type = models.CharField(max_length=20, primary_key=True)
+    version = models.IntegerField(default=0)  # Bumped when rows are added
+    generation = models.IntegerField(default=0)  # Bumped when rows are deleted or re-embedded
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'assistant_memory_index_state'
+    
+    def __str__(self):
+        return f"{self.memory_type}: version {self.version}, generation {self.generation}"
+
+
+class AssistantMemoryQuerySet(models.QuerySet):
+    def with_embeddings(self):
+        """
+        Load the embedding column too (deferred by default; only search needs it).
+        """
+        return self.defer(None)
+
+
+class AssistantMemoryManager(models.Manager.from_queryset(AssistantMemoryQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().defer('embedding')
 
 
 class AssistantMemory(models.Model):
@@ -9,17 +91,64 @@ class AssistantMemory(models.Model):
         ('memory', 'Memory'),
     ]
     
+    ROLE_CHOICES = [
+        ('user', 'User'),
+        ('assistant', 'Assistant'),
+        ('summary', 'Summary'),  # Compacted earlier turns, see services/retention.py
+    ]
+    
     id = models.AutoField(primary_key=True)
     content = models.TextField()
-    embedding = models.TextField(null=True, blank=True)  # Temporary: store as JSON string
-    # embedding = VectorField(dimensions=1536, null=True, blank=True)  # Will use this when pgvector is ready
+    embedding = models.BinaryField(null=True, blank=True)  # Binary, see services/vector_codec.py
+    embedding_model = models.CharField(max_length=100, null=True, blank=True)  # Provider name, see services/embedding_providers.py
+    embedding_dimensions = models.PositiveIntegerField(null=True, blank=True)
     type = models.CharField(max_length=20, choices=MEMORY_TYPE_CHOICES)
+    role = models.CharField(max_length=20, choices=ROLE_CHOICES, null=True, blank=True)  # Chat messages and summaries only
+    conversation_id = models.CharField(max_length=64, null=True, blank=True)  # Chat messages only, see services/conversations.py
+    content_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)  # Knowledge chunks only
+    document = models.ForeignKey(
+        KnowledgeDocument,
+        on_delete=models.CASCADE,
+        related_name='chunks',
+        null=True,
+        blank=True
+    )  # Knowledge chunks only
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = AssistantMemoryManager()
+    
     class Meta:
         db_table = 'assistant_memory'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['type', 'created_at'], name='assistant_memory_type_created'),
+            models.Index(fields=['conversation_id', 'created_at'], name='assistant_memory_conv_created'),
+        ]
     
     def __str__(self):
         return f"{self.type}: {self.content[:50]}..."
+    
+    def as_transcript(self) -> str:
+        """
+        Content as a transcript line ("User: ..."), used when chat memory is put in a prompt.
+        """
+        if self.role:
+            return f"{self.get_role_display()}: {self.content}"
+        return self.content
+
+
 
+class EmbeddingCacheEntry(models.Model):
+    """
+    Persistent tier of the embedding cache, keyed by a hash of (model, normalized text).
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    model = models.CharField(max_length=100)
+    embedding = models.BinaryField()  # Same encoding as AssistantMemory.embedding
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)  # Expiry, see EMBEDDING_CACHE_PERSISTENT_DAYS
+    
+    class Meta:
+        db_table = 'assistant_embedding_cache'
+    
+    def __str__(self):
+        return f"{self.model}: {self.key}"
@@ -1,9 +1,11 @@
 from rest_framework import serializers
 from assistant.models import AssistantMemory
+from assistant.services.conversations import CONVERSATION_ID_PATTERN
 
 
 class ChatRequestSerializer(serializers.Serializer):
     message = serializers.CharField(required=True, max_length=2000)
+    conversation_id = serializers.RegexField(CONVERSATION_ID_PATTERN, required=False)
 
 
 class ChatResponseSerializer(serializers.Serializer):
@@ -12,11 +14,14 @@ class ChatResponseSerializer(serializers.Serializer):
         child=serializers.CharField(),
         required=False
     )
+    cached = serializers.BooleanField(required=False, default=False)
+    prompt_tokens = serializers.IntegerField(required=False, default=0)
+    conversation_id = serializers.CharField(required=False)
 
 
 class MemorySerializer(serializers.ModelSerializer):
     class Meta:
         model = AssistantMemory
-        fields = ['id', 'content', 'type', 'created_at']
+        fields = ['id', 'content', 'type', 'role', 'created_at']
         read_only_fields = ['id', 'created_at']
 
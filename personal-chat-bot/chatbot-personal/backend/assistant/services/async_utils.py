@@ -0,0 +1,23 @@
+"""
+Helpers for calling blocking code (ORM, numpy search) from async views.
+"""
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def run_sync(func, *args, **kwargs):
+    """
+    Run a blocking function in a worker thread and await its result.
+
+    Unlike the default sync_to_async, calls are not serialized onto one
+    thread, so several of them can run concurrently under asyncio.gather.
+    Each worker thread releases its database connection afterwards
+    (subject to CONN_MAX_AGE).
+    """
+    def call():
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(call, thread_sensitive=False)()
@@ -0,0 +1,197 @@
+"""
+Token-aware chunking that respects section, block and sentence boundaries.
+
+Text is split into sections by headings (ALL-CAPS lines such as "EDUCATION"
+or Markdown "# Title" lines) and sections into blocks separated by blank
+lines (a resume entry, a paragraph). Blocks that fit the token budget are
+kept whole; longer blocks are split into lines (bullets) and long lines into
+sentences. These units are packed greedily into chunks of at most
+`max_tokens` tokens, never crossing a section boundary, with the last
+`overlap_tokens` worth of whole units repeated at the start of the next
+chunk. Each chunk starts with its section heading, so retrieval keeps the
+context ("PROJECTS", "SKILLS") the chunk came from. Only a single sentence
+that is longer than the budget on its own is split, at word boundaries.
+"""
+import hashlib
+import re
+from assistant.services.tokens import count_tokens
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"\'(\[•])')
+WHITESPACE = re.compile(r'[ \t\f\v]+')
+MARKDOWN_HEADING = re.compile(r'^#{1,6}\s+(.+?)\s*#*$')
+
+
+def content_hash(text: str) -> str:
+    """
+    Hash of a chunk's text, used to detect unchanged chunks on re-ingestion.
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def parse_heading(line: str):
+    """
+    Get the heading text if a line is a section heading, otherwise None.
+
+    Headings are Markdown "#" lines and short ALL-CAPS lines without digits or colons.
+    """
+    match = MARKDOWN_HEADING.match(line)
+    if match:
+        return match.group(1)
+
+    letters = [char for char in line if char.isalpha()]
+    if (
+        letters
+        and len(line.split()) <= 5
+        and all(char.isupper() for char in letters)
+        and not any(char.isdigit() for char in line)
+        and ':' not in line
+    ):
+        return line
+    return None
+
+
+def split_blocks(lines):
+    """
+    Split lines of text into blocks of non-empty, whitespace-normalized lines.
+
+    Args:
+        lines: Iterable of lines (e.g. an open file), consumed lazily
+
+    Yields:
+        (section heading or None, block lines) tuples, each as soon as the block ends
+    """
+    heading = None
+    block = []
+
+    for raw_line in lines:
+        line = WHITESPACE.sub(' ', raw_line).strip()
+        line_heading = parse_heading(line) if line else None
+        if not line or line_heading:
+            if block:
+                yield heading, block
+                block = []
+            if line_heading:
+                heading = line_heading
+        else:
+            block.append(line)
+    if block:
+        yield heading, block
+
+
+def split_sentences(line: str) -> list:
+    """
+    Split a line into sentences.
+    """
+    return [sentence for sentence in SENTENCE_BOUNDARY.split(line) if sentence]
+
+
+def _split_words(text: str, max_tokens: int, model: str) -> list:
+    """
+    Split a single over-long unit into pieces of at most max_tokens, at word boundaries.
+    """
+    pieces = []
+    words = []
+    tokens = 0
+    for word in text.split(' '):
+        word_tokens = count_tokens(' ' + word, model)
+        if words and tokens + word_tokens > max_tokens:
+            pieces.append(' '.join(words))
+            words = []
+            tokens = 0
+        words.append(word)
+        tokens += word_tokens
+    if words:
+        pieces.append(' '.join(words))
+    return pieces
+
+
+def _block_units(block: list, budget: int, model: str) -> list:
+    """
+    Break a block into (text, tokens) units that each fit the budget, as coarsely as possible.
+    """
+    text = '\n'.join(block)
+    tokens = count_tokens(text, model)
+    if tokens <= budget:
+        return [(text, tokens)]
+
+    units = []
+    for line in block:
+        line_tokens = count_tokens(line, model)
+        if line_tokens <= budget:
+            units.append((line, line_tokens))
+            continue
+        for sentence in split_sentences(line):
+            sentence_tokens = count_tokens(sentence, model)
+            if sentence_tokens <= budget:
+                units.append((sentence, sentence_tokens))
+            else:
+                units.extend((piece, count_tokens(piece, model)) for piece in _split_words(sentence, budget, model))
+    return units
+
+
+def chunk_text(text: str, max_tokens: int = 200, overlap_tokens: int = 30, model: str = 'text-embedding-ada-002') -> list:
+    """
+    Split text into token-bounded chunks along section and sentence boundaries.
+
+    Args:
+        text: Text to chunk
+        max_tokens: Token budget per chunk, including the section heading
+            (line separators are not counted)
+        overlap_tokens: Tokens of whole trailing units repeated in the next chunk
+        model: Model whose tokenizer is used to count tokens
+
+    Returns:
+        List of text chunks
+    """
+    return list(iter_chunks(text.splitlines(), max_tokens, overlap_tokens, model))
+
+
+def iter_chunks(lines, max_tokens: int = 200, overlap_tokens: int = 30, model: str = 'text-embedding-ada-002'):
+    """
+    Streaming version of chunk_text: only the chunk being built is held in memory.
+
+    Args:
+        lines: Iterable of lines (e.g. an open file)
+        max_tokens: Token budget per chunk, including the section heading
+            (line separators are not counted)
+        overlap_tokens: Tokens of whole trailing units repeated in the next chunk
+        model: Model whose tokenizer is used to count tokens
+
+    Yields:
+        Text chunks
+    """
+    section = object()  # Sentinel: no section started yet
+    prefix = ''
+    budget = max_tokens
+    current = []
+    current_tokens = 0
+
+    for heading, block in split_blocks(lines):
+        if heading != section:
+            # Chunks never span two sections
+            if current:
+                yield prefix + '\n'.join(unit_text for unit_text, _ in current)
+            section = heading
+            prefix = f"{heading}\n" if heading else ''
+            budget = max(1, max_tokens - count_tokens(prefix, model))
+            current = []
+            current_tokens = 0
+
+        for unit, unit_tokens in _block_units(block, budget, model):
+            if current and current_tokens + unit_tokens > budget:
+                yield prefix + '\n'.join(unit_text for unit_text, _ in current)
+                # Carry trailing units into the next chunk as overlap
+                overlap = []
+                overlap_size = 0
+                for previous in reversed(current):
+                    if overlap_size + previous[1] > overlap_tokens or overlap_size + previous[1] + unit_tokens > budget:
+                        break
+                    overlap.insert(0, previous)
+                    overlap_size += previous[1]
+                current = overlap
+                current_tokens = overlap_size
+            current.append((unit, unit_tokens))
+            current_tokens += unit_tokens
+
+    if current:
+        yield prefix + '\n'.join(unit_text for unit_text, _ in current)
@@ -0,0 +1,55 @@
+"""
+Conversation keys for partitioning chat memory.
+
+Each chat message is stored with a conversation_id, and memory retrieval
+and chat history only look at the caller's conversation. Clients can send
+their own id (`conversation_id` in the request); otherwise a random id is
+kept in the Django session, so the browser chat keeps its conversation
+across page loads.
+"""
+import re
+import uuid
+
+SESSION_KEY = 'conversation_id'
+CONVERSATION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def validate_conversation_id(value: str) -> str:
+    """
+    Check a client-supplied conversation id.
+
+    Raises:
+        ValueError: If the id is not 1-64 letters, digits, '-' or '_'
+    """
+    if not CONVERSATION_ID_PATTERN.match(value or ''):
+        raise ValueError("Invalid conversation_id")
+    return value
+
+
+def get_conversation_id(request, supplied: str = None) -> str:
+    """
+    Get the conversation id for a request: the client-supplied one, or the
+    session's (created on first use).
+    """
+    if supplied:
+        return validate_conversation_id(supplied)
+
+    conversation_id = request.session.get(SESSION_KEY)
+    if not conversation_id:
+        conversation_id = uuid.uuid4().hex
+        request.session[SESSION_KEY] = conversation_id
+    return conversation_id
+
+
+async def aget_conversation_id(request, supplied: str = None) -> str:
+    """
+    Async version of get_conversation_id, for async views.
+    """
+    if supplied:
+        return validate_conversation_id(supplied)
+
+    conversation_id = await request.session.aget(SESSION_KEY)
+    if not conversation_id:
+        conversation_id = uuid.uuid4().hex
+        await request.session.aset(SESSION_KEY, conversation_id)
+    return conversation_id
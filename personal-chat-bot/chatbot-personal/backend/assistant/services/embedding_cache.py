@@ -0,0 +1,230 @@
+"""
+Content-addressed cache for embeddings.
+
+Entries are keyed by a SHA-256 of (model, normalized text). Lookups go to an
+in-memory LRU first (bounded by size and TTL), then to the persistent
+EmbeddingCacheEntry table, so repeated questions, redeploys and re-ingesting
+an unchanged resume do not pay for embeddings we already have.
+
+Persistent entries expire after EMBEDDING_CACHE_PERSISTENT_DAYS; expired rows
+are ignored on lookup and deleted by prune_persistent(), which the memory
+retention job (`manage.py compact_memory`) runs. Hits per tier, misses and
+the hit rate are exported on /metrics.
+"""
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import timedelta
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+from assistant.models import EmbeddingCacheEntry
+from assistant.services.metrics import registry
+from assistant.services.vector_codec import decode_embedding, encode_embedding
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text for cache keys: Unicode NFC and collapsed whitespace.
+    """
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def make_key(model: str, text: str) -> str:
+    """
+    Build the cache key for a (model, text) pair.
+    """
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache: in-memory LRU backed by a database table.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 86400, persistent: bool = True,
+                 persistent_days: float = 0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.persistent = persistent
+        self.persistent_days = persistent_days  # 0 keeps persistent entries forever
+        self._entries = OrderedDict()  # key -> (expires_at, embedding)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def _get_memory(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, embedding = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return embedding
+
+    def _set_memory(self, key: str, embedding: list):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _persistent_cutoff(self):
+        if self.persistent_days > 0:
+            return timezone.now() - timedelta(days=self.persistent_days)
+        return None
+
+    def get_many(self, model: str, texts: list) -> dict:
+        """
+        Look up several texts at once.
+
+        Args:
+            model: Embedding model name
+            texts: Texts to look up
+
+        Returns:
+            Dictionary mapping each cached text to its embedding; misses are omitted
+        """
+        found = {}
+        pending = {}
+        memory_hits = persistent_hits = 0
+        for text in texts:
+            key = make_key(model, text)
+            embedding = self._get_memory(key)
+            if embedding is not None:
+                found[text] = embedding
+                memory_hits += 1
+            else:
+                pending.setdefault(key, []).append(text)
+
+        if pending and self.persistent:
+            try:
+                rows = EmbeddingCacheEntry.objects.filter(key__in=list(pending))
+                cutoff = self._persistent_cutoff()
+                if cutoff is not None:
+                    rows = rows.filter(created_at__gte=cutoff)
+                rows = rows.values_list('key', 'embedding')
+                for key, embedding_data in rows:
+                    embedding = decode_embedding(embedding_data).tolist()
+                    self._set_memory(key, embedding)
+                    for text in pending.pop(key):
+                        found[text] = embedding
+                        persistent_hits += 1
+            except (DatabaseError, ValueError) as e:
+                print(f"Error reading embedding cache: {e}")
+
+        misses = sum(len(missed) for missed in pending.values())
+        with self._lock:
+            self.memory_hits += memory_hits
+            self.persistent_hits += persistent_hits
+            self.misses += misses
+        for tier, hits in (('memory', memory_hits), ('persistent', persistent_hits)):
+            if hits:
+                registry.increment(
+                    'embedding_cache_hits_total', {'tier': tier}, amount=hits,
+                    help_text='Embeddings served from the cache instead of the embedding API.'
+                )
+        if misses:
+            registry.increment(
+                'embedding_cache_misses_total', amount=misses,
+                help_text='Embedding cache lookups that needed the embedding API.'
+            )
+        return found
+
+    def get(self, model: str, text: str):
+        """
+        Look up one text; returns the embedding or None.
+        """
+        return self.get_many(model, [text]).get(text)
+
+    def set_many(self, model: str, embeddings: dict):
+        """
+        Store embeddings for several texts.
+
+        Args:
+            model: Embedding model name
+            embeddings: Dictionary mapping text to embedding
+        """
+        entries = []
+        for text, embedding in embeddings.items():
+            key = make_key(model, text)
+            self._set_memory(key, embedding)
+            entries.append(EmbeddingCacheEntry(key=key, model=model, embedding=encode_embedding(embedding, 'float32')))
+
+        if entries and self.persistent:
+            try:
+                # Overwrite on conflict, so an expired row that was re-embedded counts as fresh again
+                EmbeddingCacheEntry.objects.bulk_create(
+                    entries, update_conflicts=True, unique_fields=['key'], update_fields=['embedding', 'created_at']
+                )
+            except DatabaseError as e:
+                print(f"Error writing embedding cache: {e}")
+
+    def set(self, model: str, text: str, embedding: list):
+        """
+        Store the embedding for one text.
+        """
+        self.set_many(model, {text: embedding})
+
+    def prune_persistent(self, batch_size: int = 1000) -> int:
+        """
+        Delete persistent entries older than persistent_days, in batches.
+
+        Returns:
+            Number of rows deleted
+        """
+        cutoff = self._persistent_cutoff()
+        if cutoff is None or not self.persistent:
+            return 0
+
+        deleted = 0
+        while True:
+            keys = list(
+                EmbeddingCacheEntry.objects.filter(created_at__lt=cutoff).values_list('key', flat=True)[:batch_size]
+            )
+            if not keys:
+                break
+            deleted += EmbeddingCacheEntry.objects.filter(key__in=keys).delete()[0]
+        if deleted:
+            registry.increment(
+                'embedding_cache_pruned_total', amount=deleted,
+                help_text='Expired persistent embedding cache rows deleted.'
+            )
+        return deleted
+
+    def clear(self):
+        """Drop the in-memory tier (the persistent table is left alone)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters since process start.
+        """
+        hits = self.memory_hits + self.persistent_hits
+        lookups = hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'persistent_hits': self.persistent_hits,
+            'misses': self.misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'size': len(self._entries),
+        }
+
+
+embedding_cache = EmbeddingCache(
+    max_size=settings.EMBEDDING_CACHE_SIZE,
+    ttl_seconds=settings.EMBEDDING_CACHE_TTL,
+    persistent=settings.EMBEDDING_CACHE_PERSISTENT,
+    persistent_days=settings.EMBEDDING_CACHE_PERSISTENT_DAYS,
+)
+registry.register_gauge(
+    'embedding_cache_hit_rate', lambda: embedding_cache.stats()['hit_rate'],
+    help_text='Share of embedding cache lookups that were hits since the process started.'
+)
@@ -0,0 +1,160 @@
+"""
+Embedding providers.
+
+EMBEDDING_PROVIDER selects how text is embedded:
+
+- 'openai': EMBEDDING_MODEL over the OpenAI API (the default).
+- 'hashing': a hashed n-gram encoder that runs in-process on the CPU. Words,
+  word pairs and character trigrams are hashed into HASHING_EMBEDDING_DIMENSIONS
+  buckets with a random sign (the "hashing trick"), weighted by log term
+  frequency and normalized. A query embeds in well under a millisecond with
+  no network access; it matches shared wording rather than meaning, so
+  retrieval is coarser than with the OpenAI model.
+
+Vectors of different providers live in different spaces. Every stored
+vector records its provider's name (AssistantMemory.embedding_model) and
+dimensions, and search only compares vectors of the active provider.
+"""
+import math
+import re
+import threading
+import unicodedata
+import zlib
+from abc import ABC, abstractmethod
+from collections import Counter
+import numpy as np
+from django.conf import settings
+from assistant.services.async_utils import run_sync
+from assistant.services.openai_client import get_async_client, get_client
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+_lock = threading.Lock()
+_provider = None
+_provider_key = None
+
+
+class EmbeddingProvider(ABC):
+    """
+    Turns texts into vectors.
+
+    Attributes:
+        name: Stored with every vector; vectors are only compared with
+            vectors of the same name
+        dimensions: Vector length
+        remote: Whether embedding needs network calls (results are then
+            cached, batched and retried)
+    """
+    name = ''
+    dimensions = 0
+    remote = True
+
+    @abstractmethod
+    def embed(self, texts: list, timeout: float = None, max_retries: int = None) -> list:
+        """
+        Embed texts, returning one vector (list of floats) per text, in order.
+        """
+
+    async def aembed(self, texts: list, timeout: float = None, max_retries: int = None) -> list:
+        """
+        Async version of embed (runs embed in a worker thread unless overridden).
+        """
+        return await run_sync(self.embed, texts, timeout, max_retries)
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """
+    Embeddings from the OpenAI API.
+    """
+    remote = True
+
+    def __init__(self, model: str, dimensions: int):
+        self.name = model
+        self.dimensions = dimensions
+
+    @staticmethod
+    def _options(timeout, max_retries) -> dict:
+        return {key: value for key, value in (('timeout', timeout), ('max_retries', max_retries)) if value is not None}
+
+    def embed(self, texts: list, timeout: float = None, max_retries: int = None) -> list:
+        client = get_client()
+        options = self._options(timeout, max_retries)
+        if options:
+            client = client.with_options(**options)
+        response = client.embeddings.create(model=self.name, input=texts)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    async def aembed(self, texts: list, timeout: float = None, max_retries: int = None) -> list:
+        client = get_async_client()
+        options = self._options(timeout, max_retries)
+        if options:
+            client = client.with_options(**options)
+        response = await client.embeddings.create(model=self.name, input=texts)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Local hashed n-gram encoder (see the module docstring).
+    """
+    remote = False
+    VERSION = 'v1'  # Bump when the features or hashing change, so old vectors are not mixed in
+    WEIGHTS = {'w': 1.0, 'b': 1.0, 'c': 0.5}  # words, word pairs, character trigrams
+
+    def __init__(self, dimensions: int):
+        self.name = f"hashing-ngram-{self.VERSION}-{dimensions}"
+        self.dimensions = dimensions
+
+    @staticmethod
+    def features(text: str) -> Counter:
+        """
+        Count the word, word pair and character trigram features of a text.
+        """
+        words = TOKEN_PATTERN.findall(unicodedata.normalize('NFKC', text).lower())
+        features = Counter(f"w:{word}" for word in words)
+        features.update(f"b:{first} {second}" for first, second in zip(words, words[1:]))
+        for word in words:
+            padded = f"<{word}>"
+            features.update(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        return features
+
+    def embed_one(self, text: str) -> list:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature, count in self.features(text).items():
+            # crc32 is stable across processes (unlike hash()); bit 0 is the sign
+            digest = zlib.crc32(feature.encode('utf-8'))
+            sign = -1.0 if digest & 1 else 1.0
+            vector[(digest >> 1) % self.dimensions] += sign * self.WEIGHTS[feature[0]] * (1 + math.log(count))
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector.tolist()
+
+    def embed(self, texts: list, timeout: float = None, max_retries: int = None) -> list:
+        return [self.embed_one(text) for text in texts]
+
+    async def aembed(self, texts: list, timeout: float = None, max_retries: int = None) -> list:
+        # Fast enough to run on the event loop
+        return self.embed(texts)
+
+
+def get_provider() -> EmbeddingProvider:
+    """
+    Get the provider selected by settings.EMBEDDING_PROVIDER.
+    """
+    global _provider, _provider_key
+
+    key = (
+        settings.EMBEDDING_PROVIDER, settings.EMBEDDING_MODEL,
+        settings.EMBEDDING_DIMENSIONS, settings.HASHING_EMBEDDING_DIMENSIONS,
+    )
+    if _provider_key != key:
+        with _lock:
+            if key[0] == 'openai':
+                provider = OpenAIEmbeddingProvider(settings.EMBEDDING_MODEL, settings.EMBEDDING_DIMENSIONS)
+            elif key[0] == 'hashing':
+                provider = HashingEmbeddingProvider(settings.HASHING_EMBEDDING_DIMENSIONS)
+            else:
+                raise ValueError(f"Unknown EMBEDDING_PROVIDER: {key[0]} (expected 'openai' or 'hashing')")
+            _provider, _provider_key = provider, key
+    return _provider
@@ -1,35 +1,196 @@
-import os
-from openai import OpenAI
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+import openai
 from django.conf import settings
+from assistant.services.async_utils import run_sync
+from assistant.services.embedding_cache import embedding_cache
+from assistant.services.embedding_providers import EmbeddingProvider, get_provider
+from assistant.services.metrics import span
+from assistant.services.tokens import count_tokens
+from assistant.services.vector_codec import encode_embedding
 
+# Errors worth retrying: rate limits, timeouts, connection resets and 5xx responses
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
 
-def get_embedding(text: str) -> list:
+
+def get_embedding(text: str, timeout: float = None) -> list:
     """
-    Generate embedding for text using OpenAI API.
+    Generate embedding for text with the configured embedding provider.
+    Results of remote providers are served from the embedding cache when available.
     
     Args:
         text: Text to embed
+        timeout: Request timeout in seconds (without retries); None for the client default
         
     Returns:
         List of floats representing the embedding vector
     """
-    # Get API key - try multiple sources
-    api_key = settings.OPENAI_API_KEY
-    if not api_key:
-        # Try loading from environment directly
-        api_key = os.getenv('OPENAI_API_KEY', '')
+    provider = get_provider()
+    if provider.remote:
+        cached = embedding_cache.get(provider.name, text)
+        if cached is not None:
+            return cached
     
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not set in environment variables. Please check your .env file.")
+    try:
+        with span('embedding'):
+            embedding = provider.embed([text], timeout=timeout, max_retries=0 if timeout is not None else None)[0]
+    except Exception as e:
+        raise Exception(f"Error generating embedding: {str(e)}")
+    
+    if provider.remote:
+        embedding_cache.set(provider.name, text, embedding)
+    return embedding
+
+
+async def aget_embedding(text: str, timeout: float = None) -> list:
+    """
+    Async version of get_embedding, for use from async views.
     
-    client = OpenAI(api_key=api_key)
+    Args:
+        text: Text to embed
+        timeout: Request timeout in seconds (without retries); None for the client default
+        
+    Returns:
+        List of floats representing the embedding vector
+    """
+    provider = get_provider()
+    if provider.remote:
+        cached = await run_sync(embedding_cache.get, provider.name, text)
+        if cached is not None:
+            return cached
     
     try:
-        response = client.embeddings.create(
-            model="text-embedding-ada-002",
-            input=text
-        )
-        return response.data[0].embedding
+        with span('embedding'):
+            embedding = (await provider.aembed(
+                [text], timeout=timeout, max_retries=0 if timeout is not None else None
+            ))[0]
     except Exception as e:
         raise Exception(f"Error generating embedding: {str(e)}")
+    
+    if provider.remote:
+        await run_sync(embedding_cache.set, provider.name, text, embedding)
+    return embedding
 
+
+def embedding_fields(embedding) -> dict:
+    """
+    AssistantMemory fields for a vector of the configured provider.
+    
+    Args:
+        embedding: Embedding vector, or None
+    
+    Returns:
+        Dictionary with embedding (encoded), embedding_model and embedding_dimensions
+    """
+    if embedding is None:
+        return {'embedding': None, 'embedding_model': None, 'embedding_dimensions': None}
+    return {
+        'embedding': encode_embedding(embedding),
+        'embedding_model': get_provider().name,
+        'embedding_dimensions': len(embedding),
+    }
+
+
+def split_batches(texts: list, max_inputs: int, max_tokens: int) -> list:
+    """
+    Split texts into batches bounded by input count and total token count.
+    
+    Args:
+        texts: Texts to split
+        max_inputs: Maximum number of texts per batch
+        max_tokens: Maximum total tokens per batch (a single longer text gets its own batch)
+    
+    Returns:
+        List of lists of texts, in the original order
+    """
+    batches = []
+    batch = []
+    batch_tokens = 0
+    
+    for text in texts:
+        tokens = count_tokens(text, settings.EMBEDDING_MODEL)
+        if batch and (len(batch) >= max_inputs or batch_tokens + tokens > max_tokens):
+            batches.append(batch)
+            batch = []
+            batch_tokens = 0
+        batch.append(text)
+        batch_tokens += tokens
+    
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _embed_batch(provider: EmbeddingProvider, texts: list) -> list:
+    """
+    Embed one batch in a single request, retrying transient errors with backoff.
+    """
+    for attempt in range(settings.EMBEDDING_MAX_RETRIES + 1):
+        try:
+            with span('embedding'):
+                # This loop owns the retry policy, so disable the client's built-in retries
+                return provider.embed(texts, max_retries=0)
+        except RETRYABLE_ERRORS as e:
+            if attempt == settings.EMBEDDING_MAX_RETRIES:
+                raise Exception(f"Error generating embeddings after {attempt + 1} attempts: {str(e)}")
+            # Exponential backoff with jitter: ~1s, 2s, 4s, ...
+            delay = settings.EMBEDDING_RETRY_BASE_DELAY * (2 ** attempt) * (0.5 + random.random())
+            print(f"Embedding batch failed ({str(e)}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+        except Exception as e:
+            raise Exception(f"Error generating embeddings: {str(e)}")
+
+
+def get_embeddings(texts: list) -> list:
+    """
+    Generate embeddings for many texts with the configured embedding provider.
+    
+    For remote providers, cached texts are skipped; the rest are split into
+    batches by input count and token budget, and batches are sent concurrently.
+    Local providers embed everything in-process.
+    
+    Args:
+        texts: Texts to embed
+    
+    Returns:
+        List of embedding vectors in the same order as texts
+    """
+    if not texts:
+        return []
+    
+    provider = get_provider()
+    unique_texts = list(dict.fromkeys(texts))
+    if not provider.remote:
+        with span('embedding'):
+            results = dict(zip(unique_texts, provider.embed(unique_texts)))
+        return [results[text] for text in texts]
+    
+    results = embedding_cache.get_many(provider.name, unique_texts)
+    missing = [text for text in unique_texts if text not in results]
+    
+    if missing:
+        batches = split_batches(
+            missing,
+            max_inputs=settings.EMBEDDING_BATCH_MAX_INPUTS,
+            max_tokens=settings.EMBEDDING_BATCH_MAX_TOKENS
+        )
+        workers = max(1, min(settings.EMBEDDING_CONCURRENCY, len(batches)))
+        
+        if workers == 1:
+            # No thread pool needed (this also works during interpreter shutdown)
+            batch_embeddings = [_embed_batch(provider, batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                batch_embeddings = list(executor.map(lambda batch: _embed_batch(provider, batch), batches))
+        
+        for batch, embeddings in zip(batches, batch_embeddings):
+            batch_results = dict(zip(batch, embeddings))
+            embedding_cache.set_many(provider.name, batch_results)
+            results.update(batch_results)
+    
+    return [results[text] for text in texts]
@@ -1,36 +1,5 @@
-import os
-import json
 from pathlib import Path
-from django.conf import settings
-from assistant.models import AssistantMemory
-from assistant.services.embeddings import get_embedding
-
-
-def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> list:
-    """
-    Split text into overlapping chunks.
-    
-    Args:
-        text: Text to chunk
-        chunk_size: Size of each chunk in characters
-        overlap: Number of characters to overlap between chunks
-        
-    Returns:
-        List of text chunks
-    """
-    chunks = []
-    start = 0
-    
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end].strip()
-        
-        if chunk:
-            chunks.append(chunk)
-        
-        start = end - overlap
-    
-    return chunks
+from assistant.services.ingestion import clean_lines, ingest_paths
 
 
 def clean_text(text: str) -> str:
@@ -41,67 +10,46 @@ def clean_text(text: str) -> str:
         text: Raw text from PDF
         
     Returns:
-        Cleaned text
+        Cleaned text, one line per line of content; blank lines between
+        blocks are kept because the chunker uses them as boundaries
     """
-    # Remove excessive whitespace
-    lines = text.split('\n')
-    cleaned_lines = []
-    
-    for line in lines:
-        line = line.strip()
-        if line:
-            cleaned_lines.append(line)
-    
-    return ' '.join(cleaned_lines)
+    return '\n'.join(clean_lines(text.split('\n'))).strip()
 
 
-def ingest_resume():
+def get_resume_path() -> Path:
     """
-    Read resume.txt, chunk it, generate embeddings, and store in database.
-    Clears existing knowledge entries before ingesting.
+    Get the path of the resume document.
     """
-    # Get path to resume.txt
     base_dir = Path(__file__).resolve().parent.parent
-    resume_path = base_dir / 'resume.txt'
+    return base_dir / 'resume.txt'
+
+
+def ingest_resume() -> dict:
+    """
+    Ingest resume.txt into the knowledge base through the ingestion pipeline.
+    
+    Only new or changed chunks are embedded and inserted, and only chunks
+    that disappeared from the resume are deleted (see services/ingestion.py).
+    
+    Returns:
+        Ingestion report with 'added', 'deleted' and 'unchanged' chunk counts
+    """
+    resume_path = get_resume_path()
     
     if not resume_path.exists():
         raise FileNotFoundError(f"Resume file not found at {resume_path}")
     
-    # Read resume text
-    with open(resume_path, 'r', encoding='utf-8') as f:
-        resume_text = f.read()
-    
-    if not resume_text.strip():
+    if not resume_path.read_text(encoding='utf-8').strip():
         raise ValueError("Resume file is empty. Please add your CV content to resume.txt")
     
-    # Clean text
-    cleaned_text = clean_text(resume_text)
-    
-    # Chunk text
-    chunks = chunk_text(cleaned_text)
-    
-    if not chunks:
+    report = ingest_paths([resume_path], workers=1)
+    if report['failed']:
+        raise ValueError("Resume ingestion failed")
+    if not report['chunks']:
         raise ValueError("No chunks generated from resume text")
     
-    # Clear existing knowledge entries
-    AssistantMemory.objects.filter(type='knowledge').delete()
-    print(f"Cleared existing knowledge entries. Ingesting {len(chunks)} chunks...")
-    
-    # Generate embeddings and store (as JSON string for now, until pgvector is ready)
-    for i, chunk in enumerate(chunks, 1):
-        try:
-            embedding = get_embedding(chunk)
-            # Store embedding as JSON string (will convert to vector later)
-            embedding_json = json.dumps(embedding)
-            AssistantMemory.objects.create(
-                content=chunk,
-                embedding=embedding_json,
-                type='knowledge'
-            )
-            print(f"Processed chunk {i}/{len(chunks)}")
-        except Exception as e:
-            print(f"Error processing chunk {i}: {str(e)}")
-            continue
-    
-    print(f"Successfully ingested {len(chunks)} chunks into the knowledge base.")
-
+    print(
+        f"Knowledge base updated: {report['added']} chunks added, "
+        f"{report['deleted']} removed, {report['unchanged']} unchanged."
+    )
+    return report
@@ -0,0 +1,331 @@
+"""
+Streaming ingestion pipeline for knowledge base documents.
+
+Documents (the resume, portfolio write-ups, project READMEs, ...) are given
+as files, directories or glob patterns and flow through
+
+    read lines -> clean -> chunk -> batch-embed -> bulk-insert
+
+as generators, so at most one section of text per worker is held in
+memory regardless of document size; only the rows of new chunks are kept
+until the document is written. Several documents are processed
+concurrently by a pool of worker threads.
+
+Each document is tracked as a KnowledgeDocument. Unchanged files (same
+file hash) are skipped right after hashing them; for changed
+files only chunks with a new hash are embedded and inserted, and chunks
+that disappeared are deleted once the document has been fully processed.
+All new chunks are embedded before any write, then inserted together with
+the stale-chunk delete in one short transaction, so no transaction is held
+open across embedding requests and a failure partway through leaves the
+document's previous chunks untouched.
+
+Chunks embedded by another embedding provider never count as unchanged:
+after switching EMBEDDING_PROVIDER, re-ingesting a document re-embeds all
+of its chunks and deletes the old ones, so a document's vectors always come
+from a single provider.
+"""
+import glob
+import hashlib
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from django.conf import settings
+from django.db import connection, transaction
+from assistant.models import AssistantMemory, KnowledgeDocument
+from assistant.services.chunking import content_hash, iter_chunks
+from assistant.services.embedding_providers import get_provider
+from assistant.services.embeddings import embedding_fields, get_embeddings
+from assistant.services.knowledge_base import record_ingestion
+from assistant.services.pgvector_search import store_vectors
+from assistant.services.response_cache import response_cache
+from assistant.services.tokens import count_tokens
+from assistant.services.vector_index import record_write
+
+DOCUMENT_EXTENSIONS = ('.txt', '.md', '.markdown', '.rst')
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def iter_document_paths(targets):
+    """
+    Expand files, directories and glob patterns into document paths.
+
+    Args:
+        targets: Iterable of paths or glob patterns (e.g. 'docs/**/*.md')
+
+    Yields:
+        Each matching file once, in sorted order per target
+    """
+    seen = set()
+    for target in targets:
+        target = str(target)
+        if glob.has_magic(target):
+            matches = (Path(match) for match in sorted(glob.glob(target, recursive=True)))
+        elif os.path.isdir(target):
+            matches = (
+                path for path in sorted(Path(target).rglob('*'))
+                if path.suffix.lower() in DOCUMENT_EXTENSIONS
+            )
+        else:
+            matches = [Path(target)]
+
+        for path in matches:
+            resolved = path.resolve()
+            if resolved.is_file() and resolved not in seen:
+                seen.add(resolved)
+                yield resolved
+
+
+def source_name(path: Path) -> str:
+    """
+    Name a document by its path relative to the backend directory (absolute if outside it).
+    """
+    try:
+        return Path(path).resolve().relative_to(Path(settings.BASE_DIR).resolve()).as_posix()
+    except ValueError:
+        return Path(path).resolve().as_posix()
+
+
+def file_hash(path: Path, salt: str = '') -> str:
+    """
+    Hash a file in fixed-size blocks without reading it into memory.
+    """
+    digest = hashlib.sha256(salt.encode('utf-8'))
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def clean_lines(lines):
+    """
+    Normalize whitespace within lines and collapse runs of blank lines.
+
+    Args:
+        lines: Iterable of raw lines
+
+    Yields:
+        Cleaned lines; a single empty line marks each block boundary
+    """
+    previous_blank = True
+    for line in lines:
+        line = ' '.join(line.split())
+        if line:
+            yield line
+            previous_blank = False
+        elif not previous_blank:
+            yield line
+            previous_blank = True
+
+
+def _document_chunks(document: KnowledgeDocument, embedding_model: str):
+    """
+    Get a document's chunk ids by hash, leaving out chunks of another embedding provider.
+
+    Returns:
+        ({hash: [ids]} of the current provider's chunks, ids of other providers' chunks)
+    """
+    existing = {}
+    foreign_ids = []
+    for chunk_hash, memory_id, chunk_model in document.chunks.values_list('content_hash', 'id', 'embedding_model'):
+        if chunk_model == embedding_model:
+            existing.setdefault(chunk_hash, []).append(memory_id)
+        else:
+            foreign_ids.append(memory_id)
+    return existing, foreign_ids
+
+
+def _embed_chunks(batch: list) -> list:
+    """
+    Embed a batch of (hash, chunk) pairs in one request.
+
+    Returns:
+        Unsaved knowledge rows, one per chunk
+    """
+    embeddings = get_embeddings([chunk for _, chunk in batch])
+    return [
+        AssistantMemory(content=chunk, **embedding_fields(embedding), type='knowledge', content_hash=chunk_hash)
+        for (chunk_hash, chunk), embedding in zip(batch, embeddings)
+    ]
+
+
+def ingest_document(path: Path, force: bool = False) -> dict:
+    """
+    Sync one document with the knowledge base.
+
+    Args:
+        path: Document file
+        force: Re-chunk the document even if the file hash is unchanged
+
+    Returns:
+        Dictionary with the document's source, whether it was 'skipped', and
+        'chunks', 'tokens', 'added', 'deleted' and 'unchanged' counts
+    """
+    source = source_name(path)
+    stats = {'source': source, 'skipped': False, 'chunks': 0, 'tokens': 0, 'added': 0, 'deleted': 0, 'unchanged': 0}
+
+    # Changing the chunking settings or embedding provider also counts as a change
+    embedding_model = get_provider().name
+    digest = file_hash(path, salt=f"{settings.CHUNK_MAX_TOKENS}:{settings.CHUNK_OVERLAP_TOKENS}:{embedding_model}")
+    document = KnowledgeDocument.objects.filter(source=source).first()
+    if document and document.content_hash == digest and not force:
+        stats.update(skipped=True, chunks=document.chunk_count, tokens=document.token_count, unchanged=document.chunk_count)
+        return stats
+
+    # Chunks of another embedding provider are left out, so they are re-embedded and then deleted as stale
+    existing = _document_chunks(document, embedding_model)[0] if document else {}
+    seen = set()
+    batch = []
+    new_rows = []
+
+    # Embed outside any transaction: the embedding requests are the slow part,
+    # and nothing is written until the whole document has been embedded
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        chunks = iter_chunks(
+            clean_lines(f),
+            max_tokens=settings.CHUNK_MAX_TOKENS,
+            overlap_tokens=settings.CHUNK_OVERLAP_TOKENS,
+            model=settings.EMBEDDING_MODEL
+        )
+        for chunk in chunks:
+            chunk_hash = content_hash(chunk)
+            if chunk_hash in seen:
+                continue
+            seen.add(chunk_hash)
+            stats['chunks'] += 1
+            stats['tokens'] += count_tokens(chunk, settings.EMBEDDING_MODEL)
+
+            if chunk_hash in existing:
+                continue
+            batch.append((chunk_hash, chunk))
+            if len(batch) >= settings.INGEST_BATCH_SIZE:
+                new_rows.extend(_embed_chunks(batch))
+                batch = []
+
+    if batch:
+        new_rows.extend(_embed_chunks(batch))
+
+    # One short transaction per document: new chunks become visible and stale ones
+    # disappear together, and a failure above leaves the previous chunks in place
+    with transaction.atomic():
+        document, _ = KnowledgeDocument.objects.get_or_create(source=source)
+        document = KnowledgeDocument.objects.select_for_update().get(pk=document.pk)
+        # Re-read under the lock, in case another run synced the document meanwhile
+        existing, foreign_ids = _document_chunks(document, embedding_model)
+        new_rows = [row for row in new_rows if row.content_hash not in existing]
+        for row in new_rows:
+            row.document = document
+        if new_rows:
+            memories = AssistantMemory.objects.bulk_create(new_rows, batch_size=settings.INGEST_BATCH_SIZE)
+            store_vectors(memories)
+            record_write(['knowledge'])
+
+        # Remove chunks that are no longer in the document, then record the new state
+        stale_ids = foreign_ids + [
+            memory_id
+            for chunk_hash, memory_ids in existing.items()
+            for memory_id in (memory_ids if chunk_hash not in seen else memory_ids[1:])
+        ]
+        if stale_ids:
+            AssistantMemory.objects.filter(id__in=stale_ids).delete()
+            record_write(['knowledge'], rebuild=True)
+        document.content_hash = digest
+        document.size_bytes = path.stat().st_size
+        document.chunk_count = stats['chunks']
+        document.token_count = stats['tokens']
+        document.save()
+    stats['added'] = len(new_rows)
+    stats['unchanged'] = stats['chunks'] - stats['added']
+    stats['deleted'] = len(stale_ids)
+    return stats
+
+
+def _ingest_document_task(path: Path, force: bool) -> dict:
+    try:
+        return ingest_document(path, force)
+    finally:
+        # Pool threads are short-lived, so release their connection explicitly
+        connection.close()
+
+
+def ingest_paths(targets, workers: int = None, force: bool = False, prune: bool = False) -> dict:
+    """
+    Ingest documents from files, directories or glob patterns.
+
+    Args:
+        targets: Paths or glob patterns to ingest
+        workers: Number of documents processed concurrently (default INGEST_WORKERS)
+        force: Re-chunk documents even if their file hash is unchanged
+        prune: Delete documents (and their chunks) that are not among the targets
+
+    Returns:
+        Report dictionary with document and chunk counts, elapsed seconds,
+        chunks_per_second, tokens_per_second and 'foreign' (knowledge chunks
+        left from another embedding provider, which search ignores)
+    """
+    workers = max(1, workers or settings.INGEST_WORKERS)
+    report = {
+        'documents': 0, 'skipped': 0, 'failed': 0,
+        'chunks': 0, 'tokens': 0, 'added': 0, 'deleted': 0, 'unchanged': 0,
+        'processed_chunks': 0, 'processed_tokens': 0,
+    }
+    sources = set()
+    started = time.perf_counter()
+
+    def collect(future, path):
+        try:
+            stats = future.result()
+        except Exception as e:
+            report['failed'] += 1
+            print(f"Error ingesting {path}: {str(e)}")
+            return
+        report['documents'] += 1
+        report['skipped'] += stats['skipped']
+        for key in ('chunks', 'tokens', 'added', 'deleted', 'unchanged'):
+            report[key] += stats[key]
+        if not stats['skipped']:
+            report['processed_chunks'] += stats['chunks']
+            report['processed_tokens'] += stats['tokens']
+            print(f"  {stats['source']}: {stats['chunks']} chunks ({stats['added']} added, {stats['deleted']} removed)")
+
+    # Keep a bounded number of documents in flight instead of queueing every path up front
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = {}
+        for path in iter_document_paths(targets):
+            sources.add(source_name(path))
+            if len(in_flight) >= workers * 2:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future, in_flight.pop(future))
+            in_flight[executor.submit(_ingest_document_task, path, force)] = path
+        for future, path in in_flight.items():
+            collect(future, path)
+
+    if prune:
+        pruned = KnowledgeDocument.objects.exclude(source__in=sources)
+        with transaction.atomic():
+            pruned_chunks = AssistantMemory.objects.filter(document__in=pruned).count()
+            pruned.delete()
+            if pruned_chunks:
+                record_write(['knowledge'], rebuild=True)
+        report['deleted'] += pruned_chunks
+
+    if report['added'] or report['deleted']:
+        response_cache.invalidate()
+    # Other workers notice the new version and clear their own caches
+    record_ingestion(changed=bool(report['added'] or report['deleted']))
+
+    # Chunks of documents that were not re-ingested may still come from another embedding provider
+    report['foreign'] = AssistantMemory.objects.filter(type='knowledge').exclude(
+        embedding_model=get_provider().name
+    ).count()
+
+    # Throughput counts the documents that were actually chunked (not skipped ones)
+    elapsed = time.perf_counter() - started
+    report.update(
+        elapsed=elapsed,
+        chunks_per_second=report['processed_chunks'] / elapsed if elapsed else 0.0,
+        tokens_per_second=report['processed_tokens'] / elapsed if elapsed else 0.0,
+    )
+    return report
@@ -0,0 +1,201 @@
+"""
+Knowledge base version record and background auto-ingestion.
+
+Request workers read the single KnowledgeBaseState row (version and chunk
+count) at most once every KB_STATE_CHECK_INTERVAL seconds instead of
+counting knowledge rows, and never ingest inline:
+
+- If the knowledge base is empty, the resume is ingested by a background
+  thread. Only one process runs it: the job is claimed with a conditional
+  UPDATE of the state row's status, which succeeds for exactly one caller;
+  a claim older than AUTO_INGEST_LOCK_TIMEOUT counts as abandoned.
+- Ingestion (automatic or `manage.py ingest_resume`) bumps the version when
+  chunks change. A worker that sees a new version drops its response cache
+  and in-process vector index, so answers from the old resume are not reused.
+- The state also records which embedding provider embedded the chunks. After
+  switching EMBEDDING_PROVIDER the knowledge base counts as empty (its vectors
+  cannot be searched) until it has been re-embedded.
+"""
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+from assistant.models import AssistantMemory, KnowledgeBaseState
+from assistant.services.embedding_providers import get_provider
+from assistant.services.response_cache import response_cache
+from assistant.services.vector_index import invalidate_index
+
+_lock = threading.Lock()
+_state = None
+_checked_at = 0.0
+_seen_version = None
+_auto_ingest_thread = None
+_auto_ingest_started_at = 0.0
+
+
+def get_state(refresh: bool = False) -> dict:
+    """
+    Get the knowledge base state, re-read from the database at most every
+    KB_STATE_CHECK_INTERVAL seconds.
+
+    Args:
+        refresh: Read the database now
+
+    Returns:
+        Dictionary with 'version', 'chunk_count', 'status' and 'embedding_model'
+    """
+    global _state, _checked_at
+
+    now = time.monotonic()
+    if not refresh and _state is not None and now - _checked_at < settings.KB_STATE_CHECK_INTERVAL:
+        return _state
+
+    fields = ('version', 'chunk_count', 'status', 'embedding_model')
+    state = KnowledgeBaseState.objects.filter(pk=1).values(*fields).first()
+    if state is None:
+        load = KnowledgeBaseState.load()
+        state = {field: getattr(load, field) for field in fields}
+
+    with _lock:
+        _state = state
+        _checked_at = now
+    _apply_version(state['version'])
+    return state
+
+
+def is_searchable(state: dict) -> bool:
+    """
+    Check whether the knowledge base has chunks embedded by the active embedding provider.
+    """
+    return state['chunk_count'] > 0 and state['embedding_model'] == get_provider().name
+
+
+def _apply_version(version: int):
+    """
+    Drop this process's caches when another process changed the knowledge base.
+    """
+    global _seen_version
+
+    with _lock:
+        previous = _seen_version
+        _seen_version = version
+    if previous is not None and version != previous:
+        print(f"[INFO] Knowledge base changed (version {previous} -> {version}); clearing caches.")
+        invalidate_index('knowledge')
+        response_cache.invalidate()
+
+
+def record_ingestion(changed: bool) -> int:
+    """
+    Update the state after an ingestion run.
+
+    Args:
+        changed: Whether chunks were added or removed (bumps the version)
+
+    Returns:
+        The new version
+    """
+    global _seen_version, _state
+
+    KnowledgeBaseState.load()
+    embedding_model = get_provider().name
+    updates = {
+        'chunk_count': AssistantMemory.objects.filter(type='knowledge', embedding_model=embedding_model).count(),
+        'embedding_model': embedding_model,
+    }
+    if changed:
+        updates['version'] = F('version') + 1
+    KnowledgeBaseState.objects.filter(pk=1).update(updated_at=timezone.now(), **updates)
+
+    # This process already cleared its own caches
+    version = KnowledgeBaseState.objects.values_list('version', flat=True).get(pk=1)
+    with _lock:
+        _seen_version = version
+        _state = None
+    return version
+
+
+def claim_ingestion() -> bool:
+    """
+    Claim the auto-ingestion job; True for exactly one caller across processes.
+    """
+    KnowledgeBaseState.load()
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.AUTO_INGEST_LOCK_TIMEOUT)
+    claimed = KnowledgeBaseState.objects.filter(
+        Q(pk=1) & (~Q(status='ingesting') | Q(ingest_started_at__lt=stale))
+    ).update(status='ingesting', ingest_started_at=now)
+    return claimed == 1
+
+
+def _auto_ingest():
+    try:
+        if not claim_ingestion():
+            return
+        # Another process may have finished ingesting before we claimed the job
+        if is_searchable(get_state(refresh=True)):
+            KnowledgeBaseState.objects.filter(pk=1).update(status='idle')
+            return
+
+        from assistant.services.ingest_resume import ingest_resume
+        print("[INFO] No resume knowledge for the current embedding provider. Ingesting resume in the background...")
+        try:
+            ingest_resume()
+        except Exception as e:
+            KnowledgeBaseState.objects.filter(pk=1).update(status='failed')
+            print(f"[WARNING] Could not auto-ingest resume: {str(e)}")
+            print("[INFO] Please run: python manage.py ingest_resume")
+            return
+        KnowledgeBaseState.objects.filter(pk=1).update(status='idle')
+        print("[INFO] Resume successfully ingested!")
+    except Exception as e:
+        print(f"[WARNING] Auto-ingestion job failed: {str(e)}")
+    finally:
+        connection.close()
+
+
+def schedule_auto_ingest() -> bool:
+    """
+    Start the background auto-ingestion job unless it is running in this
+    process or was started less than AUTO_INGEST_RETRY_INTERVAL seconds ago.
+
+    Returns:
+        True if the job was started by this call
+    """
+    global _auto_ingest_thread, _auto_ingest_started_at
+
+    now = time.monotonic()
+    with _lock:
+        if _auto_ingest_thread is not None and (
+            _auto_ingest_thread.is_alive() or now - _auto_ingest_started_at < settings.AUTO_INGEST_RETRY_INTERVAL
+        ):
+            return False
+        _auto_ingest_thread = threading.Thread(target=_auto_ingest, name='auto-ingest', daemon=True)
+        _auto_ingest_started_at = now
+    _auto_ingest_thread.start()
+    return True
+
+
+def ensure_ingested() -> bool:
+    """
+    Check that the knowledge base has content, without blocking the request.
+
+    If it is empty (or was embedded by another embedding provider) and
+    AUTO_INGEST_ENABLED is set, ingestion is started in the background; the
+    current request is answered without knowledge.
+
+    Returns:
+        True if the knowledge base has chunks of the active embedding provider
+    """
+    state = get_state()
+    if is_searchable(state):
+        return True
+    if settings.AUTO_INGEST_ENABLED and schedule_auto_ingest():
+        if state['chunk_count'] > 0:
+            print("[INFO] Knowledge base was embedded by another embedding provider; started background re-ingestion.")
+        else:
+            print("[INFO] Knowledge base is empty; started background ingestion.")
+    return False
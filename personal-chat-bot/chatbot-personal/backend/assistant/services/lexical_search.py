@@ -0,0 +1,86 @@
+"""
+Lexical (full-text) search over AssistantMemory.content.
+
+On PostgreSQL, queries run against the GIN index on
+to_tsvector('english', content) created by migration 0009, so matching
+exact terms (a company name, a technology) costs one index lookup and no
+embedding API call. Query terms are OR-ed together and results are ranked
+with ts_rank_cd, so rows matching more of the terms rank higher.
+
+Other databases (local development) fall back to counting matching terms
+in Python.
+"""
+import re
+from django.db import connection
+from assistant.models import AssistantMemory
+
+# Must match the expression of the GIN index in migration 0009
+TEXT_SEARCH_CONFIG = 'english'
+MAX_QUERY_TERMS = 32
+TERM_PATTERN = re.compile(r'\w+')
+
+
+def query_terms(query_text: str) -> list:
+    """
+    Extract distinct lowercase search terms from a query.
+    """
+    terms = dict.fromkeys(term.lower() for term in TERM_PATTERN.findall(query_text or '') if len(term) > 1)
+    return list(terms)[:MAX_QUERY_TERMS]
+
+
+def search(query_text: str, limit: int, memory_type: str = None, conversation_id: str = None) -> list:
+    """
+    Find the rows that best match the query terms.
+
+    Args:
+        query_text: Query text
+        limit: Maximum number of results to return
+        memory_type: Filter by type ('knowledge' or 'memory'), None for both
+        conversation_id: Only search this conversation's chat messages
+
+    Returns:
+        List of (memory_id, rank) tuples, best match first
+    """
+    terms = query_terms(query_text)
+    if not terms or limit <= 0:
+        return []
+
+    if connection.vendor == 'postgresql':
+        return _search_postgres(terms, limit, memory_type, conversation_id)
+    return _search_python(terms, limit, memory_type, conversation_id)
+
+
+def _search_postgres(terms: list, limit: int, memory_type: str = None, conversation_id: str = None) -> list:
+    type_filter = "AND type = %s" if memory_type else ""
+    params = [' | '.join(terms)] + ([memory_type] if memory_type else [])
+    if conversation_id:
+        type_filter += " AND conversation_id = %s"
+        params.append(conversation_id)
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT id, ts_rank_cd(to_tsvector('{TEXT_SEARCH_CONFIG}', content), query) AS rank
+            FROM assistant_memory, to_tsquery('{TEXT_SEARCH_CONFIG}', %s) AS query
+            WHERE to_tsvector('{TEXT_SEARCH_CONFIG}', content) @@ query {type_filter}
+            ORDER BY rank DESC, id DESC
+            LIMIT %s;
+        """, params)
+        return [(memory_id, float(rank)) for memory_id, rank in cursor.fetchall()]
+
+
+def _search_python(terms: list, limit: int, memory_type: str = None, conversation_id: str = None) -> list:
+    rows = AssistantMemory.objects.all()
+    if memory_type:
+        rows = rows.filter(type=memory_type)
+    if conversation_id:
+        rows = rows.filter(conversation_id=conversation_id)
+
+    scored = []
+    for memory_id, content in rows.values_list('id', 'content').iterator():
+        words = set(term.lower() for term in TERM_PATTERN.findall(content))
+        score = sum(1 for term in terms if term in words)
+        if score:
+            scored.append((memory_id, float(score)))
+
+    scored.sort(key=lambda item: (item[1], item[0]), reverse=True)
+    return scored[:limit]
@@ -1,83 +1,177 @@
-import json
-from openai import OpenAI
+import asyncio
+import time
 from django.conf import settings
-from assistant.services.vector_search import get_relevant_context
-from assistant.services.embeddings import get_embedding
-from assistant.models import AssistantMemory
+from assistant.services.async_utils import run_sync
+from assistant.services.openai_client import get_async_client, get_client
+from assistant.services.vector_search import get_recent_memories, hybrid_search, search_context
+from assistant.services.embeddings import aget_embedding, get_embedding
+from assistant.services.knowledge_base import ensure_ingested
+from assistant.services.memory_writer import memory_writer
+from assistant.services.metrics import record_stage, registry, span
+from assistant.services.prompt_builder import build_context
+from assistant.services.retention import start_retention_task
+from assistant.services.tokens import count_message_tokens
+from assistant.services.response_cache import response_cache
 
 
-# Check if resume has been ingested (cache to avoid checking on every request)
-_resume_ingested_check = None
+# Number of knowledge chunks and conversation memories retrieved per question
+# (the prompt builder then keeps what fits settings.PROMPT_CONTEXT_TOKENS)
+KNOWLEDGE_LIMIT = 10
+MEMORY_LIMIT = 3
 
-def _ensure_resume_ingested():
-    """Check if resume knowledge base exists, if not try to ingest it."""
-    global _resume_ingested_check
+
+def _store_user_message(user_message: str, user_embedding: list, conversation_id: str = None):
+    """
+    Queue user message for the background memory writer, with its embedding
+    if there is one (the writer embeds messages that come without).
+    """
+    memory_writer.submit(user_message, embedding=user_embedding, role='user', conversation_id=conversation_id)
+
+
+def _embed_query(user_message: str):
+    """
+    Embed the user message once per chat turn (None if embedding fails).
+    The same vector is used for the response cache, storage and retrieval.
+    """
+    # Starts background ingestion if the knowledge base is empty (never ingests inline)
+    ensure_ingested()
+    start_retention_task()
+    
+    try:
+        return get_embedding(user_message, timeout=settings.QUERY_EMBEDDING_TIMEOUT)
+    except Exception as e:
+        print(f"Error generating query embedding: {str(e)}")
+        return None
+
+
+async def _aembed_query(user_message: str):
+    """
+    Async version of _embed_query.
+    """
+    await run_sync(ensure_ingested)
+    start_retention_task()
+    
+    try:
+        return await aget_embedding(user_message, timeout=settings.QUERY_EMBEDDING_TIMEOUT)
+    except Exception as e:
+        print(f"Error generating query embedding: {str(e)}")
+        return None
+
+
+def _cached_response(user_message: str, user_embedding, conversation_id: str = None):
+    """
+    Answer from the semantic response cache if a similar question was answered before.
     
-    # Check once per process
-    if _resume_ingested_check is not None:
-        return _resume_ingested_check
+    Returns:
+        Result dictionary on a cache hit, otherwise None
+    """
+    if user_embedding is None or not settings.RESPONSE_CACHE_ENABLED:
+        return None
     
-    knowledge_count = AssistantMemory.objects.filter(type='knowledge').count()
-    _resume_ingested_check = knowledge_count > 0
+    with span('cache_lookup'):
+        cached = response_cache.lookup(user_embedding, conversation_id)
+    if cached is None:
+        return None
     
-    if not _resume_ingested_check:
-        # Try to ingest resume automatically
-        try:
-            from assistant.services.ingest_resume import ingest_resume
-            print("[INFO] No resume knowledge found. Attempting to ingest resume...")
-            ingest_resume()
-            _resume_ingested_check = True
-            print("[INFO] Resume successfully ingested!")
-        except Exception as e:
-            print(f"[WARNING] Could not auto-ingest resume: {str(e)}")
-            print("[INFO] Please run: python manage.py ingest_resume")
-            _resume_ingested_check = False
+    # Keep the conversation history complete
+    _store_user_message(user_message, user_embedding, conversation_id)
+    _store_assistant_response(cached['response'], conversation_id)
     
-    return _resume_ingested_check
+    return {
+        'response': cached['response'],
+        'relevant_knowledge': cached['relevant_knowledge'],
+        'prompt_tokens': 0,
+        'cached': True,
+    }
 
 
-def generate_response(user_message: str) -> dict:
+def _cache_response(user_embedding, result: dict, cache_version: int, context: dict, conversation_id: str = None):
     """
-    Generate AI assistant response using RAG (Retrieval Augmented Generation).
-    Also stores user message and assistant response with embeddings.
+    Remember a freshly generated answer in the semantic response cache.
+    
+    An answer whose prompt included chat memory is only reused within the same
+    conversation, so one visitor's messages never reach another visitor.
+    """
+    if user_embedding is not None and settings.RESPONSE_CACHE_ENABLED:
+        scope = conversation_id if context['memory'] else None
+        response_cache.store(user_embedding, result, version=cache_version, conversation_id=scope)
+
+
+def _prepare_chat(user_message: str, user_embedding, conversation_id: str = None) -> tuple:
+    """
+    Store the user message and build the RAG prompt for it.
     
     Args:
         user_message: User's question/message
+        user_embedding: Embedding of the user message (None if embedding failed)
+        conversation_id: Conversation the message belongs to (scopes chat memory)
         
     Returns:
-        Dictionary with 'response' and 'relevant_knowledge' keys
+        Tuple of (chat messages for the completion API, retrieved context)
     """
-    # Get API key - try multiple sources
-    api_key = settings.OPENAI_API_KEY
-    if not api_key:
-        # Try loading from environment directly
-        import os
-        api_key = os.getenv('OPENAI_API_KEY', '')
+    # Store user message with embedding; the same vector is reused for retrieval.
+    # Without one (the query embedding timed out) the memory writer embeds it later.
+    _store_user_message(user_message, user_embedding, conversation_id)
     
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not set in environment variables. Please check your .env file.")
+    # Get relevant context from hybrid search - increase knowledge limit to get more resume content
+    results = search_context(
+        user_message,
+        knowledge_limit=KNOWLEDGE_LIMIT,
+        memory_limit=MEMORY_LIMIT,
+        query_embedding=user_embedding,
+        embed_if_missing=False,
+        conversation_id=conversation_id
+    )
     
-    client = OpenAI(api_key=api_key)
+    return _build_prompt(user_message, results['knowledge'], results['memory'])
+
+
+async def _aprepare_chat(user_message: str, user_embedding, conversation_id: str = None) -> tuple:
+    """
+    Async version of _prepare_chat: knowledge and memory are searched concurrently.
+    """
+    _store_user_message(user_message, user_embedding, conversation_id)
     
-    # Ensure resume is ingested before generating response
-    _ensure_resume_ingested()
+    # Hybrid search; without an embedding this is full-text search only
+    knowledge_results, memory_results = await asyncio.gather(
+        run_sync(hybrid_search, user_message, KNOWLEDGE_LIMIT, 'knowledge', query_embedding=user_embedding),
+        run_sync(
+            hybrid_search, user_message, MEMORY_LIMIT, 'memory',
+            query_embedding=user_embedding, conversation_id=conversation_id
+        ),
+    )
     
-    # Store user message with embedding
-    try:
-        user_embedding = get_embedding(user_message)
-        user_embedding_json = json.dumps(user_embedding)
-        AssistantMemory.objects.create(
-            content=f"User: {user_message}",
-            embedding=user_embedding_json,
-            type='memory'
-        )
-    except Exception as e:
-        # Log but don't fail
-        print(f"Error storing user message: {str(e)}")
+    # Fall back to recent items when nothing matches
+    if not knowledge_results:
+        knowledge_results = await run_sync(get_recent_memories, 'knowledge', KNOWLEDGE_LIMIT)
+    if not memory_results:
+        memory_results = await run_sync(get_recent_memories, 'memory', MEMORY_LIMIT, conversation_id)
     
-    # Get relevant context from vector search - increase knowledge limit to get more resume content
-    context = get_relevant_context(user_message, knowledge_limit=10, memory_limit=3)
+    return _build_prompt(user_message, knowledge_results, memory_results)
+
+
+def _build_prompt(user_message: str, knowledge_items: list, memory_items: list) -> tuple:
+    """
+    Fit the retrieved rows into the prompt token budget and build the chat messages.
     
+    Returns:
+        Tuple of (chat messages, context dictionary from build_context plus 'prompt_tokens')
+    """
+    with span('prompt_build'):
+        context = build_context(knowledge_items, memory_items)
+        messages = _build_messages(user_message, context)
+        context['prompt_tokens'] = count_message_tokens(messages, settings.CHAT_MODEL)
+    registry.increment(
+        'chat_prompt_tokens_total', amount=context['prompt_tokens'],
+        help_text='Prompt tokens sent to the chat model.'
+    )
+    return messages, context
+
+
+def _build_messages(user_message: str, context: dict) -> list:
+    """
+    Build the chat messages (system + user prompt) from the retrieved context.
+    """
     # Build prompt with context
     knowledge_text = "\n\n".join([f"{i+1}. {k}" for i, k in enumerate(context['knowledge'])])
     memory_text = "\n".join([f"- {m}" for m in context['memory']])
@@ -100,36 +194,260 @@ Answer questions accurately, helpfully, and in a professional manner based on th
 
 Provide a comprehensive and accurate answer based primarily on the CV/resume knowledge base above. If you cannot find specific information, acknowledge that politely but provide what you can from the available information."""
     
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def _store_assistant_response(assistant_response: str, conversation_id: str = None):
+    """
+    Queue assistant response for the background memory writer, which embeds it.
+    """
+    memory_writer.submit(assistant_response, role='assistant', conversation_id=conversation_id)
+
+
+def generate_response(user_message: str, conversation_id: str = None) -> dict:
+    """
+    Generate AI assistant response using RAG (Retrieval Augmented Generation).
+    The user message and assistant response are stored with embeddings by the
+    background memory writer, so the reply does not wait on that bookkeeping.
+    
+    Args:
+        user_message: User's question/message
+        conversation_id: Conversation the message belongs to; chat memory is
+            stored under it and only this conversation's memory is retrieved
+        
+    Returns:
+        Dictionary with 'response', 'relevant_knowledge' and 'prompt_tokens'
+        keys, plus 'cached': True when the answer came from the response cache
+    """
+    client = get_client()
+    user_embedding = _embed_query(user_message)
+    
+    cached = _cached_response(user_message, user_embedding, conversation_id)
+    if cached is not None:
+        return cached
+    
+    cache_version = response_cache.version
+    messages, context = _prepare_chat(user_message, user_embedding, conversation_id)
+    
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7,
-            max_tokens=500
-        )
+        with span('completion'):
+            response = client.chat.completions.create(
+                model=settings.CHAT_MODEL,
+                messages=messages,
+                temperature=settings.CHAT_TEMPERATURE,
+                max_tokens=settings.CHAT_MAX_TOKENS
+            )
         
         assistant_response = response.choices[0].message.content
         
         # Store assistant response with embedding (always store responses)
-        try:
-            assistant_embedding = get_embedding(assistant_response)
-            assistant_embedding_json = json.dumps(assistant_embedding)
-            AssistantMemory.objects.create(
-                content=f"Assistant: {assistant_response}",
-                embedding=assistant_embedding_json,
-                type='memory'
-            )
-        except Exception as e:
-            # Log error but don't fail the request
-            print(f"Error storing assistant response: {str(e)}")
+        _store_assistant_response(assistant_response, conversation_id)
         
-        return {
+        result = {
             'response': assistant_response,
             'relevant_knowledge': context['knowledge'],
+            'prompt_tokens': context['prompt_tokens'],
         }
+        _cache_response(user_embedding, result, cache_version, context, conversation_id)
+        return result
+    except Exception as e:
+        raise Exception(f"Error generating response: {str(e)}")
+
+
+def _done_event(result: dict, started: float, first_token_at) -> dict:
+    """
+    Build the final stream event and record the request's timings in the metrics registry.
+    """
+    total_ms = (time.perf_counter() - started) * 1000
+    ttft_ms = (first_token_at - started) * 1000 if first_token_at is not None else total_ms
+    labels = {'cached': str(result.get('cached', False)).lower()}
+    registry.observe(
+        'chat_stream_first_token_seconds', ttft_ms / 1000, labels,
+        help_text='Time from a streamed chat request to its first answer token, in seconds.'
+    )
+    registry.observe(
+        'chat_stream_seconds', total_ms / 1000, labels,
+        help_text='Total time of a streamed chat request, in seconds.'
+    )
+    
+    return {
+        'event': 'done',
+        'relevant_knowledge': result['relevant_knowledge'],
+        'cached': result.get('cached', False),
+        'prompt_tokens': result.get('prompt_tokens', 0),
+        'time_to_first_token_ms': round(ttft_ms, 1),
+        'total_ms': round(total_ms, 1),
+    }
+
+
+def stream_response(user_message: str, conversation_id: str = None):
+    """
+    Generate AI assistant response as a stream of events.
+    
+    The assistant response is handed to the background memory writer after
+    the stream ends, so embedding and storing it never delays the client.
+    
+    Args:
+        user_message: User's question/message
+        conversation_id: Conversation the message belongs to (see generate_response)
+        
+    Yields:
+        Event dictionaries: {'event': 'token', 'content': ...} for each piece
+        of the answer, then {'event': 'done', ...} with the relevant knowledge
+        and timings, or {'event': 'error', 'error': ...} on failure
+    """
+    started = time.perf_counter()
+    first_token_at = None
+    
+    try:
+        client = get_client()
+        user_embedding = _embed_query(user_message)
+        
+        cached = _cached_response(user_message, user_embedding, conversation_id)
+        if cached is not None:
+            yield {'event': 'token', 'content': cached['response']}
+            yield _done_event(cached, started, None)
+            return
+        
+        cache_version = response_cache.version
+        messages, context = _prepare_chat(user_message, user_embedding, conversation_id)
+        
+        completion_started = time.perf_counter()
+        stream = client.chat.completions.create(
+            model=settings.CHAT_MODEL,
+            messages=messages,
+            temperature=settings.CHAT_TEMPERATURE,
+            max_tokens=settings.CHAT_MAX_TOKENS,
+            stream=True
+        )
+        
+        parts = []
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                parts.append(content)
+                yield {'event': 'token', 'content': content}
+        record_stage('completion', time.perf_counter() - completion_started)
+    except Exception as e:
+        yield {'event': 'error', 'error': f"Error generating response: {str(e)}"}
+        return
+    
+    assistant_response = ''.join(parts)
+    _store_assistant_response(assistant_response, conversation_id)
+    
+    result = {
+        'response': assistant_response,
+        'relevant_knowledge': context['knowledge'],
+        'prompt_tokens': context['prompt_tokens'],
+    }
+    _cache_response(user_embedding, result, cache_version, context, conversation_id)
+    yield _done_event(result, started, first_token_at)
+
+
+async def agenerate_response(user_message: str, conversation_id: str = None) -> dict:
+    """
+    Async version of generate_response, for use from async (ASGI) views.
+    
+    Args:
+        user_message: User's question/message
+        conversation_id: Conversation the message belongs to; chat memory is
+            stored under it and only this conversation's memory is retrieved
+        
+    Returns:
+        Dictionary with 'response', 'relevant_knowledge' and 'prompt_tokens'
+        keys, plus 'cached': True when the answer came from the response cache
+    """
+    client = get_async_client()
+    user_embedding = await _aembed_query(user_message)
+    
+    cached = _cached_response(user_message, user_embedding, conversation_id)
+    if cached is not None:
+        return cached
+    
+    cache_version = response_cache.version
+    messages, context = await _aprepare_chat(user_message, user_embedding, conversation_id)
+    
+    try:
+        with span('completion'):
+            response = await client.chat.completions.create(
+                model=settings.CHAT_MODEL,
+                messages=messages,
+                temperature=settings.CHAT_TEMPERATURE,
+                max_tokens=settings.CHAT_MAX_TOKENS
+            )
+        assistant_response = response.choices[0].message.content
     except Exception as e:
         raise Exception(f"Error generating response: {str(e)}")
+    
+    _store_assistant_response(assistant_response, conversation_id)
+    
+    result = {
+        'response': assistant_response,
+        'relevant_knowledge': context['knowledge'],
+        'prompt_tokens': context['prompt_tokens'],
+    }
+    _cache_response(user_embedding, result, cache_version, context, conversation_id)
+    return result
 
+
+async def astream_response(user_message: str, conversation_id: str = None):
+    """
+    Async version of stream_response; yields the same events.
+    """
+    started = time.perf_counter()
+    first_token_at = None
+    
+    try:
+        client = get_async_client()
+        user_embedding = await _aembed_query(user_message)
+        
+        cached = _cached_response(user_message, user_embedding, conversation_id)
+        if cached is not None:
+            yield {'event': 'token', 'content': cached['response']}
+            yield _done_event(cached, started, None)
+            return
+        
+        cache_version = response_cache.version
+        messages, context = await _aprepare_chat(user_message, user_embedding, conversation_id)
+        
+        completion_started = time.perf_counter()
+        stream = await client.chat.completions.create(
+            model=settings.CHAT_MODEL,
+            messages=messages,
+            temperature=settings.CHAT_TEMPERATURE,
+            max_tokens=settings.CHAT_MAX_TOKENS,
+            stream=True
+        )
+        
+        parts = []
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                parts.append(content)
+                yield {'event': 'token', 'content': content}
+        record_stage('completion', time.perf_counter() - completion_started)
+    except Exception as e:
+        yield {'event': 'error', 'error': f"Error generating response: {str(e)}"}
+        return
+    
+    assistant_response = ''.join(parts)
+    _store_assistant_response(assistant_response, conversation_id)
+    
+    result = {
+        'response': assistant_response,
+        'relevant_knowledge': context['knowledge'],
+        'prompt_tokens': context['prompt_tokens'],
+    }
+    _cache_response(user_embedding, result, cache_version, context, conversation_id)
+    yield _done_event(result, started, first_token_at)
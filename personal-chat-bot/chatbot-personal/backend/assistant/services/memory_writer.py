@@ -0,0 +1,188 @@
+"""
+Write-behind queue for conversation memory.
+
+Chat requests hand their memory rows to a background worker thread instead
+of embedding and inserting them inline. The worker collects rows until a
+batch is full or the flush interval passes, embeds the rows that still need
+an embedding in one batched API call, and writes the batch with a single
+bulk_create. Pending rows are drained when the process exits.
+
+submit never blocks, so it is safe to call from async code on the event
+loop: when the queue is full (the database or embedding API has fallen far
+behind), the row is dropped, logged and counted in
+memory_writer_dropped_total instead of stalling the request.
+"""
+import atexit
+import queue
+import threading
+import time
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from assistant.models import AssistantMemory
+from assistant.services.embeddings import embedding_fields, get_embeddings
+from assistant.services.metrics import registry, span
+from assistant.services.pgvector_search import store_vectors
+from assistant.services.vector_index import record_write
+
+_STOP = object()
+
+
+class MemoryWriter:
+    """
+    Background writer that batches memory embeddings and inserts.
+    """
+
+    def __init__(self, batch_size: int = 32, flush_interval: float = 1.0, max_queue_size: int = 1000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.failed = 0
+        self.dropped = 0
+        atexit.register(self.shutdown)
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='memory-writer', daemon=True)
+                    self._thread.start()
+
+    def submit(self, content: str, memory_type: str = 'memory', embedding: list = None, role: str = None,
+               conversation_id: str = None) -> bool:
+        """
+        Queue a memory row for writing, or drop it if the queue is full.
+
+        Args:
+            content: Text to store
+            memory_type: 'memory' or 'knowledge'
+            embedding: Precomputed embedding; computed by the worker when omitted
+            role: 'user' or 'assistant' for chat messages
+            conversation_id: Conversation the chat message belongs to
+
+        Returns:
+            True if the row was queued
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait({
+                'content': content,
+                'type': memory_type,
+                'embedding': embedding,
+                'role': role,
+                'conversation_id': conversation_id,
+            })
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                dropped = self.dropped
+            registry.increment('memory_writer_dropped_total', help_text='Memory rows dropped because the write queue was full')
+            # Log the first drop and then every 100th, so an overload does not flood the log
+            if dropped == 1 or dropped % 100 == 0:
+                print(f"[WARNING] Memory write queue is full; dropped {role or memory_type} row ({dropped} dropped so far)")
+            return False
+        return True
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+
+            # Collect a batch until it is full or the flush interval has passed
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            try:
+                with span('persistence'):
+                    self._write_batch(batch)
+            finally:
+                for _ in range(len(batch) + stop):
+                    self._queue.task_done()
+                close_old_connections()
+
+            if stop:
+                return
+
+    def _write_batch(self, batch: list):
+        """
+        Embed rows that need it (one batched request) and insert them in one query.
+        """
+        pending = [item for item in batch if item['embedding'] is None]
+        if pending:
+            try:
+                embeddings = get_embeddings([item['content'] for item in pending])
+                for item, embedding in zip(pending, embeddings):
+                    item['embedding'] = embedding
+            except Exception as e:
+                # Keep the rows (e.g. for chat history) even without embeddings
+                print(f"Error generating memory embeddings: {str(e)}")
+
+        try:
+            with transaction.atomic():
+                memories = AssistantMemory.objects.bulk_create([
+                    AssistantMemory(
+                        content=item['content'],
+                        **embedding_fields(item['embedding']),
+                        type=item['type'],
+                        role=item['role'],
+                        conversation_id=item['conversation_id']
+                    )
+                    for item in batch
+                ])
+                store_vectors(memories)
+                record_write(item['type'] for item in batch if item['embedding'] is not None)
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"Error writing {len(batch)} memories: {str(e)}")
+
+    def flush(self):
+        """
+        Block until every queued row has been written.
+        """
+        if self._thread is not None:
+            self._queue.join()
+
+    def shutdown(self, timeout: float = 10.0):
+        """
+        Drain the queue and stop the worker thread, waiting at most timeout seconds in total.
+        """
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            # Waits for room behind the pending rows, but never longer than the timeout
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            print(f"[WARNING] Memory writer did not drain within {timeout}s; {self._queue.qsize()} rows pending")
+            return
+        thread.join(max(0.0, deadline - time.monotonic()))
+        if thread.is_alive():
+            print(f"[WARNING] Memory writer did not drain within {timeout}s; {self._queue.qsize()} rows pending")
+
+
+memory_writer = MemoryWriter(
+    batch_size=settings.MEMORY_WRITE_BATCH_SIZE,
+    flush_interval=settings.MEMORY_WRITE_FLUSH_INTERVAL,
+    max_queue_size=settings.MEMORY_WRITE_QUEUE_SIZE,
+)
@@ -0,0 +1,292 @@
+"""
+Latency metrics for the chat pipeline.
+
+Code paths are wrapped in spans:
+
+    with span('embedding'):
+        ...
+
+Each span records its duration in the `chat_stage_seconds` histogram
+(labelled by stage) and, while a request is being handled, adds it to that
+request's timings, which TimingMiddleware returns as a Server-Timing header.
+Histograms keep the last METRICS_WINDOW_SIZE observations for p50/p95/p99
+plus running totals, and are exposed in the Prometheus text format at
+/metrics.
+
+Stages: embedding (embedding API calls), cache_lookup (semantic response
+cache), db_fetch (loading rows and embeddings), decode (decoding stored
+embeddings), similarity (numpy index or pgvector query), lexical_search,
+prompt_build, completion (the whole stream when streaming) and persistence
+(memory writer batches, off the request path).
+
+Database queries run while a request is handled (including in the threads
+of async views) are counted per request as well and reported as the `db`
+Server-Timing entry and the `http_request_db_queries` histogram.
+
+Other modules register gauges read at render time (e.g. cache hit rates).
+
+Metrics live in process memory, so with several workers each worker reports
+its own numbers.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+import numpy as np
+from django.conf import settings
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+class Histogram:
+    """
+    Observations of one metric: running count and sum, plus a sliding window
+    of recent values for quantiles.
+    """
+
+    def __init__(self, window_size: int = 2048):
+        self._lock = threading.Lock()
+        self._window = deque(maxlen=window_size)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        with self._lock:
+            self._window.append(value)
+            self.count += 1
+            self.sum += value
+
+    def quantiles(self, quantiles=QUANTILES) -> dict:
+        """
+        Quantiles over the recent window (empty if nothing was observed).
+        """
+        with self._lock:
+            values = np.fromiter(self._window, dtype=np.float64, count=len(self._window))
+        if not len(values):
+            return {}
+        return dict(zip(quantiles, np.quantile(values, quantiles).tolist()))
+
+
+class MetricsRegistry:
+    """
+    Histograms and counters keyed by metric name and label values.
+    """
+
+    def __init__(self, window_size: int = 2048):
+        self.window_size = window_size
+        self._lock = threading.Lock()
+        self._histograms = {}   # (name, labels) -> Histogram
+        self._counters = {}     # (name, labels) -> float
+        self._gauges = {}       # name -> callable returning the current value
+        self._help = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted((labels or {}).items()))
+
+    def observe(self, name: str, value: float, labels: dict = None, help_text: str = ''):
+        """
+        Record an observation (seconds for timings) in a histogram.
+        """
+        key = self._key(name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(self.window_size))
+                self._help.setdefault(name, help_text)
+        histogram.observe(value)
+
+    def increment(self, name: str, labels: dict = None, amount: float = 1, help_text: str = ''):
+        """
+        Increase a counter.
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            self._help.setdefault(name, help_text)
+
+    def register_gauge(self, name: str, read, help_text: str = ''):
+        """
+        Expose a value computed when metrics are rendered (e.g. a cache's hit rate).
+
+        Args:
+            name: Metric name
+            read: Callable returning the current value
+            help_text: Metric description
+        """
+        with self._lock:
+            self._gauges[name] = read
+            self._help[name] = help_text
+
+    def summary(self, name: str) -> dict:
+        """
+        Count, mean and quantiles per label set of a histogram, e.g. for logging.
+        """
+        with self._lock:
+            items = [(labels, histogram) for (key, labels), histogram in self._histograms.items() if key == name]
+        return {
+            labels: {
+                'count': histogram.count,
+                'mean': histogram.sum / histogram.count if histogram.count else 0.0,
+                **{f"p{int(q * 100)}": value for q, value in histogram.quantiles().items()},
+            }
+            for labels, histogram in items
+        }
+
+    def render_prometheus(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format
+        (histograms as summaries with p50/p95/p99 quantiles).
+        """
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            help_texts = dict(self._help)
+
+        lines = []
+        described = set()
+
+        def describe(name, metric_type):
+            if name not in described:
+                described.add(name)
+                if help_texts.get(name):
+                    lines.append(f"# HELP {name} {help_texts[name]}")
+                lines.append(f"# TYPE {name} {metric_type}")
+
+        for (name, labels), histogram in histograms:
+            describe(name, 'summary')
+            for quantile, value in histogram.quantiles().items():
+                lines.append(f"{name}{_format_labels(labels + (('quantile', str(quantile)),))} {value:.6f}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        for (name, labels), value in counters:
+            describe(name, 'counter')
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+        for name, read in gauges:
+            try:
+                value = float(read())
+            except Exception as e:
+                print(f"Error reading metric {name}: {e}")
+                continue
+            describe(name, 'gauge')
+            lines.append(f"{name} {value:g}")
+
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ''
+    escaped = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{key}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+class RequestTimings:
+    """
+    Total time per stage within one request, for the Server-Timing header.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.queries = 0
+        self.query_seconds = 0.0
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add_query(self, seconds: float):
+        with self._lock:
+            self.queries += 1
+            self.query_seconds += seconds
+
+    def server_timing(self, total: float = None) -> str:
+        """
+        Format as a Server-Timing header value (durations in milliseconds).
+        """
+        with self._lock:
+            entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items()]
+            entries.append(f'db;dur={self.query_seconds * 1000:.1f};desc="{self.queries} queries"')
+        if total is not None:
+            entries.append(f"total;dur={total * 1000:.1f}")
+        return ', '.join(entries)
+
+
+registry = MetricsRegistry(window_size=settings.METRICS_WINDOW_SIZE)
+
+# Timings of the request being handled (copied into threads used by run_sync)
+_current_timings = ContextVar('request_timings', default=None)
+
+
+def start_request() -> tuple:
+    """
+    Start collecting stage timings for the current request.
+
+    Returns:
+        Tuple of (RequestTimings, token for end_request)
+    """
+    timings = RequestTimings()
+    return timings, _current_timings.set(timings)
+
+
+def end_request(token):
+    _current_timings.reset(token)
+
+
+def record_stage(stage: str, seconds: float):
+    """
+    Record a stage duration in the histogram and in the current request's timings.
+    """
+    registry.observe(
+        'chat_stage_seconds', seconds, {'stage': stage},
+        help_text='Time spent in each stage of the chat pipeline, in seconds.'
+    )
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+def count_queries(execute, sql, params, many, context):
+    """
+    Database execute wrapper that adds each query to the current request's timings.
+    """
+    timings = _current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(time.perf_counter() - started)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """
+    connection_created handler: count the queries of every new connection.
+    """
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+@contextmanager
+def span(stage: str):
+    """
+    Time a block of code as a pipeline stage.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
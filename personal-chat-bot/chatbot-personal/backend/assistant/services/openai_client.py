@@ -0,0 +1,102 @@
+"""
+Process-wide OpenAI clients with pooled HTTP connections.
+
+Building a new OpenAI client per call throws away HTTP keep-alive and TLS
+session reuse. The embedding and completion services share the clients
+returned here instead. The sync client is safe to use from multiple threads;
+async code gets one client per event loop, since httpx connection pools are
+bound to the loop that created them.
+
+Set OPENAI_BASE_URL to point the app at a local stub server (e.g. for benchmarks).
+"""
+import asyncio
+import os
+import threading
+import weakref
+import httpx
+from openai import AsyncOpenAI, OpenAI
+from django.conf import settings
+
+_client = None
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncOpenAI
+_lock = threading.Lock()
+
+
+def get_api_key() -> str:
+    """
+    Get the OpenAI API key from settings or the environment.
+    """
+    # Get API key - try multiple sources
+    api_key = settings.OPENAI_API_KEY
+    if not api_key:
+        # Try loading from environment directly
+        api_key = os.getenv('OPENAI_API_KEY', '')
+
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY not set in environment variables. Please check your .env file.")
+
+    return api_key
+
+
+def _client_options() -> dict:
+    return {
+        'api_key': get_api_key(),
+        'base_url': settings.OPENAI_BASE_URL or None,
+        'max_retries': settings.OPENAI_MAX_RETRIES,
+    }
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(settings.OPENAI_TIMEOUT, connect=settings.OPENAI_CONNECT_TIMEOUT)
+
+
+def get_client() -> OpenAI:
+    """
+    Get the shared synchronous OpenAI client, creating it on first use.
+    """
+    global _client
+
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = OpenAI(
+                    http_client=httpx.Client(limits=_limits(), timeout=_timeout()),
+                    **_client_options()
+                )
+    return _client
+
+
+def get_async_client() -> AsyncOpenAI:
+    """
+    Get the shared AsyncOpenAI client for the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncOpenAI(
+            http_client=httpx.AsyncClient(limits=_limits(), timeout=_timeout()),
+            **_client_options()
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def reset_clients():
+    """
+    Close the shared sync client and forget all clients (e.g. after settings change).
+    """
+    global _client
+
+    with _lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _async_clients.clear()
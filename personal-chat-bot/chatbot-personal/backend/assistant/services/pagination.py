@@ -0,0 +1,71 @@
+"""
+Keyset (cursor) pagination for chat history and memory listings.
+
+Pages are keyed on (created_at, id) rather than OFFSET, so fetching any page
+is an index range scan of `limit` rows no matter how many rows precede it.
+"""
+import base64
+from datetime import datetime
+from django.db.models import Q
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """
+    Encode a row's (created_at, id) position as an opaque cursor string.
+    """
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Decode a cursor back into (created_at, id).
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def paginate_before(queryset, limit: int, cursor: str = None) -> tuple:
+    """
+    Get the newest `limit` rows older than the cursor position.
+    
+    Args:
+        queryset: Rows to page through
+        limit: Page size
+        cursor: Cursor returned by the previous page, None for the newest page
+        
+    Returns:
+        Tuple of (rows newest first, cursor for the next older page or None)
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=row_id)
+        )
+    
+    # Fetch one extra row to learn whether another page exists
+    rows = list(queryset.order_by('-created_at', '-id')[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+def parse_limit(value, default: int, maximum: int) -> int:
+    """
+    Parse a page size query parameter, clamped to 1..maximum.
+    
+    Raises:
+        ValueError: If the value is not an integer
+    """
+    if value in (None, ''):
+        return default
+    return max(1, min(int(value), maximum))
@@ -0,0 +1,234 @@
+"""
+Vector similarity search inside PostgreSQL using pgvector.
+
+Migration 0002 adds an `embedding_vector vector(1536)` column with partial
+HNSW indexes per memory type when the pgvector extension is available.
+The binary `embedding` column stays the source of truth, so the numpy index
+keeps working on servers without pgvector. Code that writes embeddings
+mirrors them into the vector column with store_vectors (in the same
+transaction), so search only reads; backfill_vectors fills the column for
+rows written before it existed. Cosine top-k runs in SQL.
+
+The column's width is fixed at EMBEDDING_DIMENSIONS, so it only serves the
+OpenAI provider (see vector_search.use_pgvector); queries are also filtered
+on embedding_model so rows of another provider are never compared.
+"""
+from django.conf import settings
+from django.db import connection
+from assistant.services.embedding_providers import get_provider
+from assistant.services.metrics import span
+from assistant.services.vector_codec import decode_embedding
+
+VECTOR_COLUMN = 'embedding_vector'
+BACKFILL_BATCH_SIZE = 500
+
+_available = None
+
+
+def is_available() -> bool:
+    """
+    Check (once per process) whether the pgvector column exists.
+    """
+    global _available
+
+    if _available is None:
+        if connection.vendor != 'postgresql':
+            _available = False
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT EXISTS(
+                        SELECT 1 FROM information_schema.columns
+                        WHERE table_name = 'assistant_memory' AND column_name = %s
+                    );
+                """, [VECTOR_COLUMN])
+                _available = cursor.fetchone()[0]
+
+    return _available
+
+
+def create_vector_column():
+    """
+    Enable pgvector and create the vector column and HNSW indexes.
+
+    Migration 0002 does this automatically when pgvector is installed; this
+    is for servers where the extension was installed after migrating.
+    """
+    global _available
+
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+        cursor.execute(
+            f"ALTER TABLE assistant_memory ADD COLUMN IF NOT EXISTS {VECTOR_COLUMN} "
+            f"vector({settings.EMBEDDING_DIMENSIONS});"
+        )
+        for memory_type in ('knowledge', 'memory'):
+            cursor.execute(f"""
+                CREATE INDEX IF NOT EXISTS assistant_memory_{memory_type}_hnsw
+                ON assistant_memory USING hnsw ({VECTOR_COLUMN} vector_cosine_ops)
+                WHERE type = '{memory_type}';
+            """)
+
+    _available = True
+
+
+def to_vector_literal(embedding) -> str:
+    """
+    Format an embedding as a pgvector text literal, e.g. '[0.1,0.2]'.
+    """
+    return '[' + ','.join(str(float(value)) for value in embedding) + ']'
+
+
+def _vector_update(memory_id, embedding):
+    """
+    Build the (literal, id) parameters that mirror one stored embedding, or None
+    if it cannot go into the vector column.
+    """
+    try:
+        vector = decode_embedding(embedding)
+    except (ValueError, TypeError) as e:
+        print(f"Error processing embedding for memory {memory_id}: {e}")
+        return None
+    if len(vector) != settings.EMBEDDING_DIMENSIONS:
+        return None
+    return (to_vector_literal(vector), memory_id)
+
+
+def _write_vectors(cursor, updates: list):
+    if updates:
+        cursor.executemany(
+            f"UPDATE assistant_memory SET {VECTOR_COLUMN} = %s::vector WHERE id = %s;",
+            updates
+        )
+
+
+def store_vectors(memories):
+    """
+    Mirror the embeddings of saved rows into the vector column.
+
+    Called by every writer of embeddings, after the rows are saved (so they
+    have ids) and inside the same transaction. Does nothing without pgvector.
+
+    Args:
+        memories: Saved AssistantMemory objects; rows of other embedding
+            providers and rows without embeddings are skipped
+    """
+    if not is_available():
+        return
+
+    embedding_model = get_provider().name
+    updates = []
+    for memory in memories:
+        if memory.pk is None or memory.embedding is None or memory.embedding_model != embedding_model:
+            continue
+        update = _vector_update(memory.pk, memory.embedding)
+        if update is not None:
+            updates.append(update)
+
+    with connection.cursor() as cursor:
+        _write_vectors(cursor, updates)
+
+
+def backfill_vectors() -> int:
+    """
+    Copy stored embeddings of the active provider into the vector column where it is empty,
+    e.g. after the column was created on an existing database.
+
+    Returns:
+        Number of rows updated
+    """
+    last_id = 0
+    updated = 0
+    while True:
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT id, embedding FROM assistant_memory
+                WHERE id > %s AND embedding IS NOT NULL AND {VECTOR_COLUMN} IS NULL
+                  AND embedding_model = %s
+                ORDER BY id
+                LIMIT %s;
+            """, [last_id, get_provider().name, BACKFILL_BATCH_SIZE])
+            rows = cursor.fetchall()
+
+            updates = [update for update in (_vector_update(*row) for row in rows) if update is not None]
+            _write_vectors(cursor, updates)
+            updated += len(updates)
+
+        if rows:
+            last_id = rows[-1][0]
+        if len(rows) < BACKFILL_BATCH_SIZE:
+            return updated
+
+
+def search(query_embedding, limit: int, memory_type: str = None) -> list:
+    """
+    Find the rows nearest to the query by cosine distance using the HNSW index.
+
+    Args:
+        query_embedding: Query embedding vector
+        limit: Maximum number of results to return
+        memory_type: Filter by type ('knowledge' or 'memory'), None for both
+
+    Returns:
+        List of (memory_id, similarity_score) tuples, most similar first
+    """
+    if len(query_embedding) != settings.EMBEDDING_DIMENSIONS:
+        raise ValueError(
+            f"Query embedding has {len(query_embedding)} dimensions, vector column has {settings.EMBEDDING_DIMENSIONS}"
+        )
+
+    query_vector = to_vector_literal(query_embedding)
+    type_filter = "AND type = %s" if memory_type else ""
+    params = [query_vector, get_provider().name] + ([memory_type] if memory_type else []) + [query_vector, limit]
+
+    with span('similarity'), connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT id, 1 - ({VECTOR_COLUMN} <=> %s::vector) AS similarity
+            FROM assistant_memory
+            WHERE {VECTOR_COLUMN} IS NOT NULL AND embedding_model = %s {type_filter}
+            ORDER BY {VECTOR_COLUMN} <=> %s::vector
+            LIMIT %s;
+        """, params)
+        return [(memory_id, float(similarity)) for memory_id, similarity in cursor.fetchall()]
+
+
+def search_by_type(query_embedding, limits: dict) -> dict:
+    """
+    Run one top-k query per memory type in a single round trip.
+
+    Args:
+        query_embedding: Query embedding vector
+        limits: Maximum number of results per type, e.g. {'knowledge': 10, 'memory': 3}
+
+    Returns:
+        Dictionary mapping each type to (memory_id, similarity_score) tuples
+    """
+    if len(query_embedding) != settings.EMBEDDING_DIMENSIONS:
+        raise ValueError(
+            f"Query embedding has {len(query_embedding)} dimensions, vector column has {settings.EMBEDDING_DIMENSIONS}"
+        )
+
+    query_vector = to_vector_literal(query_embedding)
+    embedding_model = get_provider().name
+    subqueries = []
+    params = []
+    for memory_type, limit in limits.items():
+        subqueries.append(f"""
+            (SELECT type, id, 1 - ({VECTOR_COLUMN} <=> %s::vector) AS similarity
+             FROM assistant_memory
+             WHERE {VECTOR_COLUMN} IS NOT NULL AND embedding_model = %s AND type = %s
+             ORDER BY {VECTOR_COLUMN} <=> %s::vector
+             LIMIT %s)
+        """)
+        params += [query_vector, embedding_model, memory_type, query_vector, limit]
+
+    results = {memory_type: [] for memory_type in limits}
+    with span('similarity'), connection.cursor() as cursor:
+        cursor.execute(" UNION ALL ".join(subqueries) + ";", params)
+        for memory_type, memory_id, similarity in cursor.fetchall():
+            results[memory_type].append((memory_id, float(similarity)))
+
+    # UNION ALL does not guarantee the order of the combined rows
+    for ranked in results.values():
+        ranked.sort(key=lambda x: x[1], reverse=True)
+    return results
@@ -0,0 +1,222 @@
+"""
+Token-budgeted assembly of the RAG context.
+
+Retrieval returns up to KNOWLEDGE_LIMIT knowledge chunks and MEMORY_LIMIT
+chat messages, and much of that text is redundant: consecutive chunks repeat
+their overlap and section heading, and chat memory often repeats what the
+knowledge base already says. Before the prompt is built, the retrieved rows
+are
+
+    1. de-duplicated with maximal marginal relevance (MMR) over their
+       embeddings: rows nearly identical to one already kept are dropped,
+       and the rest are reordered to trade relevance against redundancy,
+    2. merged when they are neighbouring chunks of the same document, so
+       the shared heading and overlap appear once, and
+    3. added in relevance order until the token budget is spent.
+"""
+import numpy as np
+from django.conf import settings
+from assistant.services.chunking import parse_heading
+from assistant.services.embedding_providers import get_provider
+from assistant.services.tokens import count_tokens
+from assistant.services.vector_codec import decode_embedding
+
+
+def _unit_vector(item):
+    """
+    Normalized embedding of a retrieved row, or None if it has none (or one
+    from another embedding provider, e.g. a full-text hit not yet re-embedded).
+    """
+    if not item.embedding or item.embedding_model != get_provider().name:
+        return None
+    try:
+        vector = decode_embedding(item.embedding)
+    except (ValueError, TypeError):
+        return None
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else None
+
+
+def mmr_order(vectors: list, lambda_: float, duplicate_threshold: float, kept_vectors: list = None) -> list:
+    """
+    Order retrieved rows by maximal marginal relevance and drop near-duplicates.
+
+    Relevance comes from the retrieval order (rank 0 is the most relevant),
+    so the hybrid ranking is preserved; the embeddings are only compared
+    with each other, to penalize rows similar to ones already picked.
+
+    Args:
+        vectors: Normalized embedding per row in retrieval order (None if missing)
+        lambda_: Weight of relevance against novelty (1.0 keeps the retrieval order)
+        duplicate_threshold: Rows at least this similar to a kept row are dropped
+        kept_vectors: Vectors of rows kept earlier (e.g. knowledge when ordering memory)
+
+    Returns:
+        Indices of the rows to keep, in MMR order
+    """
+    kept_vectors = list(kept_vectors or [])
+    remaining = list(range(len(vectors)))
+    order = []
+
+    while remaining:
+        best, best_score = None, None
+        for index in list(remaining):
+            redundancy = 0.0
+            if vectors[index] is not None and kept_vectors:
+                redundancy = max(float(vectors[index] @ kept) for kept in kept_vectors)
+            if redundancy >= duplicate_threshold:
+                remaining.remove(index)
+                continue
+            relevance = 1.0 - index / len(vectors)
+            score = lambda_ * relevance - (1 - lambda_) * redundancy
+            if best_score is None or score > best_score:
+                best, best_score = index, score
+        if best is None:
+            break
+        remaining.remove(best)
+        order.append(best)
+        if vectors[best] is not None:
+            kept_vectors.append(vectors[best])
+
+    return order
+
+
+def _split_overlap(first: str, second: str) -> tuple:
+    """
+    Split two chunks into lines and find how many lines the second repeats
+    from the end of the first (its section heading is not counted).
+
+    Returns:
+        Tuple of (first lines, second lines without a repeated heading, overlap size)
+    """
+    first_lines = first.split('\n')
+    second_lines = second.split('\n')
+    if first_lines[0] == second_lines[0] and parse_heading(first_lines[0]):
+        second_lines = second_lines[1:]
+
+    for size in range(min(len(first_lines), len(second_lines)), 0, -1):
+        if first_lines[-size:] == second_lines[:size]:
+            return first_lines, second_lines, size
+    return first_lines, second_lines, 0
+
+
+def merge_overlapping(first: str, second: str) -> str:
+    """
+    Join two consecutive chunks of a document, dropping the repeated
+    section heading and the overlap lines the second chunk starts with.
+    """
+    first_lines, second_lines, overlap = _split_overlap(first, second)
+    return '\n'.join(first_lines + second_lines[overlap:])
+
+
+def _merge_neighbours(entries: list, max_tokens: int, model: str) -> list:
+    """
+    Merge knowledge entries that are neighbouring chunks of the same document.
+
+    Chunks are neighbours when their ids are consecutive (inserted one after
+    the other by the ingestion pipeline) or when the second one starts with
+    the end of the first (the chunk overlap). A merged entry keeps the best
+    rank of its parts and is only formed if it fits max_tokens.
+    """
+    merged = []
+    for entry in sorted(entries, key=lambda entry: (entry['document_id'] is None, entry['document_id'] or 0, entry['ids'][0])):
+        previous = merged[-1] if merged else None
+        if (
+            previous is not None
+            and entry['document_id'] is not None
+            and previous['document_id'] == entry['document_id']
+            and (entry['ids'][0] == previous['ids'][-1] + 1 or _split_overlap(previous['text'], entry['text'])[2])
+        ):
+            text = merge_overlapping(previous['text'], entry['text'])
+            tokens = count_tokens(text, model)
+            if tokens <= max_tokens:
+                previous.update(
+                    text=text,
+                    tokens=tokens,
+                    ids=previous['ids'] + entry['ids'],
+                    rank=min(previous['rank'], entry['rank']),
+                )
+                continue
+        merged.append(entry)
+    return sorted(merged, key=lambda entry: entry['rank'])
+
+
+def _fill(entries: list, budget: int) -> tuple:
+    """
+    Take entries in order while they fit the budget (skipping ones that do not).
+
+    Returns:
+        Tuple of (kept entries, tokens used)
+    """
+    kept = []
+    used = 0
+    for entry in entries:
+        if used + entry['tokens'] <= budget:
+            kept.append(entry)
+            used += entry['tokens']
+    return kept, used
+
+
+def build_context(knowledge_items: list, memory_items: list, model: str = None) -> dict:
+    """
+    Select and merge retrieved rows into a prompt context within the token budget.
+
+    Knowledge gets PROMPT_CONTEXT_TOKENS minus the PROMPT_MEMORY_TOKENS
+    reserved for chat memory; memory gets its share plus whatever knowledge
+    left unused.
+
+    Args:
+        knowledge_items: Retrieved knowledge rows (AssistantMemory), best first
+        memory_items: Retrieved chat memory rows, best first
+        model: Model whose tokenizer is used (defaults to settings.CHAT_MODEL)
+
+    Returns:
+        Dictionary with 'knowledge' and 'memory' text lists, 'context_tokens'
+        and the 'retrieved' and 'dropped' row counts
+    """
+    model = model or settings.CHAT_MODEL
+    total_budget = settings.PROMPT_CONTEXT_TOKENS
+    memory_budget = min(settings.PROMPT_MEMORY_TOKENS, total_budget)
+    knowledge_budget = total_budget - memory_budget
+
+    knowledge_vectors = {item.id: _unit_vector(item) for item in knowledge_items}
+    knowledge_order = mmr_order(
+        [knowledge_vectors[item.id] for item in knowledge_items],
+        settings.PROMPT_MMR_LAMBDA,
+        settings.PROMPT_DUPLICATE_THRESHOLD
+    )
+    knowledge_entries = []
+    for rank, index in enumerate(knowledge_order):
+        item = knowledge_items[index]
+        knowledge_entries.append({
+            'text': item.content,
+            'tokens': count_tokens(item.content, model),
+            'ids': [item.id],
+            'document_id': item.document_id,
+            'rank': rank,
+        })
+    knowledge_entries = _merge_neighbours(knowledge_entries, knowledge_budget, model)
+    knowledge, knowledge_tokens = _fill(knowledge_entries, knowledge_budget)
+    kept_ids = [memory_id for entry in knowledge for memory_id in entry['ids']]
+
+    # Chat memory that repeats knowledge already in the prompt adds nothing
+    memory_order = mmr_order(
+        [_unit_vector(item) for item in memory_items],
+        settings.PROMPT_MMR_LAMBDA,
+        settings.PROMPT_DUPLICATE_THRESHOLD,
+        kept_vectors=[knowledge_vectors[memory_id] for memory_id in kept_ids if knowledge_vectors[memory_id] is not None]
+    )
+    memory_entries = []
+    for index in memory_order:
+        text = memory_items[index].as_transcript()
+        memory_entries.append({'text': text, 'tokens': count_tokens(text, model)})
+    memory, memory_tokens = _fill(memory_entries, total_budget - knowledge_tokens)
+
+    retrieved = len(knowledge_items) + len(memory_items)
+    return {
+        'knowledge': [entry['text'] for entry in knowledge],
+        'memory': [entry['text'] for entry in memory],
+        'context_tokens': knowledge_tokens + memory_tokens,
+        'retrieved': retrieved,
+        'dropped': retrieved - len(kept_ids) - len(memory),
+    }
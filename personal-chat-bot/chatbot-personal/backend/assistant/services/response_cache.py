@@ -0,0 +1,161 @@
+"""
+Semantic cache for chat answers.
+
+A resume bot is asked the same few dozen questions over and over. When a new
+question's embedding is within RESPONSE_CACHE_THRESHOLD cosine similarity of
+a question answered earlier, and the knowledge base has not changed since,
+the earlier answer is returned without running retrieval or a completion.
+Hits, misses and the hit rate are exported on /metrics.
+
+Answers whose prompt included a conversation's chat memory are stored under
+that conversation and only returned to it; answers built from the knowledge
+base alone are shared by every visitor.
+"""
+import threading
+from collections import OrderedDict
+import numpy as np
+from django.conf import settings
+from assistant.services.metrics import registry
+
+
+class ResponseCache:
+    """
+    Bounded LRU of (question embedding, answer) pairs searched by cosine similarity.
+    """
+
+    def __init__(self, max_size: int = 500, threshold: float = 0.95):
+        self.max_size = max_size
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._vectors = None               # (max_size, dim) normalized question embeddings
+        self._entries = OrderedDict()      # slot -> cached result, least recently used first
+        self._scopes = {}                  # slot -> conversation id, or None for shared answers
+        self._free_slots = list(range(max_size - 1, -1, -1))
+        self._knowledge_version = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, query_embedding, conversation_id: str = None):
+        """
+        Find a cached answer for a semantically equivalent question.
+
+        Args:
+            query_embedding: Embedding of the new question
+            conversation_id: Conversation asking; its own answers are searched
+                along with the shared ones
+
+        Returns:
+            Cached result dictionary (with a 'similarity' key), or None on a miss
+        """
+        query = self._normalize(query_embedding)
+        with self._lock:
+            if not self._entries or query.shape[0] != self._vectors.shape[1]:
+                self._record(hit=False)
+                return None
+
+            slots = np.fromiter(
+                (slot for slot in self._entries if self._scopes.get(slot) in (None, conversation_id)),
+                dtype=np.int64
+            )
+            if not len(slots):
+                self._record(hit=False)
+                return None
+            scores = self._vectors[slots] @ query
+            best = int(np.argmax(scores))
+            slot = int(slots[best])
+
+            if scores[best] < self.threshold:
+                self._record(hit=False)
+                return None
+
+            self._entries.move_to_end(slot)
+            self._record(hit=True)
+            return dict(self._entries[slot], similarity=float(scores[best]))
+
+    def _record(self, hit: bool):
+        if hit:
+            self.hits += 1
+            registry.increment('response_cache_hits_total', help_text='Chat questions answered from the response cache.')
+        else:
+            self.misses += 1
+            registry.increment('response_cache_misses_total', help_text='Response cache lookups without a match.')
+
+    @property
+    def version(self) -> int:
+        """Knowledge base version the cached answers belong to."""
+        return self._knowledge_version
+
+    def store(self, query_embedding, result: dict, version: int = None, conversation_id: str = None):
+        """
+        Cache the result for a question, evicting the least recently used entry if full.
+
+        Args:
+            query_embedding: Embedding of the question
+            result: Result dictionary to return on later hits
+            version: Value of `version` read before the answer was generated;
+                the result is discarded if the knowledge base changed meanwhile
+            conversation_id: Conversation whose chat memory the answer used
+                (only returned to that conversation); None to share the answer
+        """
+        query = self._normalize(query_embedding)
+        with self._lock:
+            if version is not None and version != self._knowledge_version:
+                return
+
+            if self._vectors is None or self._vectors.shape[1] != query.shape[0]:
+                self._vectors = np.zeros((self.max_size, query.shape[0]), dtype=np.float32)
+                self._entries.clear()
+                self._scopes.clear()
+                self._free_slots = list(range(self.max_size - 1, -1, -1))
+
+            if self._free_slots:
+                slot = self._free_slots.pop()
+            else:
+                slot, _ = self._entries.popitem(last=False)
+
+            self._vectors[slot] = query
+            self._entries[slot] = dict(result)
+            self._scopes[slot] = conversation_id
+
+    def invalidate(self):
+        """
+        Drop every cached answer (call when the knowledge base changes).
+        """
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+            self._free_slots = list(range(self.max_size - 1, -1, -1))
+            self._knowledge_version += 1
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters since process start.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'size': len(self._entries),
+            'knowledge_version': self._knowledge_version,
+        }
+
+
+response_cache = ResponseCache(
+    max_size=settings.RESPONSE_CACHE_SIZE,
+    threshold=settings.RESPONSE_CACHE_THRESHOLD,
+)
+registry.register_gauge(
+    'response_cache_hit_rate', lambda: response_cache.stats()['hit_rate'],
+    help_text='Share of response cache lookups that were hits since the process started.'
+)
+registry.register_gauge(
+    'response_cache_entries', lambda: response_cache.stats()['size'],
+    help_text='Answers currently held in the response cache.'
+)
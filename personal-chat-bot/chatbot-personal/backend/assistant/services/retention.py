@@ -0,0 +1,363 @@
+"""
+Retention and compaction of conversation memory.
+
+Chat messages would otherwise be kept forever, and every memory search and
+history page works over an ever larger table. compact_memory() bounds it:
+
+- Raw messages older than MEMORY_RETENTION_DAYS, or beyond the latest
+  MEMORY_RETENTION_MAX_MESSAGES of their conversation, are expired.
+- Expired messages are summarized by the chat model in groups of up to
+  MEMORY_SUMMARY_INPUT_TOKENS. Each summary is stored as a 'summary' row of
+  the same conversation with a fresh embedding (so it is still found by
+  memory search), and the raw messages are deleted in the same transaction.
+- A conversation keeps at most MEMORY_MAX_SUMMARIES summaries; the oldest
+  ones are folded into one. Summaries older than MEMORY_SUMMARY_RETENTION_DAYS
+  are deleted.
+- Deleted rows can be archived first as gzipped JSON lines (MEMORY_ARCHIVE_DIR).
+- Persistent embedding cache rows older than EMBEDDING_CACHE_PERSISTENT_DAYS
+  are deleted, since that table grows with every distinct question.
+
+Deletes run in batches of MEMORY_RETENTION_DELETE_BATCH rows, each in its
+own short transaction with a pause in between, so locks stay short and
+autovacuum can keep up with the dead rows.
+
+Run it with `python manage.py compact_memory`, or in every worker process
+every MEMORY_RETENTION_INTERVAL seconds (see start_retention_task). Only one
+run at a time is allowed per database (a PostgreSQL advisory lock).
+"""
+import gzip
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+from assistant.models import AssistantMemory
+from assistant.services.embedding_cache import embedding_cache
+from assistant.services.embeddings import embedding_fields, get_embedding
+from assistant.services.metrics import registry
+from assistant.services.openai_client import get_client
+from assistant.services.pgvector_search import store_vectors
+from assistant.services.tokens import count_tokens
+from assistant.services.vector_index import record_write
+
+CHAT_ROLES = ('user', 'assistant')
+ADVISORY_LOCK_KEY = 0x6d656d72  # 'memr'
+
+_lock = threading.Lock()  # Held while a run is in progress
+_task_lock = threading.Lock()
+_task_thread = None
+
+SUMMARY_PROMPT = """You compact the chat history of a personal AI assistant that answers questions about Lind Geci's CV.
+Summarize the conversation excerpt below in a few sentences. Keep what the user asked about, facts and preferences the user shared, and the key points of the answers.
+Write plain prose without greetings or commentary."""
+
+
+@contextmanager
+def _run_lock():
+    """
+    Allow one compaction run at a time: per process, and per database on PostgreSQL.
+
+    Yields:
+        True if this caller holds the lock
+    """
+    if not _lock.acquire(blocking=False):
+        yield False
+        return
+    try:
+        if connection.vendor != 'postgresql':
+            yield True
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_try_advisory_lock(%s)', [ADVISORY_LOCK_KEY])
+            acquired = cursor.fetchone()[0]
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_advisory_unlock(%s)', [ADVISORY_LOCK_KEY])
+    finally:
+        _lock.release()
+
+
+def expired_message_ids(conversation_id: str, cutoff, keep: int) -> list:
+    """
+    Ids of a conversation's raw messages that fall outside the retention policy.
+
+    Args:
+        conversation_id: Conversation (None for messages stored before conversations)
+        cutoff: Messages created before this are expired
+        keep: Number of most recent messages a conversation keeps (if not past the cutoff)
+
+    Returns:
+        Expired message ids, oldest first
+    """
+    rows = list(
+        AssistantMemory.objects
+        .filter(type='memory', role__in=CHAT_ROLES, conversation_id=conversation_id)
+        .order_by('-created_at', '-id')
+        .values_list('id', 'created_at')
+    )
+    expired = [memory_id for position, (memory_id, created_at) in enumerate(rows) if position >= keep or created_at < cutoff]
+    return expired[::-1]
+
+
+def _group_by_tokens(rows: list, max_tokens: int) -> list:
+    """
+    Split rows (oldest first) into consecutive groups of at most max_tokens of transcript.
+    """
+    groups = []
+    group = []
+    used = 0
+    for row in rows:
+        tokens = count_tokens(row.as_transcript(), settings.CHAT_MODEL)
+        if group and used + tokens > max_tokens:
+            groups.append(group)
+            group = []
+            used = 0
+        group.append(row)
+        used += tokens
+    if group:
+        groups.append(group)
+    return groups
+
+
+def summarize(rows: list) -> str:
+    """
+    Summarize chat messages (or earlier summaries) with the chat model.
+
+    Args:
+        rows: AssistantMemory rows, oldest first
+
+    Returns:
+        Summary text
+    """
+    transcript = "\n".join(row.as_transcript() for row in rows)
+    response = get_client().chat.completions.create(
+        model=settings.CHAT_MODEL,
+        messages=[
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": transcript},
+        ],
+        temperature=0,
+        max_tokens=settings.MEMORY_SUMMARY_MAX_TOKENS
+    )
+    return response.choices[0].message.content.strip()
+
+
+def _archive(rows: list, archive_path: Path):
+    """
+    Append rows to a gzipped JSON lines file before they are deleted.
+    """
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(archive_path, 'at', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps({
+                'id': row.id,
+                'conversation_id': row.conversation_id,
+                'role': row.role,
+                'content': row.content,
+                'created_at': row.created_at.isoformat(),
+            }) + '\n')
+
+
+def _delete_in_batches(ids: list, archive_path: Path = None) -> int:
+    """
+    Delete rows in short transactions of MEMORY_RETENTION_DELETE_BATCH ids.
+    """
+    deleted = 0
+    batch_size = max(1, settings.MEMORY_RETENTION_DELETE_BATCH)
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        if archive_path is not None:
+            _archive(list(AssistantMemory.objects.filter(id__in=batch).order_by('created_at', 'id')), archive_path)
+        with transaction.atomic():
+            deleted += AssistantMemory.objects.filter(id__in=batch).delete()[0]
+            record_write(['memory'], rebuild=True)
+        time.sleep(settings.MEMORY_RETENTION_BATCH_PAUSE)
+    return deleted
+
+
+def _replace_with_summary(rows: list, conversation_id: str, archive_path: Path = None):
+    """
+    Store a summary of rows (oldest first) and delete them in one transaction.
+    """
+    content = summarize(rows)
+    embedding = get_embedding(content)
+    if archive_path is not None:
+        _archive(rows, archive_path)
+    with transaction.atomic():
+        summary = AssistantMemory.objects.create(
+            content=content,
+            **embedding_fields(embedding),
+            type='memory',
+            role='summary',
+            conversation_id=conversation_id
+        )
+        store_vectors([summary])
+        # Date the summary like the newest row it replaces so it ages out with them
+        AssistantMemory.objects.filter(pk=summary.pk).update(created_at=rows[-1].created_at)
+        AssistantMemory.objects.filter(id__in=[row.id for row in rows]).delete()
+        record_write(['memory'], rebuild=True)
+    time.sleep(settings.MEMORY_RETENTION_BATCH_PAUSE)
+
+
+def _compact_conversation(conversation_id: str, expired_ids: list, report: dict, archive_path: Path = None):
+    """
+    Replace a conversation's expired messages with summaries (or just delete them).
+    """
+    if not settings.MEMORY_SUMMARY_ENABLED:
+        report['messages_removed'] += _delete_in_batches(expired_ids, archive_path)
+        return
+
+    batch_size = max(1, settings.MEMORY_RETENTION_DELETE_BATCH)
+    for start in range(0, len(expired_ids), batch_size):
+        rows = list(
+            AssistantMemory.objects
+            .filter(id__in=expired_ids[start:start + batch_size])
+            .order_by('created_at', 'id')
+        )
+        for group in _group_by_tokens(rows, settings.MEMORY_SUMMARY_INPUT_TOKENS):
+            _replace_with_summary(group, conversation_id, archive_path)
+            report['messages_removed'] += len(group)
+            report['summaries_created'] += 1
+
+    # Fold the oldest summaries together once a conversation has too many
+    summaries = list(
+        AssistantMemory.objects
+        .filter(type='memory', role='summary', conversation_id=conversation_id)
+        .order_by('created_at', 'id')
+    )
+    excess = len(summaries) - settings.MEMORY_MAX_SUMMARIES
+    if excess > 0:
+        _replace_with_summary(summaries[:excess + 1], conversation_id, archive_path)
+        report['summaries_folded'] += excess + 1
+
+
+def compact_memory(dry_run: bool = False, archive_dir: str = None) -> dict:
+    """
+    Apply the retention policy to conversation memory.
+
+    Args:
+        dry_run: Only count what would be compacted (no model calls, no deletes)
+        archive_dir: Archive deleted rows here (default MEMORY_ARCHIVE_DIR; empty disables)
+
+    Returns:
+        Report dictionary with 'conversations', 'messages_removed',
+        'summaries_created', 'summaries_folded', 'summaries_expired',
+        'embedding_cache_pruned', 'elapsed' and 'skipped' (True if another
+        run holds the lock)
+    """
+    started = time.perf_counter()
+    report = {
+        'conversations': 0, 'messages_removed': 0, 'summaries_created': 0,
+        'summaries_folded': 0, 'summaries_expired': 0, 'embedding_cache_pruned': 0, 'skipped': False,
+    }
+    now = timezone.now()
+    cutoff = now - timedelta(days=settings.MEMORY_RETENTION_DAYS)
+    keep = settings.MEMORY_RETENTION_MAX_MESSAGES
+    archive_dir = settings.MEMORY_ARCHIVE_DIR if archive_dir is None else archive_dir
+    archive_path = Path(archive_dir) / f"memory-{now:%Y%m%d-%H%M%S}.jsonl.gz" if archive_dir and not dry_run else None
+
+    with _run_lock() as acquired:
+        if not acquired:
+            report.update(skipped=True, elapsed=time.perf_counter() - started)
+            return report
+
+        # Conversations with messages past the age or count limit
+        conversations = [
+            row['conversation_id']
+            for row in (
+                AssistantMemory.objects
+                .filter(type='memory', role__in=CHAT_ROLES)
+                .values('conversation_id')
+                .annotate(total=Count('id'), oldest=Min('created_at'))
+                .order_by()
+            )
+            if row['total'] > keep or row['oldest'] < cutoff
+        ]
+
+        for conversation_id in conversations:
+            expired_ids = expired_message_ids(conversation_id, cutoff, keep)
+            if not expired_ids:
+                continue
+            report['conversations'] += 1
+            if dry_run:
+                report['messages_removed'] += len(expired_ids)
+                continue
+            try:
+                _compact_conversation(conversation_id, expired_ids, report, archive_path)
+            except Exception as e:
+                print(f"[WARNING] Could not compact conversation {conversation_id}: {str(e)}")
+
+        if settings.MEMORY_SUMMARY_RETENTION_DAYS > 0:
+            summary_cutoff = now - timedelta(days=settings.MEMORY_SUMMARY_RETENTION_DAYS)
+            stale_ids = list(
+                AssistantMemory.objects
+                .filter(type='memory', role='summary', created_at__lt=summary_cutoff)
+                .values_list('id', flat=True)
+            )
+            if dry_run:
+                report['summaries_expired'] = len(stale_ids)
+            else:
+                report['summaries_expired'] = _delete_in_batches(stale_ids, archive_path)
+
+        if not dry_run:
+            report['embedding_cache_pruned'] = embedding_cache.prune_persistent(settings.MEMORY_RETENTION_DELETE_BATCH)
+
+    if not dry_run and (report['messages_removed'] or report['summaries_folded'] or report['summaries_expired']):
+        registry.increment(
+            'memory_retention_rows_removed_total', amount=report['messages_removed'] + report['summaries_expired'],
+            help_text='Chat memory rows removed by the retention job.'
+        )
+        registry.increment(
+            'memory_retention_summaries_total', amount=report['summaries_created'],
+            help_text='Summary rows written by the retention job.'
+        )
+
+    report['elapsed'] = time.perf_counter() - started
+    return report
+
+
+def _run_periodically(interval: float):
+    while True:
+        time.sleep(interval)
+        try:
+            report = compact_memory()
+            if not report['skipped'] and report['conversations']:
+                print(
+                    f"[INFO] Memory retention: {report['messages_removed']} messages compacted into "
+                    f"{report['summaries_created']} summaries across {report['conversations']} conversations"
+                )
+        except Exception as e:
+            print(f"[WARNING] Memory retention job failed: {str(e)}")
+        finally:
+            connection.close()
+
+
+def start_retention_task() -> bool:
+    """
+    Start the periodic retention job in this process if MEMORY_RETENTION_INTERVAL
+    is set (no-op after the first call).
+
+    Returns:
+        True if the job was started by this call
+    """
+    global _task_thread
+
+    interval = settings.MEMORY_RETENTION_INTERVAL
+    if interval <= 0 or _task_thread is not None:
+        return False
+    with _task_lock:
+        if _task_thread is not None:
+            return False
+        _task_thread = threading.Thread(
+            target=_run_periodically, args=(interval,), name='memory-retention', daemon=True
+        )
+    _task_thread.start()
+    return True
@@ -0,0 +1,61 @@
+"""
+Token counting for OpenAI models.
+
+Uses tiktoken when it is installed; otherwise falls back to an estimate of
+roughly four characters per token, which is close enough for batching and
+budgeting English text.
+"""
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional
+    tiktoken = None
+
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding('cl100k_base')
+
+
+def count_tokens(text: str, model: str = 'text-embedding-ada-002') -> int:
+    """
+    Count (or estimate) the number of tokens in text.
+
+    Args:
+        text: Text to count
+        model: Model whose tokenizer should be used
+
+    Returns:
+        Number of tokens
+    """
+    if tiktoken is not None:
+        return len(_get_encoding(model).encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+# Formatting tokens the chat API adds per message and to prime the reply
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+
+def count_message_tokens(messages: list, model: str = 'gpt-3.5-turbo') -> int:
+    """
+    Count (or estimate) the prompt tokens of a chat completion request.
+
+    Args:
+        messages: Chat messages ({'role': ..., 'content': ...} dictionaries)
+        model: Chat model whose tokenizer should be used
+
+    Returns:
+        Number of prompt tokens
+    """
+    return TOKENS_PER_REPLY + sum(
+        TOKENS_PER_MESSAGE + count_tokens(message['role'], model) + count_tokens(message['content'], model)
+        for message in messages
+    )
@@ -0,0 +1,91 @@
+"""
+Versioned binary encoding for stored embeddings.
+
+Each value starts with an 8-byte header followed by the vector as
+little-endian numbers:
+
+    byte 0      format version (1)
+    byte 1      dtype code: 0 = float32, 1 = float16, 2 = int8
+    bytes 2-3   reserved (zero)
+    bytes 4-7   float32 scale (int8 only; 1.0 otherwise)
+
+float32 takes 4 bytes per dimension (~6 KB for 1536 dimensions, versus
+~20-30 KB of JSON text), float16 takes 2 and int8 takes 1. float32 values
+decode as a read-only np.frombuffer view of the stored bytes without copying;
+float16 and int8 are widened to float32 on decode.
+"""
+import struct
+import numpy as np
+from django.conf import settings
+
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<BBxxf')
+
+DTYPES = {
+    'float32': (0, np.dtype('<f4')),
+    'float16': (1, np.dtype('<f2')),
+    'int8': (2, np.dtype('i1')),
+}
+DTYPES_BY_CODE = {code: (name, dtype) for name, (code, dtype) in DTYPES.items()}
+
+
+def encode_embedding(embedding, dtype: str = None) -> bytes:
+    """
+    Encode an embedding (list or numpy array) with a version header.
+
+    Args:
+        embedding: Embedding vector
+        dtype: 'float32', 'float16' or 'int8' (defaults to settings.EMBEDDING_STORAGE_DTYPE)
+
+    Returns:
+        Encoded bytes
+    """
+    dtype = dtype or settings.EMBEDDING_STORAGE_DTYPE
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown embedding storage dtype: {dtype}")
+    code, numpy_dtype = DTYPES[dtype]
+
+    vector = np.asarray(embedding, dtype=np.float32)
+    scale = 1.0
+    if dtype == 'int8':
+        # Symmetric quantization: the largest magnitude maps to 127
+        peak = float(np.max(np.abs(vector))) if vector.size else 0.0
+        scale = peak / 127 if peak else 1.0
+        vector = np.round(vector / scale)
+
+    return HEADER.pack(FORMAT_VERSION, code, scale) + vector.astype(numpy_dtype).tobytes()
+
+
+def decode_embedding(data) -> np.ndarray:
+    """
+    Decode bytes from encode_embedding into a float32 vector.
+
+    Args:
+        data: bytes or memoryview (as returned by the database driver)
+
+    Returns:
+        float32 vector (a read-only view of data for float32 encodings)
+
+    Raises:
+        ValueError: If the data is truncated or uses an unknown version or dtype
+    """
+    if len(data) < HEADER.size:
+        raise ValueError(f"Embedding data has {len(data)} bytes, shorter than the header")
+
+    version, code, scale = HEADER.unpack_from(data)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported embedding format version {version}")
+    if code not in DTYPES_BY_CODE:
+        raise ValueError(f"Unknown embedding dtype code {code}")
+    name, numpy_dtype = DTYPES_BY_CODE[code]
+
+    if (len(data) - HEADER.size) % numpy_dtype.itemsize:
+        raise ValueError(f"Embedding data has {len(data)} bytes, not a whole number of {name} values")
+
+    vector = np.frombuffer(data, dtype=numpy_dtype, offset=HEADER.size)
+    if name == 'float32':
+        return vector
+    if name == 'int8':
+        return vector.astype(np.float32) * np.float32(scale)
+    return vector.astype(np.float32)
+
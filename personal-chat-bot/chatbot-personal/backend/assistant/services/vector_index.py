@@ -0,0 +1,316 @@
+"""
+In-process embedding index for vector search.
+
+Keeps one contiguous float32 matrix per memory type with pre-normalized rows,
+so a query is a single matrix-vector product followed by an argpartition
+top-k instead of JSON-decoding and scoring every row in Python.
+
+The index is built lazily on first use and then caught up incrementally.
+Writers record every change in the MemoryIndexState row of the memory type
+(record_write, in the writing transaction): `version` when rows are added,
+`generation` when rows are deleted or re-embedded. A search re-reads that
+row at most every VECTOR_INDEX_CHECK_INTERVAL seconds (immediately after a
+write in this process) and only then touches the rows table:
+
+- a new generation rebuilds the index, so rows deleted by any process are
+  dropped;
+- a new version loads the missing rows among the last
+  VECTOR_INDEX_CATCHUP_WINDOW ids below the high-water mark and everything
+  above it. Transactions can commit out of id order, so a row with a lower
+  id than one already indexed can still appear; re-scanning the window
+  finds it instead of skipping it for good.
+
+If a snapshot from `manage.py build_vector_snapshot` exists, it is
+memory-mapped as the read-only base of the index and only newer rows are
+loaded from the database.
+
+Only vectors of the active embedding provider are loaded; if the provider
+changes (e.g. in tests overriding EMBEDDING_PROVIDER), the index is rebuilt.
+"""
+import threading
+import time
+import numpy as np
+from django.conf import settings
+from django.db.models import F
+from assistant.models import AssistantMemory, MemoryIndexState
+from assistant.services.embedding_providers import get_provider
+from assistant.services.metrics import span
+from assistant.services.vector_codec import decode_embedding
+from assistant.services.vector_snapshot import load_snapshot
+
+
+class MemoryIndex:
+    """
+    Normalized embedding matrix for a single memory type.
+    """
+
+    def __init__(self, memory_type: str):
+        self.memory_type = memory_type
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self, embedding_model: str = None):
+        self._embedding_model = embedding_model
+        # Read-only base rows memory-mapped from a snapshot (shared between workers)
+        self._base_matrix = None
+        self._base_ids = None
+        self._snapshot_checked = False
+        # Rows loaded from the database, newer than the snapshot
+        self._matrix = None
+        self._ids = None
+        self._size = 0
+        self._high_water_id = 0
+        self._skipped_ids = set()  # Rows that cannot be indexed (not retried on catch-up)
+        # MemoryIndexState counters the rows were loaded at (None: not loaded yet)
+        self._version = None
+        self._generation = None
+        self._checked_at = 0.0
+        self._stale = False
+
+    def __len__(self):
+        base_size = len(self._base_ids) if self._base_ids is not None else 0
+        return base_size + self._size
+
+    def _dimensions(self):
+        if self._base_matrix is not None:
+            return self._base_matrix.shape[1]
+        if self._matrix is not None:
+            return self._matrix.shape[1]
+        return None
+
+    def _load_snapshot(self):
+        self._snapshot_checked = True
+        snapshot = load_snapshot(self.memory_type)
+        if snapshot is None:
+            return
+        vectors, ids, high_water_id = snapshot
+        if len(ids):
+            self._base_matrix, self._base_ids = vectors, ids
+        self._high_water_id = high_water_id
+
+    def _append(self, ids: list, vectors: np.ndarray):
+        """Append normalized rows, growing the backing arrays geometrically."""
+        count = len(ids)
+        if count == 0:
+            return
+
+        if self._matrix is None:
+            capacity = max(count, 64)
+            self._matrix = np.zeros((capacity, vectors.shape[1]), dtype=np.float32)
+            self._ids = np.zeros(capacity, dtype=np.int64)
+        elif self._size + count > len(self._ids):
+            capacity = max(self._size + count, len(self._ids) * 2)
+            matrix = np.zeros((capacity, self._matrix.shape[1]), dtype=np.float32)
+            matrix[:self._size] = self._matrix[:self._size]
+            row_ids = np.zeros(capacity, dtype=np.int64)
+            row_ids[:self._size] = self._ids[:self._size]
+            self._matrix, self._ids = matrix, row_ids
+
+        self._matrix[self._size:self._size + count] = vectors
+        self._ids[self._size:self._size + count] = ids
+        self._size += count
+
+    def _read_state(self) -> tuple:
+        state = MemoryIndexState.objects.filter(pk=self.memory_type).values_list('version', 'generation').first()
+        return state or (0, 0)
+
+    def _indexed_ids_above(self, low_id: int) -> np.ndarray:
+        parts = [np.array(sorted(self._skipped_ids), dtype=np.int64)]
+        if self._base_ids is not None:
+            parts.append(self._base_ids[self._base_ids > low_id])
+        if self._ids is not None:
+            ids = self._ids[:self._size]
+            parts.append(ids[ids > low_id])
+        return np.concatenate(parts)
+
+    def _fetch_rows(self, embedding_model: str) -> list:
+        """
+        Load the rows missing from the index: all rows on a fresh build,
+        otherwise the missing ids of the trailing window and everything above it.
+        """
+        rows = AssistantMemory.objects.filter(
+            type=self.memory_type, embedding__isnull=False, embedding_model=embedding_model
+        )
+        if not self._high_water_id:
+            return list(rows.order_by('id').values_list('id', 'embedding'))
+
+        low_id = max(0, self._high_water_id - settings.VECTOR_INDEX_CATCHUP_WINDOW)
+        candidate_ids = np.array(list(rows.filter(id__gt=low_id).values_list('id', flat=True)), dtype=np.int64)
+        missing = candidate_ids[~np.isin(candidate_ids, self._indexed_ids_above(low_id))]
+        if not len(missing):
+            return []
+        return list(rows.filter(id__in=missing.tolist()).order_by('id').values_list('id', 'embedding'))
+
+    def refresh(self, force: bool = False):
+        """
+        Bring the index up to date if the memory type's rows changed (checked
+        at most every VECTOR_INDEX_CHECK_INTERVAL seconds unless forced or
+        written by this process since).
+        """
+        embedding_model = get_provider().name
+        if embedding_model != self._embedding_model:
+            self._reset(embedding_model)
+
+        now = time.monotonic()
+        loaded = self._version is not None
+        if loaded and not force and not self._stale and now - self._checked_at < settings.VECTOR_INDEX_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        self._stale = False
+
+        # Read the counters before the rows, so a write committed in between triggers another catch-up
+        with span('db_fetch'):
+            version, generation = self._read_state()
+        if loaded and generation != self._generation:
+            self._reset(embedding_model)
+            loaded = False
+        if loaded and version == self._version:
+            return
+
+        if not self._snapshot_checked:
+            self._load_snapshot()
+        with span('db_fetch'):
+            rows = self._fetch_rows(embedding_model)
+        self._version, self._generation = version, generation
+        if not rows:
+            return
+
+        dimensions = self._dimensions()
+        ids = []
+        vectors = []
+        with span('decode'):
+            for memory_id, embedding in rows:
+                self._high_water_id = max(self._high_water_id, memory_id)
+                try:
+                    vector = decode_embedding(embedding)
+                except (ValueError, TypeError) as e:
+                    print(f"Error processing embedding for memory {memory_id}: {e}")
+                    self._skipped_ids.add(memory_id)
+                    continue
+
+                if dimensions is None:
+                    dimensions = vector.shape[0]
+                if vector.ndim != 1 or vector.shape[0] != dimensions:
+                    print(f"Skipping memory {memory_id}: embedding has {vector.shape} dimensions, expected {dimensions}")
+                    self._skipped_ids.add(memory_id)
+                    continue
+
+                ids.append(memory_id)
+                vectors.append(vector)
+
+            if vectors:
+                self._append(ids, normalize_rows(np.vstack(vectors)))
+
+    def search(self, query_vector, limit: int) -> list:
+        """
+        Find the rows most similar to the query vector.
+
+        Args:
+            query_vector: Query embedding (list or numpy array)
+            limit: Maximum number of results to return
+
+        Returns:
+            List of (memory_id, similarity_score) tuples, most similar first
+        """
+        with self._lock:
+            self.refresh()
+            size = len(self)
+            if size == 0 or limit <= 0:
+                return []
+
+            query = normalize_rows(np.asarray(query_vector, dtype=np.float32)[np.newaxis, :])[0]
+            if query.shape[0] != self._dimensions():
+                raise ValueError(
+                    f"Query embedding has {query.shape[0]} dimensions, index has {self._dimensions()}"
+                )
+
+            with span('similarity'):
+                if self._base_matrix is None:
+                    scores, ids = self._matrix[:self._size] @ query, self._ids[:self._size]
+                elif self._size == 0:
+                    scores, ids = self._base_matrix @ query, self._base_ids
+                else:
+                    scores = np.concatenate([self._base_matrix @ query, self._matrix[:self._size] @ query])
+                    ids = np.concatenate([self._base_ids, self._ids[:self._size]])
+
+                if limit < size:
+                    top = np.argpartition(-scores, limit - 1)[:limit]
+                else:
+                    top = np.arange(size)
+                top = top[np.argsort(-scores[top], kind='stable')]
+
+            return [(int(ids[i]), float(scores[i])) for i in top]
+
+    def invalidate(self):
+        """Drop all rows so the next search rebuilds from the database."""
+        with self._lock:
+            self._reset()
+
+    def mark_stale(self):
+        """Check for changes on the next search instead of waiting for the check interval."""
+        self._stale = True
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    Scale each row to unit length; all-zero rows are left as zeros.
+    """
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(memory_type: str) -> MemoryIndex:
+    """
+    Get the process-wide index for a memory type, creating it if needed.
+    """
+    with _indexes_lock:
+        index = _indexes.get(memory_type)
+        if index is None:
+            index = _indexes[memory_type] = MemoryIndex(memory_type)
+        return index
+
+
+def invalidate_index(memory_type: str = None):
+    """
+    Invalidate the index for one memory type, or all of them.
+
+    This only affects the current process; writers also call record_write
+    so other processes notice the change.
+    """
+    with _indexes_lock:
+        if memory_type is None:
+            indexes = list(_indexes.values())
+        else:
+            indexes = [_indexes[memory_type]] if memory_type in _indexes else []
+    for index in indexes:
+        index.invalidate()
+
+
+def record_write(memory_types, rebuild: bool = False):
+    """
+    Record that rows with embeddings were written, for every process's index.
+
+    Call inside the transaction that changes the rows, so other workers see
+    the new counters together with the rows. This process's indexes check
+    for changes on their next search.
+
+    Args:
+        memory_types: Memory types whose rows changed
+        rebuild: Rows were deleted or re-embedded (indexes are rebuilt);
+            otherwise rows were only added (indexes catch up)
+    """
+    field = 'generation' if rebuild else 'version'
+    # A fixed lock order, so two writers of several types cannot deadlock
+    for memory_type in sorted(set(memory_types)):
+        if not MemoryIndexState.objects.filter(pk=memory_type).update(**{field: F(field) + 1}):
+            MemoryIndexState.objects.get_or_create(pk=memory_type)
+            MemoryIndexState.objects.filter(pk=memory_type).update(**{field: F(field) + 1})
+        with _indexes_lock:
+            index = _indexes.get(memory_type)
+        if index is not None:
+            index.mark_stale()
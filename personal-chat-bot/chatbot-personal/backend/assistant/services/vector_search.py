@@ -1,11 +1,33 @@
 """
 Vector similarity search using cosine similarity.
-Embeddings are stored as JSON strings in PostgreSQL and compared using numpy.
+Embeddings are stored as float32 bytes in PostgreSQL and searched either with
+pgvector inside the database (pgvector_search.py) or through an in-process
+numpy index (vector_index.py), depending on settings.VECTOR_SEARCH_BACKEND.
+
+Context retrieval is hybrid: vector results are fused with full-text results
+(lexical_search.py) by reciprocal rank fusion, and when no query embedding
+is available the full-text results are used on their own.
+
+Chat memory can be scoped to one conversation: its rows are then scored
+directly (see search_conversation) instead of searching every visitor's
+messages in the shared index.
+
+Every backend only compares vectors of the active embedding provider
+(AssistantMemory.embedding_model); rows embedded by another provider are
+invisible to vector search until they are re-embedded.
 """
-import json
 import numpy as np
+from django.conf import settings
 from assistant.models import AssistantMemory
+from assistant.services import lexical_search, pgvector_search
+from assistant.services.embedding_providers import get_provider
 from assistant.services.embeddings import get_embedding
+from assistant.services.metrics import span
+from assistant.services.vector_codec import decode_embedding
+from assistant.services.vector_index import get_index, normalize_rows
+
+
+_pgvector_fallback_warned = False
 
 
 def cosine_similarity(vec1, vec2):
@@ -37,92 +59,343 @@ def cosine_similarity(vec1, vec2):
     return dot_product / (norm1 * norm2)
 
 
-def search_similar_memories(query_text: str, limit: int = 5, memory_type: str = None):
+def use_pgvector() -> bool:
+    """
+    Check whether searches should go to pgvector (falls back to numpy if the
+    vector column is missing or the embedding provider's vectors do not fit it).
+    """
+    global _pgvector_fallback_warned
+
+    if settings.VECTOR_SEARCH_BACKEND != 'pgvector':
+        return False
+    dimensions = get_provider().dimensions
+    if pgvector_search.is_available() and dimensions == settings.EMBEDDING_DIMENSIONS:
+        return True
+
+    if not _pgvector_fallback_warned:
+        if dimensions != settings.EMBEDDING_DIMENSIONS:
+            print(
+                f"[WARNING] VECTOR_SEARCH_BACKEND is 'pgvector' but the embedding provider has {dimensions} "
+                f"dimensions (vector column: {settings.EMBEDDING_DIMENSIONS}); using numpy index."
+            )
+        else:
+            print("[WARNING] VECTOR_SEARCH_BACKEND is 'pgvector' but the vector column is missing; using numpy index.")
+            print("[INFO] Run: python check_pgvector.py")
+        _pgvector_fallback_warned = True
+    return False
+
+
+def _search_ids(query_embedding, limit: int, memory_type: str = None) -> list:
+    """
+    Run a top-k search on the configured backend.
+    
+    Returns:
+        List of (memory_id, similarity_score) tuples, most similar first
+    """
+    similarities = []
+    if use_pgvector():
+        # Cosine top-k runs inside PostgreSQL on the HNSW index
+        try:
+            similarities = pgvector_search.search(query_embedding, limit, memory_type)
+        except ValueError as e:
+            print(f"Error searching pgvector: {e}")
+    else:
+        # Score against the in-process index for each requested type
+        memory_types = [memory_type] if memory_type else [choice for choice, _ in AssistantMemory.MEMORY_TYPE_CHOICES]
+        for search_type in memory_types:
+            try:
+                similarities.extend(get_index(search_type).search(query_embedding, limit))
+            except ValueError as e:
+                print(f"Error searching {search_type} index: {e}")
+    
+    # Sort by similarity score (highest first) and keep the top results
+    similarities.sort(key=lambda x: x[1], reverse=True)
+    return similarities[:limit]
+
+
+def search_similar_memories(query_text: str = None, limit: int = 5, memory_type: str = None, query_embedding=None):
     """
     Search for similar memories using vector similarity (cosine similarity).
     
     Args:
-        query_text: Query text to search for
+        query_text: Query text to search for (embedded if query_embedding is not given)
         limit: Maximum number of results to return
         memory_type: Filter by type ('knowledge' or 'memory'), None for both
+        query_embedding: Precomputed embedding of the query, skips the embedding API call
         
     Returns:
         List of AssistantMemory objects ordered by similarity (most similar first)
     """
-    # Generate embedding for the query
-    try:
-        query_embedding = get_embedding(query_text)
-    except Exception as e:
-        print(f"Error generating query embedding: {e}")
-        # If embedding generation fails, return empty list
-        return []
+    if query_embedding is None:
+        # Generate embedding for the query
+        try:
+            query_embedding = get_embedding(query_text)
+        except Exception as e:
+            print(f"Error generating query embedding: {e}")
+            # If embedding generation fails, return empty list
+            return []
     
-    # Get all memories of the specified type
-    queryset = AssistantMemory.objects.filter(type=memory_type) if memory_type else AssistantMemory.objects.all()
+    top_ids = [memory_id for memory_id, _ in _search_ids(query_embedding, limit, memory_type)]
     
-    # Calculate similarity for each memory that has an embedding
-    similarities = []
-    for memory in queryset:
-        if memory.embedding:
+    # Fetch the memory objects in one query, preserving similarity order
+    with span('db_fetch'):
+        memories = AssistantMemory.objects.in_bulk(top_ids)
+    return [memories[memory_id] for memory_id in top_ids if memory_id in memories]
+
+
+def _search_ids_by_type(query_embedding, limits: dict) -> dict:
+    """
+    Run top-k searches for several memory types on the configured backend.
+    
+    Returns:
+        Dictionary mapping each type to (memory_id, similarity_score) tuples, most similar first
+    """
+    if use_pgvector():
+        try:
+            ranked = pgvector_search.search_by_type(query_embedding, limits)
+        except ValueError as e:
+            print(f"Error searching pgvector: {e}")
+            ranked = {}
+    else:
+        ranked = {}
+        for memory_type, limit in limits.items():
             try:
-                # Parse the stored embedding (stored as JSON string)
-                stored_embedding = json.loads(memory.embedding)
-                
-                # Calculate cosine similarity
-                similarity_score = cosine_similarity(query_embedding, stored_embedding)
-                
-                # Store tuple of (similarity_score, memory_object)
-                similarities.append((similarity_score, memory))
-            except (json.JSONDecodeError, ValueError, TypeError) as e:
-                # Skip memories with invalid embeddings
-                print(f"Error processing embedding for memory {memory.id}: {e}")
+                ranked[memory_type] = get_index(memory_type).search(query_embedding, limit)
+            except ValueError as e:
+                print(f"Error searching {memory_type} index: {e}")
+    return ranked
+
+
+def search_memories_by_type(query_embedding, limits: dict) -> dict:
+    """
+    Search several memory types with one query embedding in a single pass.
+    
+    Args:
+        query_embedding: Precomputed embedding of the query
+        limits: Maximum number of results per type, e.g. {'knowledge': 10, 'memory': 3}
+        
+    Returns:
+        Dictionary mapping each type to its AssistantMemory objects (most similar first)
+    """
+    ranked = _search_ids_by_type(query_embedding, limits)
+    
+    # Fetch the objects for every type in one query, preserving similarity order
+    top_ids = {memory_type: [memory_id for memory_id, _ in ranked.get(memory_type, [])] for memory_type in limits}
+    with span('db_fetch'):
+        memories = AssistantMemory.objects.in_bulk([memory_id for ids in top_ids.values() for memory_id in ids])
+    return {
+        memory_type: [memories[memory_id] for memory_id in ids if memory_id in memories]
+        for memory_type, ids in top_ids.items()
+    }
+
+
+def search_conversation(query_embedding, conversation_id: str, limit: int) -> list:
+    """
+    Top-k search over one conversation's chat messages.
+    
+    Only the conversation's most recent CONVERSATION_MEMORY_SCAN_LIMIT rows
+    are loaded (through the conversation_id index) and scored, so the cost
+    depends on the conversation's length, not on all traffic ever served.
+    
+    Args:
+        query_embedding: Query embedding
+        conversation_id: Conversation to search
+        limit: Maximum number of results to return
+        
+    Returns:
+        List of (memory_id, similarity_score) tuples, most similar first
+    """
+    with span('db_fetch'):
+        rows = list(
+            AssistantMemory.objects
+            .filter(
+                type='memory', conversation_id=conversation_id, embedding__isnull=False,
+                embedding_model=get_provider().name
+            )
+            .order_by('-created_at')
+            .values_list('id', 'embedding')[:settings.CONVERSATION_MEMORY_SCAN_LIMIT]
+        )
+    
+    query = np.asarray(query_embedding, dtype=np.float32)
+    ids = []
+    vectors = []
+    with span('decode'):
+        for memory_id, embedding in rows:
+            try:
+                vector = decode_embedding(embedding)
+            except (ValueError, TypeError) as e:
+                print(f"Error processing embedding for memory {memory_id}: {e}")
                 continue
+            if vector.shape[0] == query.shape[0]:
+                ids.append(memory_id)
+                vectors.append(vector)
+    if not vectors or limit <= 0:
+        return []
     
-    # Sort by similarity score (highest first) and return top results
-    similarities.sort(key=lambda x: x[0], reverse=True)
+    with span('similarity'):
+        scores = normalize_rows(np.vstack(vectors)) @ normalize_rows(query[np.newaxis, :])[0]
+        top = np.argsort(-scores, kind='stable')[:limit]
+    return [(ids[i], float(scores[i])) for i in top]
+
+
+def reciprocal_rank_fusion(rankings: list, limit: int, k: int = 60) -> list:
+    """
+    Merge several ranked id lists with reciprocal rank fusion.
     
-    # Return only the memory objects (not the similarity scores)
-    return [memory for _, memory in similarities[:limit]]
+    Each list contributes 1 / (k + rank) for every id it contains, so ids
+    ranked well by several retrievers come first without having to compare
+    cosine similarities with full-text ranks.
+    
+    Args:
+        rankings: Lists of ids, best first
+        limit: Maximum number of ids to return
+        k: Damping constant (60 is the usual choice)
+        
+    Returns:
+        List of ids, best first
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, memory_id in enumerate(ranking, start=1):
+            scores[memory_id] = scores.get(memory_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda memory_id: scores[memory_id], reverse=True)[:limit]
+
+
+def _lexical_ids(query_text: str, limit: int, memory_type: str, conversation_id: str = None) -> list:
+    if not settings.HYBRID_SEARCH_ENABLED or not query_text:
+        return []
+    try:
+        with span('lexical_search'):
+            return [
+                memory_id
+                for memory_id, _ in lexical_search.search(query_text, limit, memory_type, conversation_id)
+            ]
+    except Exception as e:
+        print(f"Error in lexical search: {e}")
+        return []
 
 
-def get_relevant_context(query_text: str, knowledge_limit: int = 10, memory_limit: int = 3):
+def hybrid_search(query_text: str, limit: int, memory_type: str, query_embedding=None,
+                  conversation_id: str = None) -> list:
     """
-    Get relevant knowledge and memory for RAG context using vector similarity.
+    Search one memory type with vector and full-text search and fuse the results.
+    
+    Args:
+        query_text: Query text (for full-text search)
+        limit: Maximum number of results to return
+        memory_type: 'knowledge' or 'memory'
+        query_embedding: Query embedding; without it only full-text search is used
+        conversation_id: Restrict chat memory to this conversation
+        
+    Returns:
+        List of AssistantMemory objects (with embeddings loaded), best first
+    """
+    candidates = limit * settings.HYBRID_CANDIDATE_MULTIPLIER
+    conversation_id = conversation_id if memory_type == 'memory' else None
+    rankings = []
+    if query_embedding is not None:
+        if conversation_id:
+            ranked = search_conversation(query_embedding, conversation_id, candidates)
+        else:
+            ranked = _search_ids(query_embedding, candidates, memory_type)
+        rankings.append([memory_id for memory_id, _ in ranked])
+    rankings.append(_lexical_ids(query_text, candidates, memory_type, conversation_id))
+    
+    top_ids = reciprocal_rank_fusion(rankings, limit, settings.RRF_K)
+    # Embeddings are loaded too: the prompt builder uses them to drop near-duplicates
+    with span('db_fetch'):
+        memories = AssistantMemory.objects.with_embeddings().in_bulk(top_ids)
+    return [memories[memory_id] for memory_id in top_ids if memory_id in memories]
+
+
+def get_recent_memories(memory_type: str, limit: int, conversation_id: str = None) -> list:
+    """
+    Get the most recent memories of a type (fallback when vector search finds nothing),
+    optionally only from one conversation.
+    """
+    memories = AssistantMemory.objects.with_embeddings().filter(type=memory_type)
+    if conversation_id:
+        memories = memories.filter(conversation_id=conversation_id)
+    return list(memories.order_by('-created_at')[:limit])
+
+
+def search_context(query_text: str, knowledge_limit: int = 10, memory_limit: int = 3, query_embedding=None,
+                   embed_if_missing: bool = True, conversation_id: str = None):
+    """
+    Get relevant knowledge and memory rows for RAG context using hybrid vector and full-text search.
     
     Args:
         query_text: User query
         knowledge_limit: Number of knowledge chunks to retrieve
         memory_limit: Number of memory chunks to retrieve
+        query_embedding: Precomputed embedding of the query, skips the embedding API call
+        embed_if_missing: Embed the query when no embedding is given; pass False to
+            use full-text search only (e.g. after the embedding API already failed)
+        conversation_id: Restrict chat memory to this conversation
         
     Returns:
-        Dictionary with 'knowledge' and 'memory' lists
-    """
-    # Search for similar knowledge using vector similarity
-    knowledge_results = search_similar_memories(
-        query_text, 
-        limit=knowledge_limit, 
-        memory_type='knowledge'
-    )
-    
-    # Search for similar memory using vector similarity
-    memory_results = search_similar_memories(
-        query_text, 
-        limit=memory_limit, 
-        memory_type='memory'
-    )
-    
-    # If no knowledge results found (e.g., no embeddings exist yet), fallback to recent items
+        Dictionary with 'knowledge' and 'memory' lists of AssistantMemory objects
+        (with embeddings loaded), best first
+    """
+    if query_embedding is None and embed_if_missing:
+        try:
+            query_embedding = get_embedding(query_text)
+        except Exception as e:
+            print(f"Error generating query embedding: {e}")
+    
+    limits = {'knowledge': knowledge_limit, 'memory': memory_limit}
+    multiplier = settings.HYBRID_CANDIDATE_MULTIPLIER
+    
+    # Search knowledge and memory with the same query embedding; a conversation's
+    # memory is scored on its own rather than through the shared index
+    vector_ids = {memory_type: [] for memory_type in limits}
+    if query_embedding is not None:
+        index_limits = {memory_type: limit * multiplier for memory_type, limit in limits.items()}
+        if conversation_id:
+            del index_limits['memory']
+        ranked = _search_ids_by_type(query_embedding, index_limits)
+        if conversation_id:
+            ranked['memory'] = search_conversation(query_embedding, conversation_id, memory_limit * multiplier)
+        vector_ids = {memory_type: [memory_id for memory_id, _ in ranked.get(memory_type, [])] for memory_type in limits}
+    
+    # Fuse with full-text results; these alone still work when embedding the query failed
+    scopes = {'knowledge': None, 'memory': conversation_id}
+    fused_ids = {
+        memory_type: reciprocal_rank_fusion(
+            [vector_ids[memory_type], _lexical_ids(query_text, limit * multiplier, memory_type, scopes[memory_type])],
+            limit,
+            settings.RRF_K
+        )
+        for memory_type, limit in limits.items()
+    }
+    with span('db_fetch'):
+        memories = AssistantMemory.objects.with_embeddings().in_bulk(
+            [memory_id for ids in fused_ids.values() for memory_id in ids]
+        )
+    knowledge_results = [memories[memory_id] for memory_id in fused_ids['knowledge'] if memory_id in memories]
+    memory_results = [memories[memory_id] for memory_id in fused_ids['memory'] if memory_id in memories]
+    
+    # If nothing matched at all (e.g., no embeddings exist yet), fallback to recent items
     if not knowledge_results:
-        all_knowledge = AssistantMemory.objects.filter(type='knowledge').order_by('-created_at')[:knowledge_limit]
-        knowledge_results = list(all_knowledge)
+        knowledge_results = get_recent_memories('knowledge', knowledge_limit)
     
     # Same fallback for memory
     if not memory_results:
-        all_memory = AssistantMemory.objects.filter(type='memory').order_by('-created_at')[:memory_limit]
-        memory_results = list(all_memory)
+        memory_results = get_recent_memories('memory', memory_limit, conversation_id)
     
+    return {'knowledge': knowledge_results, 'memory': memory_results}
+
+
+def get_relevant_context(query_text: str, knowledge_limit: int = 10, memory_limit: int = 3, query_embedding=None,
+                         embed_if_missing: bool = True, conversation_id: str = None):
+    """
+    Get relevant knowledge and memory for RAG context (see search_context).
+    
+    Returns:
+        Dictionary with 'knowledge' and 'memory' lists of texts
+    """
+    results = search_context(query_text, knowledge_limit, memory_limit, query_embedding, embed_if_missing, conversation_id)
     return {
-        'knowledge': [item.content for item in knowledge_results],
-        'memory': [item.content for item in memory_results],
+        'knowledge': [item.content for item in results['knowledge']],
+        'memory': [item.as_transcript() for item in results['memory']],
     }
-
@@ -0,0 +1,169 @@
+"""
+On-disk snapshots of the embedding index.
+
+`python manage.py build_vector_snapshot` writes, per memory type, a
+normalized float32 matrix as a .npy file, the matching row ids as a second
+.npy file and a small JSON file with the snapshot's high-water id. Workers
+memory-map the matrix read-only, so every worker process shares the same
+pages through the OS page cache instead of loading every embedding from
+PostgreSQL into its own heap; only rows newer than the high-water id are
+loaded from the database.
+
+A snapshot only holds vectors of the embedding provider active when it was
+built and is ignored under any other provider.
+"""
+import json
+import os
+import time
+from pathlib import Path
+import numpy as np
+from django.conf import settings
+from assistant.models import AssistantMemory
+from assistant.services.embedding_providers import get_provider
+from assistant.services.vector_codec import decode_embedding
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+def snapshot_paths(memory_type: str, directory=None) -> dict:
+    """
+    Get the file paths of a memory type's snapshot.
+    """
+    directory = Path(directory or settings.VECTOR_SNAPSHOT_DIR)
+    return {
+        'vectors': directory / f"{memory_type}_vectors.npy",
+        'ids': directory / f"{memory_type}_ids.npy",
+        'meta': directory / f"{memory_type}_meta.json",
+    }
+
+
+def write_snapshot(memory_type: str, directory=None) -> dict:
+    """
+    Export all embeddings of a memory type to a snapshot.
+
+    Rows are streamed from the database and written straight into the
+    memory-mapped output, so the export does not hold the corpus in memory.
+    Files are written under temporary names and renamed into place, so
+    workers never see a partial snapshot.
+
+    Args:
+        memory_type: 'knowledge' or 'memory'
+        directory: Output directory (defaults to settings.VECTOR_SNAPSHOT_DIR)
+
+    Returns:
+        Snapshot metadata dictionary
+    """
+    from assistant.services.vector_index import normalize_rows
+
+    paths = snapshot_paths(memory_type, directory)
+    paths['vectors'].parent.mkdir(parents=True, exist_ok=True)
+
+    embedding_model = get_provider().name
+    rows = AssistantMemory.objects.filter(type=memory_type, embedding__isnull=False, embedding_model=embedding_model)
+    high_water_id = rows.order_by('-id').values_list('id', flat=True).first() or 0
+    rows = rows.filter(id__lte=high_water_id)
+    source_rows = rows.count()
+
+    tmp_paths = {name: path.with_name(path.name + '.tmp') for name, path in paths.items()}
+    vectors = None
+    ids = np.zeros(source_rows, dtype=np.int64)
+    count = 0
+    chunk_ids, chunk_vectors = [], []
+
+    def flush_chunk():
+        nonlocal vectors, count
+        if not chunk_vectors:
+            return
+        block = normalize_rows(np.vstack(chunk_vectors))
+        if vectors is None:
+            vectors = np.lib.format.open_memmap(
+                tmp_paths['vectors'], mode='w+', dtype=np.float32, shape=(source_rows, block.shape[1])
+            )
+        vectors[count:count + len(block)] = block
+        ids[count:count + len(block)] = chunk_ids
+        count += len(block)
+        chunk_ids.clear()
+        chunk_vectors.clear()
+
+    dimensions = None
+    for memory_id, embedding in rows.order_by('id').values_list('id', 'embedding').iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        try:
+            vector = decode_embedding(embedding)
+        except (ValueError, TypeError) as e:
+            print(f"Error processing embedding for memory {memory_id}: {e}")
+            continue
+        if dimensions is None:
+            dimensions = vector.shape[0]
+        if vector.shape[0] != dimensions:
+            print(f"Skipping memory {memory_id}: embedding has {vector.shape[0]} dimensions, expected {dimensions}")
+            continue
+        chunk_ids.append(memory_id)
+        chunk_vectors.append(vector)
+        if len(chunk_vectors) >= EXPORT_CHUNK_SIZE:
+            flush_chunk()
+    flush_chunk()
+
+    if vectors is None:
+        # Nothing to export; an empty snapshot still records its high-water id
+        with open(tmp_paths['vectors'], 'wb') as f:
+            np.save(f, np.zeros((0, 0), dtype=np.float32))
+    else:
+        vectors.flush()
+        del vectors
+    with open(tmp_paths['ids'], 'wb') as f:
+        np.save(f, ids[:count])
+
+    meta = {
+        'memory_type': memory_type,
+        'high_water_id': high_water_id,
+        'count': count,
+        'source_rows': source_rows,
+        'dimensions': dimensions or 0,
+        'embedding_model': embedding_model,
+        'created_at': time.time(),
+    }
+    tmp_paths['meta'].write_text(json.dumps(meta))
+
+    for name in ('vectors', 'ids', 'meta'):
+        os.replace(tmp_paths[name], paths[name])
+    return meta
+
+
+def load_snapshot(memory_type: str, directory=None):
+    """
+    Memory-map a memory type's snapshot if one exists and is still valid.
+
+    A snapshot is only used if the database still holds exactly the rows it
+    was built from (rows up to its high-water id); if rows were deleted since,
+    e.g. by re-ingesting the resume, the snapshot is ignored.
+
+    Returns:
+        Tuple of (read-only vector matrix, ids array, high-water id), or None
+    """
+    paths = snapshot_paths(memory_type, directory)
+    if not all(path.exists() for path in paths.values()):
+        return None
+
+    try:
+        meta = json.loads(paths['meta'].read_text())
+        # Empty files cannot be memory-mapped
+        vectors = np.load(paths['vectors'], mmap_mode='r' if meta['count'] else None)
+        ids = np.load(paths['ids'])
+    except (OSError, ValueError) as e:
+        print(f"[WARNING] Could not read {memory_type} vector snapshot: {e}")
+        return None
+
+    embedding_model = get_provider().name
+    if meta.get('embedding_model') != embedding_model:
+        print(f"[INFO] {memory_type} vector snapshot was built for another embedding provider; ignoring it.")
+        return None
+
+    current_rows = AssistantMemory.objects.filter(
+        type=memory_type, embedding__isnull=False, embedding_model=embedding_model,
+        id__lte=meta['high_water_id']
+    ).count()
+    if current_rows != meta['source_rows'] or len(ids) != meta['count']:
+        print(f"[INFO] {memory_type} vector snapshot is stale; rebuilding the index from the database.")
+        return None
+
+    return vectors[:meta['count']], ids, meta['high_water_id']
@@ -0,0 +1,55 @@
+from django.test import SimpleTestCase
+from assistant.services.chunking import chunk_text, iter_chunks, parse_heading
+from assistant.services.tokens import count_tokens
+
+
+class ChunkingTests(SimpleTestCase):
+    TEXT = "\n".join([
+        "EXPERIENCE",
+        "",
+        "Senior Engineer at Example Corp. Built the billing platform. Led a team of five engineers. "
+        "Migrated the monolith to services. Cut deployment time from hours to minutes.",
+        "",
+        "Engineer at Startup Inc. Wrote the first version of the mobile API. Ran the on-call rotation.",
+        "",
+        "SKILLS",
+        "",
+        "Python, Django, PostgreSQL, Kubernetes",
+    ])
+
+    def test_chunks_fit_budget_and_keep_their_heading(self):
+        chunks = chunk_text(self.TEXT, max_tokens=30, overlap_tokens=8)
+        self.assertGreater(len(chunks), 2)
+        for chunk in chunks:
+            heading, _, body = chunk.partition('\n')
+            self.assertIn(heading, ('EXPERIENCE', 'SKILLS'))
+            self.assertLessEqual(count_tokens(heading + '\n') + sum(count_tokens(line) for line in body.split('\n')), 30)
+
+    def test_chunks_never_cross_sections(self):
+        chunks = chunk_text(self.TEXT, max_tokens=30, overlap_tokens=8)
+        self.assertEqual(chunks[-1], "SKILLS\nPython, Django, PostgreSQL, Kubernetes")
+        self.assertTrue(all('Kubernetes' not in chunk for chunk in chunks if chunk.startswith('EXPERIENCE')))
+
+    def test_overlap_repeats_trailing_units(self):
+        chunks = [chunk for chunk in chunk_text(self.TEXT, max_tokens=30, overlap_tokens=8) if chunk.startswith('EXPERIENCE')]
+        overlaps = 0
+        for previous, following in zip(chunks, chunks[1:]):
+            last_unit = previous.split('\n')[-1]
+            if following.split('\n')[1] == last_unit:
+                overlaps += 1
+        self.assertGreater(overlaps, 0)
+
+    def test_small_text_is_one_chunk(self):
+        self.assertEqual(chunk_text("SKILLS\nPython"), ["SKILLS\nPython"])
+        self.assertEqual(chunk_text(""), [])
+
+    def test_streaming_matches_whole_text(self):
+        chunks = list(iter_chunks(iter(self.TEXT.split('\n')), max_tokens=30, overlap_tokens=8))
+        self.assertEqual(chunks, chunk_text(self.TEXT, max_tokens=30, overlap_tokens=8))
+
+    def test_headings(self):
+        self.assertEqual(parse_heading("## Side projects ##"), "Side projects")
+        self.assertEqual(parse_heading("WORK EXPERIENCE"), "WORK EXPERIENCE")
+        self.assertIsNone(parse_heading("AWS: yes"))
+        self.assertIsNone(parse_heading("BSC 2015"))
+        self.assertIsNone(parse_heading("Python, Django"))
@@ -0,0 +1,70 @@
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from assistant.services.conversations import SESSION_KEY, get_conversation_id, validate_conversation_id
+from assistant.services.vector_search import search_conversation
+from assistant.tests.utils import create_memory, embed, local_embeddings
+
+
+class ConversationIdTests(SimpleTestCase):
+    def test_valid_ids(self):
+        self.assertEqual(validate_conversation_id('a' * 64), 'a' * 64)
+        self.assertEqual(validate_conversation_id('tab-2_x'), 'tab-2_x')
+
+    def test_invalid_ids(self):
+        for value in ('', None, 'a' * 65, 'has space', '../x', "x'; --"):
+            with self.assertRaises(ValueError):
+                validate_conversation_id(value)
+
+    def test_session_keeps_one_conversation(self):
+        request = RequestFactory().get('/')
+        request.session = {}
+        conversation_id = get_conversation_id(request)
+        self.assertEqual(request.session[SESSION_KEY], conversation_id)
+        self.assertEqual(get_conversation_id(request), conversation_id)
+        self.assertEqual(get_conversation_id(request, 'mine'), 'mine')
+
+
+@local_embeddings
+class ConversationScopeTests(TestCase):
+    def setUp(self):
+        self.knowledge = create_memory("SKILLS\nPython and Django", 'knowledge')
+        self.mine = create_memory("Do you know Django?", conversation_id='mine', role='user')
+        self.theirs = create_memory("Do you know Django well?", conversation_id='theirs', role='user')
+
+    def session_conversation(self) -> str:
+        self.client.get('/api/chat/history/')
+        return self.client.session[SESSION_KEY]
+
+    def memory_ids(self, **params) -> set:
+        response = self.client.get('/api/memory/', params)
+        self.assertEqual(response.status_code, 200)
+        return {memory['id'] for memory in response.json()['memories']}
+
+    def test_memory_defaults_to_the_session_conversation(self):
+        own = create_memory("Hello", conversation_id=self.session_conversation(), role='user')
+        self.assertEqual(self.memory_ids(), {self.knowledge.id, own.id})
+        self.assertEqual(self.memory_ids(type='memory'), {own.id})
+
+    def test_memory_of_a_given_conversation(self):
+        self.assertEqual(self.memory_ids(conversation_id='mine'), {self.knowledge.id, self.mine.id})
+        self.assertEqual(self.memory_ids(conversation_id='mine', type='knowledge'), {self.knowledge.id})
+
+    def test_memory_rejects_invalid_conversation_ids(self):
+        response = self.client.get('/api/memory/', {'conversation_id': 'not valid'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_history_only_shows_one_conversation(self):
+        response = self.client.get('/api/chat/history/', {'conversation_id': 'theirs'})
+        self.assertEqual([message['text'] for message in response.json()['messages']], [self.theirs.content])
+        response = self.client.get('/api/chat/history/')
+        self.assertEqual(response.json()['messages'], [])
+
+    def test_search_stays_in_the_conversation(self):
+        results = search_conversation(embed("Django"), 'mine', limit=5)
+        self.assertEqual([memory_id for memory_id, _ in results], [self.mine.id])
+        self.assertEqual(search_conversation(embed("Django"), 'nobody', limit=5), [])
+
+    def test_search_skips_rows_of_another_provider(self):
+        with override_settings(HASHING_EMBEDDING_DIMENSIONS=64):
+            create_memory("Django again", conversation_id='mine', role='user')
+        results = search_conversation(embed("Django"), 'mine', limit=5)
+        self.assertEqual([memory_id for memory_id, _ in results], [self.mine.id])
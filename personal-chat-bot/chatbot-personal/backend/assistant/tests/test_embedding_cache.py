@@ -0,0 +1,112 @@
+from datetime import timedelta
+from unittest import mock
+from django.test import TestCase
+from django.utils import timezone
+from assistant.models import EmbeddingCacheEntry
+from assistant.services.embedding_cache import EmbeddingCache, make_key
+from assistant.services.embedding_providers import EmbeddingProvider
+from assistant.services.embeddings import get_embeddings
+
+
+class CountingProvider(EmbeddingProvider):
+    """Remote provider stand-in that counts the texts it embeds."""
+    name = 'counting-test'
+    dimensions = 3
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed(self, texts: list, timeout: float = None, max_retries: int = None) -> list:
+        self.embedded.extend(texts)
+        return [[float(len(text)), 1.0, 0.0] for text in texts]
+
+
+class CacheKeyTests(TestCase):
+    def test_normalized_text_shares_a_key(self):
+        self.assertEqual(make_key('m', "Hello   world\n"), make_key('m', "Hello world"))
+        self.assertEqual(make_key('m', "caf\u00e9"), make_key('m', "cafe\u0301"))
+
+    def test_model_is_part_of_the_key(self):
+        self.assertNotEqual(make_key('a', "text"), make_key('b', "text"))
+
+
+class MemoryTierTests(TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = EmbeddingCache(max_size=2, persistent=False)
+        cache.set('m', 'a', [1.0])
+        cache.set('m', 'b', [2.0])
+        cache.get('m', 'a')
+        cache.set('m', 'c', [3.0])
+        self.assertEqual(cache.get('m', 'a'), [1.0])
+        self.assertIsNone(cache.get('m', 'b'))
+        self.assertEqual(cache.get('m', 'c'), [3.0])
+
+    def test_expired_entries_are_misses(self):
+        cache = EmbeddingCache(ttl_seconds=-1, persistent=False)
+        cache.set('m', 'a', [1.0])
+        self.assertIsNone(cache.get('m', 'a'))
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_memory_only_cache_does_not_query_the_database(self):
+        cache = EmbeddingCache(persistent=False)
+        with self.assertNumQueries(0):
+            cache.set('m', 'a', [1.0])
+            cache.get('m', 'a')
+            cache.get('m', 'b')
+
+    def test_stats_count_hits_per_tier(self):
+        cache = EmbeddingCache(persistent=False)
+        cache.set('m', 'a', [1.0])
+        cache.get_many('m', ['a', 'b'])
+        stats = cache.stats()
+        self.assertEqual((stats['memory_hits'], stats['persistent_hits'], stats['misses']), (1, 0, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+
+class PersistentTierTests(TestCase):
+    def test_entries_survive_a_cleared_memory_tier(self):
+        cache = EmbeddingCache(persistent_days=90)
+        cache.set('m', 'a', [0.5, 0.25])
+        cache.clear()
+        self.assertEqual(cache.get('m', 'a'), [0.5, 0.25])
+        self.assertEqual(cache.stats()['persistent_hits'], 1)
+        # Served from memory again afterwards
+        with self.assertNumQueries(0):
+            self.assertEqual(cache.get('m', 'a'), [0.5, 0.25])
+
+    def test_expired_entries_are_ignored_and_pruned(self):
+        cache = EmbeddingCache(persistent_days=1)
+        cache.set_many('m', {'old': [1.0], 'new': [2.0]})
+        EmbeddingCacheEntry.objects.filter(key=make_key('m', 'old')).update(created_at=timezone.now() - timedelta(days=2))
+        cache.clear()
+        self.assertEqual(cache.get_many('m', ['old', 'new']), {'new': [2.0]})
+        self.assertEqual(cache.prune_persistent(batch_size=1), 1)
+        self.assertEqual(list(EmbeddingCacheEntry.objects.values_list('key', flat=True)), [make_key('m', 'new')])
+
+    def test_storing_again_refreshes_an_expired_entry(self):
+        cache = EmbeddingCache(persistent_days=1)
+        cache.set('m', 'a', [1.0])
+        EmbeddingCacheEntry.objects.update(created_at=timezone.now() - timedelta(days=2))
+        cache.set('m', 'a', [3.0])
+        cache.clear()
+        self.assertEqual(cache.get('m', 'a'), [3.0])
+        self.assertEqual(cache.prune_persistent(), 0)
+
+    def test_keep_forever_never_prunes(self):
+        cache = EmbeddingCache(persistent_days=0)
+        cache.set('m', 'a', [1.0])
+        EmbeddingCacheEntry.objects.update(created_at=timezone.now() - timedelta(days=3650))
+        self.assertEqual(cache.prune_persistent(), 0)
+
+
+class GetEmbeddingsCacheTests(TestCase):
+    def test_cached_texts_skip_the_provider(self):
+        provider = CountingProvider()
+        cache = EmbeddingCache()
+        with mock.patch('assistant.services.embeddings.get_provider', return_value=provider), \
+                mock.patch('assistant.services.embeddings.embedding_cache', cache):
+            first = get_embeddings(['one', 'two', 'one'])
+            second = get_embeddings(['two', 'three'])
+        self.assertEqual(provider.embedded, ['one', 'two', 'three'])
+        self.assertEqual(first[0], first[2])
+        self.assertEqual(second[0], first[1])
@@ -0,0 +1,108 @@
+from types import SimpleNamespace
+from unittest import mock
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, TestCase, override_settings
+from assistant.models import AssistantMemory
+from assistant.services.embedding_providers import (
+    EmbeddingProvider, HashingEmbeddingProvider, OpenAIEmbeddingProvider, get_provider
+)
+from assistant.services.vector_index import invalidate_index
+from assistant.services.vector_search import search_similar_memories
+from assistant.tests.utils import create_memory, embed, local_embeddings
+
+
+class HashingEmbeddingProviderTests(SimpleTestCase):
+    def setUp(self):
+        self.provider = HashingEmbeddingProvider(256)
+
+    def test_vectors_are_deterministic_and_normalized(self):
+        first, second = self.provider.embed(["Python and Django", "Python and Django"])
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), 256)
+        self.assertAlmostEqual(float(np.linalg.norm(first)), 1.0, places=5)
+
+    def test_empty_text_is_the_zero_vector(self):
+        self.assertEqual(self.provider.embed([""])[0], [0.0] * 256)
+
+    def test_shared_wording_is_closer(self):
+        query, related, unrelated = (
+            np.asarray(vector) for vector in self.provider.embed(
+                ["Django developer", "Senior Django developer at Example Corp", "Baked sourdough bread"]
+            )
+        )
+        self.assertGreater(query @ related, query @ unrelated)
+
+    def test_features(self):
+        features = HashingEmbeddingProvider.features("Big DATA data")
+        self.assertEqual(features['w:data'], 2)
+        self.assertEqual(features['b:big data'], 1)
+        self.assertEqual(features['c:<da'], 2)
+
+    def test_name_encodes_version_and_dimensions(self):
+        self.assertEqual(self.provider.name, 'hashing-ngram-v1-256')
+        self.assertNotEqual(HashingEmbeddingProvider(512).name, self.provider.name)
+        self.assertFalse(self.provider.remote)
+
+    def test_async_embed(self):
+        self.assertEqual(async_to_sync(self.provider.aembed)(["Python"]), self.provider.embed(["Python"]))
+
+
+class OpenAIEmbeddingProviderTests(SimpleTestCase):
+    def test_vectors_are_returned_in_input_order(self):
+        client = mock.Mock()
+        client.with_options.return_value = client
+        client.embeddings.create.return_value = SimpleNamespace(data=[
+            SimpleNamespace(index=1, embedding=[0.0, 1.0]),
+            SimpleNamespace(index=0, embedding=[1.0, 0.0]),
+        ])
+        provider = OpenAIEmbeddingProvider('text-embedding-3-small', 2)
+        with mock.patch('assistant.services.embedding_providers.get_client', return_value=client):
+            self.assertEqual(provider.embed(["a", "b"], timeout=5), [[1.0, 0.0], [0.0, 1.0]])
+        client.with_options.assert_called_once_with(timeout=5)
+        client.embeddings.create.assert_called_once_with(model='text-embedding-3-small', input=["a", "b"])
+        self.assertTrue(provider.remote)
+
+
+class GetProviderTests(SimpleTestCase):
+    def test_provider_is_abstract(self):
+        with self.assertRaises(TypeError):
+            EmbeddingProvider()
+
+    def test_selected_by_settings(self):
+        with override_settings(EMBEDDING_PROVIDER='openai', EMBEDDING_MODEL='text-embedding-3-small', EMBEDDING_DIMENSIONS=1536):
+            provider = get_provider()
+            self.assertIsInstance(provider, OpenAIEmbeddingProvider)
+            self.assertEqual((provider.name, provider.dimensions), ('text-embedding-3-small', 1536))
+            self.assertIs(get_provider(), provider)
+        with override_settings(EMBEDDING_PROVIDER='hashing', HASHING_EMBEDDING_DIMENSIONS=128):
+            self.assertEqual(get_provider().name, 'hashing-ngram-v1-128')
+
+    def test_unknown_provider(self):
+        with override_settings(EMBEDDING_PROVIDER='word2vec'):
+            with self.assertRaisesMessage(ValueError, 'word2vec'):
+                get_provider()
+
+
+@local_embeddings
+@override_settings(VECTOR_SNAPSHOT_DIR='/nonexistent', VECTOR_INDEX_CHECK_INTERVAL=0)
+class ProviderIsolationTests(TestCase):
+    def setUp(self):
+        invalidate_index()
+        self.addCleanup(invalidate_index)
+
+    def test_rows_record_their_provider(self):
+        memory = create_memory("Python and Django", 'knowledge')
+        self.assertEqual((memory.embedding_model, memory.embedding_dimensions), (get_provider().name, 512))
+
+    def test_search_only_compares_vectors_of_the_active_provider(self):
+        current = create_memory("Python and Django", 'knowledge')
+        # Same dimensions, different vector space
+        foreign = create_memory("Python and Django developer", 'knowledge')
+        AssistantMemory.objects.filter(pk=foreign.pk).update(embedding_model='text-embedding-ada-002')
+        with override_settings(HASHING_EMBEDDING_DIMENSIONS=64):
+            smaller = create_memory("Python and Django", 'knowledge')
+
+        self.assertEqual(search_similar_memories(query_embedding=embed("Python and Django"), limit=5), [current])
+        with override_settings(HASHING_EMBEDDING_DIMENSIONS=64):
+            self.assertEqual(search_similar_memories(query_embedding=embed("Python and Django"), limit=5), [smaller])
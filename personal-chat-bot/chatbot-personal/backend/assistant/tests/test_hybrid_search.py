@@ -0,0 +1,73 @@
+from django.test import SimpleTestCase, TestCase, override_settings
+from assistant.services.lexical_search import query_terms, search
+from assistant.services.vector_index import invalidate_index
+from assistant.services.vector_search import hybrid_search, reciprocal_rank_fusion
+from assistant.tests.utils import create_memory, embed, local_embeddings
+
+
+class ReciprocalRankFusionTests(SimpleTestCase):
+    def test_ids_ranked_well_by_several_lists_come_first(self):
+        self.assertEqual(reciprocal_rank_fusion([[1, 2, 3], [3, 1]], limit=10), [1, 3, 2])
+
+    def test_limit(self):
+        self.assertEqual(reciprocal_rank_fusion([[1, 2, 3], [4, 5]], limit=2), [1, 4])
+
+    def test_empty(self):
+        self.assertEqual(reciprocal_rank_fusion([], limit=5), [])
+        self.assertEqual(reciprocal_rank_fusion([[], []], limit=5), [])
+
+
+class QueryTermsTests(SimpleTestCase):
+    def test_distinct_lowercase_terms_without_single_characters(self):
+        self.assertEqual(query_terms("Kubernetes, kubernetes and a K8s cluster?"), ['kubernetes', 'and', 'k8s', 'cluster'])
+        self.assertEqual(query_terms(None), [])
+
+
+@local_embeddings
+@override_settings(VECTOR_SNAPSHOT_DIR='/nonexistent', HYBRID_CANDIDATE_MULTIPLIER=4)
+class HybridSearchTests(TestCase):
+    def setUp(self):
+        invalidate_index()
+        self.addCleanup(invalidate_index)
+        self.rows = [
+            create_memory(text, 'knowledge')
+            for text in (
+                "Baked sourdough bread and chocolate cake every weekend",
+                "Led the billing platform team at Example Corp",
+                "SKILLS Kubernetes Terraform",
+                "Wrote the mobile API for a delivery startup",
+            )
+        ]
+        self.kubernetes = self.rows[2]
+        self.chat = create_memory("Which Kubernetes version do you run?", conversation_id='c1')
+
+    def test_lexical_search_counts_matching_terms(self):
+        ranked = search("kubernetes terraform", limit=5, memory_type='knowledge')
+        self.assertEqual(ranked, [(self.kubernetes.id, 2.0)])
+        self.assertEqual([memory_id for memory_id, _ in search("kubernetes", limit=5)], [self.chat.id, self.kubernetes.id])
+        self.assertEqual(search("kubernetes", limit=5, conversation_id='other'), [])
+
+    def test_exact_term_match_outranks_the_closest_embedding(self):
+        query_embedding = embed("chocolate cake recipe")
+        results = hybrid_search("Kubernetes", limit=1, memory_type='knowledge', query_embedding=query_embedding)
+        self.assertEqual(results, [self.kubernetes])
+        self.assertNotIn('embedding', results[0].get_deferred_fields())
+
+    def test_vector_search_only_when_disabled(self):
+        query_embedding = embed("Baked sourdough bread and chocolate cake")
+        with override_settings(HYBRID_SEARCH_ENABLED=False):
+            results = hybrid_search("Kubernetes", limit=1, memory_type='knowledge', query_embedding=query_embedding)
+        self.assertEqual(results, [self.rows[0]])
+
+    def test_full_text_only_without_an_embedding(self):
+        self.assertEqual(hybrid_search("Terraform", limit=3, memory_type='knowledge'), [self.kubernetes])
+
+    def test_chat_memory_stays_in_its_conversation(self):
+        self.assertEqual(
+            hybrid_search("Kubernetes", limit=3, memory_type='memory', query_embedding=embed("Kubernetes"), conversation_id='c1'),
+            [self.chat]
+        )
+        self.assertEqual(
+            hybrid_search("Kubernetes", limit=3, memory_type='memory', query_embedding=embed("Kubernetes"), conversation_id='c2'),
+            []
+        )
@@ -0,0 +1,179 @@
+import io
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from assistant.models import AssistantMemory, KnowledgeDocument
+from assistant.services import ingestion
+from assistant.services.ingestion import ingest_document, ingest_paths
+from assistant.tests.utils import local_embeddings
+
+SECTIONS = {
+    'EXPERIENCE': "Senior Engineer at Example Corp. Built the billing platform.",
+    'PROJECTS': "Wrote a personal chat bot that answers questions about my resume.",
+    'SKILLS': "Python, Django, PostgreSQL, Kubernetes",
+}
+
+
+@local_embeddings
+@override_settings(CHUNK_MAX_TOKENS=40, CHUNK_OVERLAP_TOKENS=0, VECTOR_SNAPSHOT_DIR='/nonexistent')
+class IncrementalIngestionTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = Path(directory) / 'resume.md'
+
+    def write(self, sections):
+        self.path.write_text('\n\n'.join(f"{heading}\n\n{body}" for heading, body in sections.items()), encoding='utf-8')
+
+    def ingest(self, **kwargs):
+        embedded = []
+        get_embeddings = ingestion.get_embeddings
+
+        def record(texts):
+            embedded.extend(texts)
+            return get_embeddings(texts)
+
+        with mock.patch('assistant.services.ingestion.get_embeddings', side_effect=record):
+            stats = ingest_document(self.path, **kwargs)
+        return stats, embedded
+
+    def chunks(self):
+        return set(AssistantMemory.objects.filter(type='knowledge').values_list('content', flat=True))
+
+    def test_first_ingestion_embeds_every_chunk(self):
+        self.write(SECTIONS)
+        stats, embedded = self.ingest()
+        self.assertEqual(stats['added'], 3)
+        self.assertEqual(len(embedded), 3)
+        self.assertEqual(self.chunks(), {f"{heading}\n{body}" for heading, body in SECTIONS.items()})
+        document = KnowledgeDocument.objects.get()
+        self.assertEqual(document.chunk_count, 3)
+        self.assertEqual(document.chunks.count(), 3)
+
+    def test_unchanged_file_is_skipped(self):
+        self.write(SECTIONS)
+        self.ingest()
+        stats, embedded = self.ingest()
+        self.assertTrue(stats['skipped'])
+        self.assertEqual(stats['unchanged'], 3)
+        self.assertEqual(embedded, [])
+
+    def test_force_rechunks_without_reembedding(self):
+        self.write(SECTIONS)
+        self.ingest()
+        stats, embedded = self.ingest(force=True)
+        self.assertFalse(stats['skipped'])
+        self.assertEqual((stats['added'], stats['deleted'], stats['unchanged']), (0, 0, 3))
+        self.assertEqual(embedded, [])
+
+    def test_only_changed_chunks_are_embedded(self):
+        self.write(SECTIONS)
+        self.ingest()
+        ids = dict(AssistantMemory.objects.values_list('content', 'id'))
+
+        self.write({**SECTIONS, 'SKILLS': "Python, Django, Rust"})
+        stats, embedded = self.ingest()
+        self.assertEqual(embedded, ["SKILLS\nPython, Django, Rust"])
+        self.assertEqual((stats['added'], stats['deleted'], stats['unchanged']), (1, 1, 2))
+        self.assertNotIn(f"SKILLS\n{SECTIONS['SKILLS']}", self.chunks())
+        # Unchanged chunks keep their rows
+        for heading in ('EXPERIENCE', 'PROJECTS'):
+            content = f"{heading}\n{SECTIONS[heading]}"
+            self.assertEqual(AssistantMemory.objects.get(content=content).id, ids[content])
+
+    def test_removed_section_is_deleted(self):
+        self.write(SECTIONS)
+        self.ingest()
+        self.write({heading: SECTIONS[heading] for heading in ('EXPERIENCE', 'SKILLS')})
+        stats, embedded = self.ingest()
+        self.assertEqual(embedded, [])
+        self.assertEqual(stats['deleted'], 1)
+        self.assertEqual(len(self.chunks()), 2)
+        self.assertEqual(KnowledgeDocument.objects.get().chunk_count, 2)
+
+    def test_changing_chunk_settings_counts_as_a_change(self):
+        self.write(SECTIONS)
+        self.ingest()
+        with override_settings(CHUNK_OVERLAP_TOKENS=5):
+            stats, _ = self.ingest()
+        self.assertFalse(stats['skipped'])
+
+
+@local_embeddings
+@override_settings(CHUNK_MAX_TOKENS=40, CHUNK_OVERLAP_TOKENS=0, INGEST_BATCH_SIZE=2, VECTOR_SNAPSHOT_DIR='/nonexistent')
+class IngestionPipelineTests(TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = self.directory / 'resume.md'
+        self.path.write_text('\n\n'.join(f"{heading}\n\n{body}" for heading, body in SECTIONS.items()), encoding='utf-8')
+
+    def test_no_transaction_is_open_while_embedding(self):
+        # TestCase wraps each test in a transaction of its own
+        outer_blocks = len(connection.atomic_blocks)
+        get_embeddings = ingestion.get_embeddings
+        depths = []
+
+        def record(texts):
+            depths.append(len(connection.atomic_blocks))
+            return get_embeddings(texts)
+
+        with mock.patch('assistant.services.ingestion.get_embeddings', side_effect=record):
+            stats = ingest_document(self.path)
+        self.assertEqual(stats['added'], 3)
+        self.assertEqual(depths, [outer_blocks, outer_blocks])
+
+    def test_embedding_failure_leaves_previous_chunks(self):
+        ingest_document(self.path)
+        before = set(AssistantMemory.objects.values_list('id', flat=True))
+        digest = KnowledgeDocument.objects.get().content_hash
+
+        self.path.write_text("SKILLS\n\nRust, Go", encoding='utf-8')
+        with mock.patch('assistant.services.ingestion.get_embeddings', side_effect=RuntimeError('rate limited')):
+            with self.assertRaises(RuntimeError):
+                ingest_document(self.path)
+        self.assertEqual(set(AssistantMemory.objects.values_list('id', flat=True)), before)
+        self.assertEqual(KnowledgeDocument.objects.get().content_hash, digest)
+
+    def test_failed_new_document_is_not_recorded(self):
+        with mock.patch('assistant.services.ingestion.get_embeddings', side_effect=RuntimeError('rate limited')):
+            with self.assertRaises(RuntimeError):
+                ingest_document(self.path)
+        self.assertFalse(KnowledgeDocument.objects.exists())
+
+    def test_command_fails_when_a_document_fails(self):
+        with mock.patch('assistant.services.ingestion.get_embeddings', side_effect=RuntimeError('rate limited')):
+            with self.assertRaises(CommandError):
+                call_command('ingest_resume', str(self.path), workers=1, stdout=io.StringIO())
+
+    def test_command_fails_on_errors_outside_documents(self):
+        with mock.patch('assistant.management.commands.ingest_resume.ingest_paths', side_effect=OSError('disk full')):
+            with self.assertRaisesMessage(CommandError, 'disk full'):
+                call_command('ingest_resume', str(self.path), stdout=io.StringIO())
+
+
+@local_embeddings
+@override_settings(CHUNK_MAX_TOKENS=40, CHUNK_OVERLAP_TOKENS=0, VECTOR_SNAPSHOT_DIR='/nonexistent')
+class IngestPathsTests(TransactionTestCase):
+    # Documents are ingested on pool threads, which use connections of their own
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = self.directory / 'resume.md'
+        self.path.write_text('\n\n'.join(f"{heading}\n\n{body}" for heading, body in SECTIONS.items()), encoding='utf-8')
+
+    def test_several_documents_and_prune(self):
+        other = self.directory / 'projects.md'
+        other.write_text("PROJECTS\n\nA compiler for a toy language.", encoding='utf-8')
+        report = ingest_paths([self.directory], workers=1)
+        self.assertEqual((report['documents'], report['failed'], report['added']), (2, 0, 4))
+
+        report = ingest_paths([self.path], workers=1, prune=True)
+        self.assertEqual((report['skipped'], report['deleted']), (1, 1))
+        self.assertEqual(KnowledgeDocument.objects.count(), 1)
+        self.assertEqual(AssistantMemory.objects.filter(type='knowledge').count(), 3)
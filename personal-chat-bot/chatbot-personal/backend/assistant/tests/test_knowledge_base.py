@@ -0,0 +1,98 @@
+from datetime import timedelta
+from unittest import mock
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from assistant.models import KnowledgeBaseState
+from assistant.services import knowledge_base
+from assistant.services.knowledge_base import (
+    claim_ingestion, ensure_ingested, get_state, is_searchable, record_ingestion
+)
+from assistant.tests.utils import create_memory, local_embeddings
+
+
+@local_embeddings
+@override_settings(KB_STATE_CHECK_INTERVAL=3600, AUTO_INGEST_LOCK_TIMEOUT=600)
+class KnowledgeBaseStateTests(TestCase):
+    def setUp(self):
+        # Each test starts with a process that has not read the state yet
+        patcher = mock.patch.multiple(knowledge_base, _state=None, _checked_at=0.0, _seen_version=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.invalidate_index = self.patch('invalidate_index')
+        self.response_cache = self.patch('response_cache')
+
+    def patch(self, name):
+        patcher = mock.patch.object(knowledge_base, name)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def bump_version(self):
+        """Record an ingestion the way another process would."""
+        KnowledgeBaseState.load()
+        KnowledgeBaseState.objects.filter(pk=1).update(version=F('version') + 1)
+
+    def test_only_one_caller_claims_ingestion(self):
+        self.assertTrue(claim_ingestion())
+        self.assertFalse(claim_ingestion())
+        self.assertEqual(KnowledgeBaseState.objects.get().status, 'ingesting')
+
+    def test_abandoned_claim_can_be_taken_over(self):
+        self.assertTrue(claim_ingestion())
+        KnowledgeBaseState.objects.update(ingest_started_at=timezone.now() - timedelta(seconds=601))
+        self.assertTrue(claim_ingestion())
+        self.assertFalse(claim_ingestion())
+
+    def test_finished_job_can_be_claimed_again(self):
+        self.assertTrue(claim_ingestion())
+        KnowledgeBaseState.objects.update(status='failed')
+        self.assertTrue(claim_ingestion())
+
+    def test_state_is_read_at_most_once_per_interval(self):
+        self.assertEqual(get_state()['version'], 0)
+        self.bump_version()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_state()['version'], 0)
+        self.assertEqual(get_state(refresh=True)['version'], 1)
+
+    def test_new_version_from_another_process_clears_caches(self):
+        get_state()
+        self.invalidate_index.assert_not_called()
+        self.bump_version()
+        get_state(refresh=True)
+        self.invalidate_index.assert_called_once_with('knowledge')
+        self.response_cache.invalidate.assert_called_once_with()
+
+        # Already applied
+        get_state(refresh=True)
+        self.invalidate_index.assert_called_once()
+
+    def test_record_ingestion_bumps_version_and_counts_active_provider_chunks(self):
+        get_state()
+        create_memory("SKILLS\nPython", 'knowledge')
+        with override_settings(HASHING_EMBEDDING_DIMENSIONS=64):
+            create_memory("SKILLS\nRust", 'knowledge')
+        self.assertEqual(record_ingestion(changed=True), 1)
+        self.assertEqual(record_ingestion(changed=False), 1)
+
+        state = get_state()
+        self.assertEqual(state['chunk_count'], 1)
+        self.assertTrue(is_searchable(state))
+        # The ingesting process cleared its own caches already
+        self.invalidate_index.assert_not_called()
+
+    def test_knowledge_of_another_provider_is_not_searchable(self):
+        create_memory("SKILLS\nPython", 'knowledge')
+        record_ingestion(changed=True)
+        self.assertTrue(is_searchable(get_state()))
+        with override_settings(HASHING_EMBEDDING_DIMENSIONS=64):
+            self.assertFalse(is_searchable(get_state()))
+        self.assertFalse(is_searchable({'chunk_count': 0, 'embedding_model': get_state()['embedding_model']}))
+
+    def test_empty_knowledge_base_schedules_background_ingestion(self):
+        schedule = self.patch('schedule_auto_ingest')
+        self.assertFalse(ensure_ingested())
+        schedule.assert_not_called()
+        with override_settings(AUTO_INGEST_ENABLED=True):
+            self.assertFalse(ensure_ingested())
+        schedule.assert_called_once_with()
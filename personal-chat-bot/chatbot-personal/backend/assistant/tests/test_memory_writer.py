@@ -0,0 +1,92 @@
+import threading
+import time
+from unittest import mock
+from django.test import SimpleTestCase, TestCase
+from assistant.models import AssistantMemory, MemoryIndexState
+from assistant.services.memory_writer import MemoryWriter
+from assistant.tests.utils import embed, local_embeddings
+
+
+class QueueTests(SimpleTestCase):
+    """
+    Queueing and batching, with the database write replaced by a recorder.
+    """
+
+    def make_writer(self, **options) -> MemoryWriter:
+        writer = MemoryWriter(**options)
+        self.batches = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+        def write_batch(batch):
+            self.gate.wait()
+            self.batches.append([item['content'] for item in batch])
+
+        writer._write_batch = write_batch
+        self.addCleanup(writer.shutdown, 1.0)
+        self.addCleanup(self.gate.set)
+        return writer
+
+    def test_rows_are_written_in_batches(self):
+        writer = self.make_writer(batch_size=3, flush_interval=5.0)
+        for i in range(3):
+            writer.submit(f"m{i}", role='user', conversation_id='c')
+        writer.flush()
+        self.assertEqual(self.batches, [['m0', 'm1', 'm2']])
+
+    def test_partial_batch_is_written_after_the_flush_interval(self):
+        writer = self.make_writer(batch_size=10, flush_interval=0.05)
+        writer.submit("m0")
+        writer.submit("m1")
+        writer.flush()
+        self.assertEqual(self.batches, [['m0', 'm1']])
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        writer = self.make_writer(batch_size=1, flush_interval=0.01, max_queue_size=2)
+        self.gate.clear()
+        started = time.monotonic()
+        with mock.patch('builtins.print'):
+            results = [writer.submit(f"m{i}") for i in range(6)]
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertIn(False, results)
+        self.assertEqual(writer.dropped, results.count(False))
+        self.gate.set()
+        writer.flush()
+        self.assertEqual(sum(len(batch) for batch in self.batches), results.count(True))
+
+    def test_shutdown_with_a_full_queue_is_bounded(self):
+        writer = self.make_writer(batch_size=1, flush_interval=0.01, max_queue_size=1)
+        self.gate.clear()
+        with mock.patch('builtins.print'):
+            for i in range(3):
+                writer.submit(f"m{i}")
+            started = time.monotonic()
+            writer.shutdown(timeout=0.2)
+        self.assertLess(time.monotonic() - started, 1.0)
+
+
+@local_embeddings
+class WriteBatchTests(TestCase):
+    def item(self, content, embedding=None, role='user'):
+        return {'content': content, 'type': 'memory', 'embedding': embedding, 'role': role, 'conversation_id': 'c'}
+
+    def test_embeds_missing_embeddings_in_one_request(self):
+        writer = MemoryWriter()
+        with mock.patch('assistant.services.memory_writer.get_embeddings', wraps=lambda texts: [embed(t) for t in texts]) as get_embeddings:
+            writer._write_batch([self.item("hello", embed("hello")), self.item("first"), self.item("second", role='assistant')])
+        get_embeddings.assert_called_once_with(["first", "second"])
+        rows = AssistantMemory.objects.with_embeddings().order_by('id')
+        self.assertEqual([row.content for row in rows], ["hello", "first", "second"])
+        self.assertTrue(all(row.embedding is not None and row.conversation_id == 'c' for row in rows))
+        self.assertEqual(writer.written, 3)
+        self.assertEqual(MemoryIndexState.objects.get(pk='memory').version, 1)
+
+    def test_rows_are_kept_when_embedding_fails(self):
+        writer = MemoryWriter()
+        with mock.patch('assistant.services.memory_writer.get_embeddings', side_effect=Exception("down")), \
+                mock.patch('builtins.print'):
+            writer._write_batch([self.item("hello")])
+        row = AssistantMemory.objects.with_embeddings().get()
+        self.assertEqual((row.content, row.embedding, row.embedding_model), ("hello", None, None))
+        # Nothing new for the vector index
+        self.assertFalse(MemoryIndexState.objects.filter(pk='memory').exists())
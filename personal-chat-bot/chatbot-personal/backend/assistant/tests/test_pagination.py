@@ -0,0 +1,67 @@
+from datetime import timedelta
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from assistant.models import AssistantMemory
+from assistant.services.pagination import decode_cursor, encode_cursor, paginate_before, parse_limit
+
+
+class PaginationTests(TestCase):
+    def test_cursor_round_trip(self):
+        created_at = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(created_at, 42)), (created_at, 42))
+
+    def test_invalid_cursor(self):
+        for cursor in ('', 'not-a-cursor', encode_cursor(timezone.now(), 1)[:-3]):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
+
+    def test_pages_cover_every_row_once(self):
+        rows = [
+            AssistantMemory.objects.create(content=str(i), type='memory', role='user', conversation_id='c')
+            for i in range(5)
+        ]
+        # Two rows share a timestamp, so the id has to break the tie
+        now = timezone.now()
+        for i, row in enumerate(rows):
+            AssistantMemory.objects.filter(pk=row.pk).update(created_at=now + timedelta(seconds=min(i, 3)))
+
+        queryset = AssistantMemory.objects.filter(conversation_id='c')
+        pages = []
+        cursor = None
+        while True:
+            page, cursor = paginate_before(queryset, 2, cursor)
+            pages.append([row.content for row in page])
+            if cursor is None:
+                break
+        self.assertEqual(pages, [['4', '3'], ['2', '1'], ['0']])
+
+
+class ParseLimitTests(SimpleTestCase):
+    def test_default_and_clamping(self):
+        self.assertEqual(parse_limit(None, 50, 200), 50)
+        self.assertEqual(parse_limit('', 50, 200), 50)
+        self.assertEqual(parse_limit('500', 50, 200), 200)
+        self.assertEqual(parse_limit('0', 50, 200), 1)
+
+    def test_non_integer(self):
+        with self.assertRaises(ValueError):
+            parse_limit('ten', 50, 200)
+
+
+class ChatHistoryPaginationTests(TestCase):
+    def test_pages_follow_next_cursor(self):
+        for i in range(3):
+            AssistantMemory.objects.create(content=f"q{i}", type='memory', role='user', conversation_id='c')
+            AssistantMemory.objects.create(content=f"a{i}", type='memory', role='assistant', conversation_id='c')
+
+        first = self.client.get('/api/chat/history/', {'conversation_id': 'c', 'limit': 4}).json()
+        self.assertEqual([m['text'] for m in first['messages']], ['q1', 'a1', 'q2', 'a2'])
+        second = self.client.get(
+            '/api/chat/history/', {'conversation_id': 'c', 'limit': 4, 'before': first['next_cursor']}
+        ).json()
+        self.assertEqual([m['text'] for m in second['messages']], ['q0', 'a0'])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_bad_cursor_is_a_client_error(self):
+        response = self.client.get('/api/chat/history/', {'conversation_id': 'c', 'before': 'garbage'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,95 @@
+import numpy as np
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from assistant.models import AssistantMemory
+from assistant.services.embeddings import embedding_fields
+from assistant.services.prompt_builder import build_context, merge_overlapping, mmr_order
+from assistant.services.tokens import count_tokens
+from assistant.tests.utils import embed, local_embeddings
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def row(memory_id: int, content: str, document_id: int = None, **fields) -> AssistantMemory:
+    """An unsaved retrieved row, embedded with the active provider."""
+    return AssistantMemory(id=memory_id, content=content, document_id=document_id, **embedding_fields(embed(content)), **fields)
+
+
+class MMROrderTests(SimpleTestCase):
+    def setUp(self):
+        self.a = unit([1, 0, 0])
+        self.similar_to_a = unit([0.9, 0.44, 0])  # cosine ~0.9 with a
+        self.b = unit([0, 0, 1])
+
+    def test_lambda_one_keeps_retrieval_order(self):
+        self.assertEqual(mmr_order([self.a, self.similar_to_a, self.b], lambda_=1.0, duplicate_threshold=0.99), [0, 1, 2])
+
+    def test_penalizes_rows_similar_to_picked_ones(self):
+        self.assertEqual(mmr_order([self.a, self.similar_to_a, self.b], lambda_=0.5, duplicate_threshold=0.99), [0, 2, 1])
+
+    def test_drops_near_duplicates(self):
+        self.assertEqual(mmr_order([self.a, self.a, self.b], lambda_=0.7, duplicate_threshold=0.95), [0, 2])
+
+    def test_rows_without_vectors_are_kept(self):
+        self.assertEqual(mmr_order([None, self.a, None], lambda_=0.7, duplicate_threshold=0.95), [0, 1, 2])
+
+    def test_duplicates_of_earlier_kept_rows(self):
+        order = mmr_order([self.a, self.b], lambda_=0.7, duplicate_threshold=0.95, kept_vectors=[self.a])
+        self.assertEqual(order, [1])
+
+
+class MergeOverlappingTests(SimpleTestCase):
+    def test_drops_repeated_heading_and_overlap(self):
+        self.assertEqual(merge_overlapping("SKILLS\na\nb", "SKILLS\nb\nc"), "SKILLS\na\nb\nc")
+
+    def test_joins_chunks_without_overlap(self):
+        self.assertEqual(merge_overlapping("SKILLS\na", "SKILLS\nc"), "SKILLS\na\nc")
+
+
+@local_embeddings
+@override_settings(PROMPT_CONTEXT_TOKENS=1000, PROMPT_MEMORY_TOKENS=200, PROMPT_MMR_LAMBDA=0.7, PROMPT_DUPLICATE_THRESHOLD=0.95)
+class BuildContextTests(SimpleTestCase):
+    def test_duplicate_knowledge_is_dropped(self):
+        context = build_context([
+            row(1, "EXPERIENCE\nLed the billing platform team", document_id=1),
+            row(9, "EXPERIENCE\nLed the billing platform team", document_id=2),
+        ], [])
+        self.assertEqual(context['knowledge'], ["EXPERIENCE\nLed the billing platform team"])
+        self.assertEqual((context['retrieved'], context['dropped']), (2, 1))
+
+    def test_neighbouring_chunks_are_merged(self):
+        context = build_context([
+            row(2, "SKILLS\nKubernetes and Terraform\nPostgreSQL tuning", document_id=1),
+            row(1, "SKILLS\nPython and Django\nKubernetes and Terraform", document_id=1),
+        ], [])
+        self.assertEqual(context['knowledge'], ["SKILLS\nPython and Django\nKubernetes and Terraform\nPostgreSQL tuning"])
+        self.assertEqual(context['dropped'], 0)
+
+    def test_chunks_of_different_documents_are_not_merged(self):
+        context = build_context([
+            row(1, "SKILLS\nPython and Django", document_id=1),
+            row(2, "PROJECTS\nA compiler for a toy language", document_id=2),
+        ], [])
+        self.assertEqual(len(context['knowledge']), 2)
+
+    def test_memory_repeating_knowledge_is_dropped(self):
+        context = build_context(
+            [row(1, "Led the billing platform team", document_id=1)],
+            [row(5, "Led the billing platform team", role='user'), row(6, "Do you enjoy hiking?", role='user')]
+        )
+        self.assertEqual(context['memory'], ["User: Do you enjoy hiking?"])
+        self.assertEqual(context['dropped'], 1)
+
+    def test_context_fits_the_token_budget(self):
+        knowledge = [row(i * 10, f"PROJECTS\nProject number {i} built with Django and Celery", document_id=i) for i in range(1, 30)]
+        memory = [row(1000 + i, f"Question {i} about the weather in Lisbon", role='user') for i in range(20)]
+        with override_settings(PROMPT_CONTEXT_TOKENS=60, PROMPT_MEMORY_TOKENS=20):
+            context = build_context(knowledge, memory)
+        knowledge_tokens = sum(count_tokens(text, settings.CHAT_MODEL) for text in context['knowledge'])
+        self.assertLessEqual(knowledge_tokens, 40)
+        self.assertLessEqual(context['context_tokens'], 60)
+        self.assertTrue(context['memory'])
+        self.assertGreater(context['dropped'], 0)
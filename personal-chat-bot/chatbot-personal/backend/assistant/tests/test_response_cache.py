@@ -0,0 +1,84 @@
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from assistant.services import llm
+from assistant.services.response_cache import ResponseCache
+
+ANSWER = {'response': "I work with Python.", 'relevant_knowledge': ["SKILLS\nPython"]}
+
+
+class ResponseCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = ResponseCache(max_size=2, threshold=0.95)
+
+    def test_similar_question_hits_and_dissimilar_misses(self):
+        self.cache.store([1.0, 0.0, 0.0], ANSWER)
+        hit = self.cache.lookup([0.99, 0.05, 0.0])
+        self.assertEqual(hit['response'], ANSWER['response'])
+        self.assertGreater(hit['similarity'], 0.95)
+        self.assertIsNone(self.cache.lookup([0.0, 1.0, 0.0]))
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_conversation_scoped_answers_stay_in_their_conversation(self):
+        self.cache.store([1.0, 0.0], ANSWER, conversation_id='alice')
+        self.assertIsNone(self.cache.lookup([1.0, 0.0], conversation_id='bob'))
+        self.assertIsNone(self.cache.lookup([1.0, 0.0]))
+        self.assertIsNotNone(self.cache.lookup([1.0, 0.0], conversation_id='alice'))
+
+    def test_shared_answers_reach_every_conversation(self):
+        self.cache.store([1.0, 0.0], ANSWER)
+        self.assertIsNotNone(self.cache.lookup([1.0, 0.0], conversation_id='bob'))
+
+    def test_answers_from_before_an_invalidation_are_discarded(self):
+        version = self.cache.version
+        self.cache.store([1.0, 0.0], ANSWER, version=version)
+        self.cache.invalidate()
+        self.assertIsNone(self.cache.lookup([1.0, 0.0]))
+        # Generated against the old knowledge base, stored after the change
+        self.cache.store([1.0, 0.0], ANSWER, version=version)
+        self.assertIsNone(self.cache.lookup([1.0, 0.0]))
+        self.cache.store([1.0, 0.0], ANSWER, version=self.cache.version)
+        self.assertIsNotNone(self.cache.lookup([1.0, 0.0]))
+
+    def test_least_recently_used_answer_is_evicted(self):
+        self.cache.store([1.0, 0.0, 0.0], dict(ANSWER, response='a'))
+        self.cache.store([0.0, 1.0, 0.0], dict(ANSWER, response='b'))
+        self.cache.lookup([1.0, 0.0, 0.0])
+        self.cache.store([0.0, 0.0, 1.0], dict(ANSWER, response='c'))
+        self.assertEqual(self.cache.lookup([1.0, 0.0, 0.0])['response'], 'a')
+        self.assertIsNone(self.cache.lookup([0.0, 1.0, 0.0]))
+        self.assertEqual(self.cache.stats()['size'], 2)
+
+    def test_embedding_dimensions_change_resets_the_cache(self):
+        self.cache.store([1.0, 0.0], ANSWER)
+        self.assertIsNone(self.cache.lookup([1.0, 0.0, 0.0]))
+        self.cache.store([1.0, 0.0, 0.0], ANSWER)
+        self.assertIsNone(self.cache.lookup([1.0, 0.0]))
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=True)
+class ChatCacheScopeTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = ResponseCache(threshold=0.95)
+        patcher = mock.patch.object(llm, 'response_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_answers_built_from_chat_memory_are_scoped(self):
+        llm._cache_response([1.0, 0.0], dict(ANSWER), self.cache.version, {'memory': ["User: hi"]}, 'alice')
+        self.assertIsNone(self.cache.lookup([1.0, 0.0], 'bob'))
+        self.assertIsNotNone(self.cache.lookup([1.0, 0.0], 'alice'))
+
+    def test_answers_from_knowledge_alone_are_shared(self):
+        llm._cache_response([1.0, 0.0], dict(ANSWER), self.cache.version, {'memory': []}, 'alice')
+        self.assertIsNotNone(self.cache.lookup([1.0, 0.0], 'bob'))
+
+    def test_cache_hit_keeps_the_conversation_history(self):
+        self.cache.store([1.0, 0.0], ANSWER)
+        with mock.patch.object(llm.memory_writer, 'submit') as submit:
+            result = llm._cached_response("What do you use?", [1.0, 0.0], 'alice')
+        self.assertTrue(result['cached'])
+        self.assertEqual(
+            [(call.args[0], call.kwargs['role']) for call in submit.call_args_list],
+            [("What do you use?", 'user'), (ANSWER['response'], 'assistant')]
+        )
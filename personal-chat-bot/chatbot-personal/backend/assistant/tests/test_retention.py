@@ -0,0 +1,126 @@
+import gzip
+import json
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from assistant.models import AssistantMemory, MemoryIndexState
+from assistant.services import retention
+from assistant.services.retention import compact_memory, expired_message_ids
+from assistant.tests.utils import create_memory, local_embeddings
+
+
+def fake_summary(rows):
+    return f"Summary of {len(rows)} rows"
+
+
+@local_embeddings
+@override_settings(
+    MEMORY_RETENTION_DAYS=30, MEMORY_RETENTION_MAX_MESSAGES=100, MEMORY_RETENTION_DELETE_BATCH=500,
+    MEMORY_RETENTION_BATCH_PAUSE=0, MEMORY_SUMMARY_ENABLED=True, MEMORY_SUMMARY_INPUT_TOKENS=3000,
+    MEMORY_MAX_SUMMARIES=5, MEMORY_SUMMARY_RETENTION_DAYS=365, MEMORY_ARCHIVE_DIR='',
+)
+class CompactMemoryTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(retention, 'summarize', side_effect=fake_summary)
+        self.summarize = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def message(self, content, days_ago=0, conversation_id='c1', role='user'):
+        memory = create_memory(content, conversation_id=conversation_id, role=role)
+        created_at = timezone.now() - timedelta(days=days_ago)
+        AssistantMemory.objects.filter(pk=memory.pk).update(created_at=created_at)
+        memory.created_at = created_at
+        return memory
+
+    def rows(self, conversation_id='c1'):
+        return list(AssistantMemory.objects.filter(conversation_id=conversation_id).order_by('created_at', 'id'))
+
+    def test_old_messages_are_replaced_by_a_summary(self):
+        self.message("Where did you work?", days_ago=40)
+        newest_old = self.message("At Example Corp.", days_ago=35, role='assistant')
+        recent = self.message("And before that?", days_ago=1)
+
+        report = compact_memory()
+        self.assertEqual(
+            (report['conversations'], report['messages_removed'], report['summaries_created']), (1, 2, 1)
+        )
+        summary, kept = self.rows()
+        self.assertEqual((summary.role, summary.content), ('summary', "Summary of 2 rows"))
+        self.assertEqual(summary.created_at, newest_old.created_at)
+        self.assertIsNotNone(AssistantMemory.objects.with_embeddings().get(pk=summary.pk).embedding)
+        self.assertEqual(kept.id, recent.id)
+
+    def test_only_the_latest_messages_of_a_conversation_are_kept(self):
+        for i in range(5):
+            self.message(f"Message {i}", days_ago=5 - i)
+        self.message("Other conversation", days_ago=5, conversation_id='c2')
+        with override_settings(MEMORY_RETENTION_MAX_MESSAGES=3):
+            self.assertEqual(len(expired_message_ids('c1', timezone.now() - timedelta(days=30), 3)), 2)
+            report = compact_memory()
+        self.assertEqual(report['messages_removed'], 2)
+        self.assertEqual([row.content for row in self.rows()][1:], ["Message 2", "Message 3", "Message 4"])
+        self.assertEqual(len(self.rows('c2')), 1)
+
+    def test_local_vector_indexes_are_told_to_rebuild(self):
+        self.message("Where did you work?", days_ago=40)
+        compact_memory()
+        self.assertGreater(MemoryIndexState.objects.get(pk='memory').generation, 0)
+
+    def test_dry_run_changes_nothing(self):
+        old = self.message("Where did you work?", days_ago=40)
+        report = compact_memory(dry_run=True)
+        self.assertEqual((report['conversations'], report['messages_removed']), (1, 1))
+        self.summarize.assert_not_called()
+        self.assertEqual(self.rows(), [old])
+
+    def test_summarization_failure_keeps_the_messages(self):
+        old = self.message("Where did you work?", days_ago=40)
+        self.summarize.side_effect = RuntimeError('rate limited')
+        report = compact_memory()
+        self.assertEqual(report['messages_removed'], 0)
+        self.assertEqual(self.rows(), [old])
+
+    def test_delete_only_without_summaries(self):
+        self.message("Where did you work?", days_ago=40)
+        with override_settings(MEMORY_SUMMARY_ENABLED=False):
+            report = compact_memory()
+        self.assertEqual((report['messages_removed'], report['summaries_created']), (1, 0))
+        self.summarize.assert_not_called()
+        self.assertEqual(self.rows(), [])
+
+    def test_excess_summaries_are_folded(self):
+        for i in range(4):
+            self.message(f"Summary {i}", days_ago=100 - i, role='summary')
+        self.message("Where did you work?", days_ago=40)
+        with override_settings(MEMORY_MAX_SUMMARIES=3):
+            report = compact_memory()
+        # Five summaries after compaction; the oldest three become one
+        self.assertEqual((report['summaries_created'], report['summaries_folded']), (1, 3))
+        self.assertEqual([row.content for row in self.rows()], ["Summary of 3 rows", "Summary 3", "Summary of 1 rows"])
+
+    def test_old_summaries_expire(self):
+        self.message("Summary", days_ago=400, role='summary')
+        kept = self.message("Summary", days_ago=10, role='summary')
+        report = compact_memory()
+        self.assertEqual(report['summaries_expired'], 1)
+        self.assertEqual(self.rows(), [kept])
+
+    def test_deleted_rows_are_archived(self):
+        self.message("Where did you work?", days_ago=40)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        compact_memory(archive_dir=directory)
+        [archive] = Path(directory).iterdir()
+        with gzip.open(archive, 'rt', encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual([(row['conversation_id'], row['content']) for row in rows], [('c1', "Where did you work?")])
+
+    def test_concurrent_run_is_skipped(self):
+        self.message("Where did you work?", days_ago=40)
+        with retention._lock:
+            self.assertTrue(compact_memory()['skipped'])
+        self.assertEqual(len(self.rows()), 1)
@@ -0,0 +1,62 @@
+import json
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+from assistant.services.vector_codec import HEADER, decode_embedding, encode_embedding
+
+
+class VectorCodecTests(SimpleTestCase):
+    def setUp(self):
+        self.vector = np.random.default_rng(0).uniform(-1, 1, 1536).astype(np.float32)
+
+    def test_float32_round_trip_is_exact(self):
+        data = encode_embedding(self.vector, 'float32')
+        self.assertEqual(len(data), HEADER.size + 4 * 1536)
+        decoded = decode_embedding(data)
+        self.assertEqual(decoded.dtype, np.float32)
+        np.testing.assert_array_equal(decoded, self.vector)
+
+    def test_float16_round_trip(self):
+        data = encode_embedding(self.vector, 'float16')
+        self.assertEqual(len(data), HEADER.size + 2 * 1536)
+        decoded = decode_embedding(data)
+        self.assertEqual(decoded.dtype, np.float32)
+        np.testing.assert_allclose(decoded, self.vector, atol=1e-3)
+
+    def test_int8_round_trip_within_half_a_step(self):
+        data = encode_embedding(self.vector, 'int8')
+        self.assertEqual(len(data), HEADER.size + 1536)
+        decoded = decode_embedding(data)
+        self.assertEqual(decoded.dtype, np.float32)
+        step = float(np.max(np.abs(self.vector))) / 127
+        np.testing.assert_allclose(decoded, self.vector, atol=step / 2 + 1e-6)
+
+    def test_int8_all_zeros(self):
+        data = encode_embedding([0.0] * 8, 'int8')
+        self.assertEqual(HEADER.unpack_from(data)[2], 1.0)
+        decoded = decode_embedding(data)
+        self.assertFalse(np.isnan(decoded).any())
+        np.testing.assert_array_equal(decoded, np.zeros(8, dtype=np.float32))
+
+    def test_memoryview_input(self):
+        data = encode_embedding(self.vector, 'float32')
+        np.testing.assert_array_equal(decode_embedding(memoryview(data)), self.vector)
+
+    @override_settings(EMBEDDING_STORAGE_DTYPE='float16')
+    def test_default_dtype_from_settings(self):
+        self.assertEqual(len(encode_embedding(self.vector)), HEADER.size + 2 * 1536)
+
+    def test_unknown_dtype(self):
+        with self.assertRaises(ValueError):
+            encode_embedding(self.vector, 'float64')
+
+    def test_legacy_headerless_data_is_rejected(self):
+        # Raw float32 bytes (migration 0005) and JSON text (before it) gained headers in migration 0006
+        for data in (np.full(4, 0.5, dtype='<f4').tobytes(), json.dumps([0.5] * 4).encode()):
+            with self.assertRaises(ValueError):
+                decode_embedding(data)
+
+    def test_truncated_data_is_rejected(self):
+        data = encode_embedding(self.vector, 'float32')
+        for truncated in (data[:HEADER.size - 1], data[:-1]):
+            with self.assertRaises(ValueError):
+                decode_embedding(truncated)
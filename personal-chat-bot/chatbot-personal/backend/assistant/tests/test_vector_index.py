@@ -0,0 +1,81 @@
+from django.db.models import F
+from django.test import TestCase, override_settings
+from assistant.models import AssistantMemory, MemoryIndexState
+from assistant.services.vector_index import MemoryIndex, get_index, invalidate_index, record_write
+from assistant.tests.utils import create_memory, embed, local_embeddings
+
+
+def bump(memory_type: str, field: str):
+    """Change the counters the way another process's record_write would, without touching local indexes."""
+    MemoryIndexState.objects.get_or_create(pk=memory_type)
+    MemoryIndexState.objects.filter(pk=memory_type).update(**{field: F(field) + 1})
+
+
+@local_embeddings
+@override_settings(VECTOR_INDEX_CHECK_INTERVAL=3600, VECTOR_SNAPSHOT_DIR='/nonexistent')
+class MemoryIndexTests(TestCase):
+    def setUp(self):
+        self.index = MemoryIndex('knowledge')
+        self.python = create_memory("Python and Django backend development", 'knowledge', id=100)
+        self.kubernetes = create_memory("Kubernetes cluster operations", 'knowledge', id=200)
+        record_write(['knowledge'])
+
+    def search_ids(self, text: str, limit: int = 10) -> list:
+        return [memory_id for memory_id, _ in self.index.search(embed(text), limit)]
+
+    def test_finds_most_similar_rows_first(self):
+        self.assertEqual(self.search_ids("Django backend development")[0], self.python.id)
+        self.assertEqual(len(self.index), 2)
+
+    def test_only_indexes_its_memory_type(self):
+        create_memory("Python and Django chat message")
+        self.assertNotIn(AssistantMemory.objects.get(type='memory').id, self.search_ids("Python"))
+
+    def test_no_queries_between_checks(self):
+        self.search_ids("Python")
+        with self.assertNumQueries(0):
+            self.search_ids("Python")
+
+    def test_rows_of_other_processes_appear_after_the_check_interval(self):
+        self.search_ids("Python")
+        rust = create_memory("Rust systems programming", 'knowledge')
+        bump('knowledge', 'version')
+        self.assertNotIn(rust.id, self.search_ids("Rust"))
+        with override_settings(VECTOR_INDEX_CHECK_INTERVAL=0):
+            self.assertEqual(self.search_ids("Rust")[0], rust.id)
+
+    def test_rows_committed_out_of_id_order_are_caught_up(self):
+        self.search_ids("Python")
+        # Took its id before the newest indexed row, but its transaction committed after it
+        late = create_memory("Elixir and Phoenix", 'knowledge', id=150)
+        bump('knowledge', 'version')
+        self.index.mark_stale()
+        self.assertEqual(self.search_ids("Elixir Phoenix")[0], late.id)
+        self.assertEqual(len(self.index), 3)
+
+    def test_rows_deleted_by_other_processes_are_dropped(self):
+        self.search_ids("Python")
+        AssistantMemory.objects.filter(pk=self.kubernetes.pk).delete()
+        bump('knowledge', 'generation')
+        self.index.mark_stale()
+        self.assertEqual(self.search_ids("Kubernetes"), [self.python.id])
+
+    def test_local_writes_are_seen_on_the_next_search(self):
+        index = get_index('knowledge')
+        self.addCleanup(invalidate_index)
+        index.search(embed("Python"), 5)
+        rust = create_memory("Rust systems programming", 'knowledge')
+        record_write(['knowledge'])
+        self.assertEqual(index.search(embed("Rust"), 1)[0][0], rust.id)
+
+    def test_record_write_creates_and_bumps_counters(self):
+        record_write(['memory', 'memory'])
+        record_write(['memory'], rebuild=True)
+        state = MemoryIndexState.objects.get(pk='memory')
+        self.assertEqual((state.version, state.generation), (1, 1))
+
+    def test_provider_switch_rebuilds(self):
+        self.search_ids("Python")
+        with override_settings(HASHING_EMBEDDING_DIMENSIONS=64):
+            self.assertEqual(self.search_ids("Python"), [])
+        self.assertEqual(self.search_ids("Python")[0], self.python.id)
@@ -0,0 +1,60 @@
+import tempfile
+from unittest import mock
+import numpy as np
+from django.test import TestCase, override_settings
+from assistant.models import AssistantMemory
+from assistant.services.vector_index import MemoryIndex, record_write
+from assistant.services.vector_snapshot import load_snapshot, write_snapshot
+from assistant.tests.utils import create_memory, embed, local_embeddings
+
+
+@local_embeddings
+class VectorSnapshotTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.rows = [
+            create_memory("Python and Django", 'knowledge'),
+            create_memory("Kubernetes operations", 'knowledge'),
+        ]
+
+    def test_round_trip(self):
+        meta = write_snapshot('knowledge', self.directory)
+        self.assertEqual((meta['count'], meta['high_water_id']), (2, self.rows[-1].id))
+
+        vectors, ids, high_water_id = load_snapshot('knowledge', self.directory)
+        self.assertIsInstance(vectors, np.memmap)
+        self.assertEqual(list(ids), [row.id for row in self.rows])
+        self.assertEqual(high_water_id, self.rows[-1].id)
+        np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-5)
+        expected = np.asarray(embed("Python and Django"), dtype=np.float32)
+        np.testing.assert_allclose(vectors[0], expected / np.linalg.norm(expected), atol=1e-6)
+
+    def test_snapshot_with_deleted_rows_is_ignored(self):
+        write_snapshot('knowledge', self.directory)
+        self.rows[0].delete()
+        with mock.patch('builtins.print'):
+            self.assertIsNone(load_snapshot('knowledge', self.directory))
+
+    def test_snapshot_of_another_provider_is_ignored(self):
+        write_snapshot('knowledge', self.directory)
+        with override_settings(HASHING_EMBEDDING_DIMENSIONS=64), mock.patch('builtins.print'):
+            self.assertIsNone(load_snapshot('knowledge', self.directory))
+
+    def test_empty_snapshot_keeps_its_high_water_id(self):
+        meta = write_snapshot('memory', self.directory)
+        vectors, ids, high_water_id = load_snapshot('memory', self.directory)
+        self.assertEqual((meta['count'], len(ids), high_water_id), (0, 0, 0))
+
+    def test_index_uses_the_snapshot_and_loads_newer_rows(self):
+        write_snapshot('knowledge', self.directory)
+        newer = create_memory("Rust systems programming", 'knowledge')
+        record_write(['knowledge'])
+        index = MemoryIndex('knowledge')
+        with override_settings(VECTOR_SNAPSHOT_DIR=self.directory):
+            results = index.search(embed("Rust systems programming"), 3)
+        self.assertIsNotNone(index._base_matrix)
+        self.assertEqual(index._size, 1)
+        self.assertEqual(results[0][0], newer.id)
+        self.assertEqual({memory_id for memory_id, _ in results}, set(AssistantMemory.objects.values_list('id', flat=True)))
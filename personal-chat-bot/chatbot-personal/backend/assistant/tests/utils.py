@@ -0,0 +1,32 @@
+"""
+Helpers shared by the test modules.
+
+Tests embed with the local hashing provider (no API key or network access);
+modules that need chat completions patch them per test.
+"""
+from django.test import override_settings
+from assistant.models import AssistantMemory
+from assistant.services.embedding_providers import get_provider
+from assistant.services.embeddings import embedding_fields
+
+local_embeddings = override_settings(
+    EMBEDDING_PROVIDER='hashing',
+    AUTO_INGEST_ENABLED=False,
+    MEMORY_RETENTION_INTERVAL=0,
+)
+
+
+def embed(text: str) -> list:
+    """
+    Embed text with the active provider.
+    """
+    return get_provider().embed([text])[0]
+
+
+def create_memory(content: str, memory_type: str = 'memory', **fields) -> AssistantMemory:
+    """
+    Insert a row embedded with the active provider.
+    """
+    return AssistantMemory.objects.create(
+        content=content, type=memory_type, **embedding_fields(embed(content)), **fields
+    )
@@ -4,6 +4,9 @@ from assistant import views
 urlpatterns = [
     # API endpoints
     path('chat/history/', views.get_chat_history, name='chat_history'),  # GET /api/chat/history/
+    path('chat/stream/', views.chat_stream, name='chat_stream'),  # POST /api/chat/stream/
+    path('chat/async/stream/', views.chat_stream_async, name='chat_stream_async'),  # POST /api/chat/async/stream/
+    path('chat/async/', views.chat_async, name='chat_async'),  # POST /api/chat/async/
     path('chat/', views.chat, name='chat'),  # POST /api/chat/
     path('memory/', views.get_memory, name='memory'),  # GET /api/memory/
     # HTML view - should be last to avoid conflicts
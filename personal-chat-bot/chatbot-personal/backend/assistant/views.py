@@ -1,14 +1,27 @@
+import json
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
+from django.conf import settings
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
-from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
+from django.views.decorators.http import require_GET, require_POST
 from assistant.serializers import (
     ChatRequestSerializer, 
     ChatResponseSerializer, 
     MemorySerializer
 )
-from assistant.services.llm import generate_response
+from assistant.services.conversations import aget_conversation_id, get_conversation_id
+from assistant.services.llm import (
+    agenerate_response,
+    astream_response,
+    generate_response,
+    stream_response
+)
+from assistant.services.metrics import registry
+from assistant.services.pagination import paginate_before, parse_limit
 from assistant.models import AssistantMemory
 
 
@@ -17,6 +30,8 @@ def chat(request):
     """
     POST /api/chat/
     Send a message to the AI assistant.
+    
+    The conversation is the request's `conversation_id`, or the session's.
     """
     serializer = ChatRequestSerializer(data=request.data)
     
@@ -26,8 +41,10 @@ def chat(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
+    conversation_id = get_conversation_id(request, serializer.validated_data.get('conversation_id'))
     try:
-        result = generate_response(serializer.validated_data['message'])
+        result = generate_response(serializer.validated_data['message'], conversation_id)
+        result['conversation_id'] = conversation_id
         response_serializer = ChatResponseSerializer(result)
         return Response(response_serializer.data, status=status.HTTP_200_OK)
     except Exception as e:
@@ -37,44 +54,180 @@ def chat(request):
         )
 
 
+def _format_sse(event: dict) -> str:
+    """
+    Format an event dictionary as a server-sent event.
+    """
+    name = event.pop('event')
+    return f"event: {name}\ndata: {json.dumps(event)}\n\n"
+
+
+@api_view(['POST'])
+def chat_stream(request):
+    """
+    POST /api/chat/stream/
+    Send a message to the AI assistant and stream the answer as server-sent events.
+    
+    Events: 'token' ({"content": ...}) as the answer is generated, then
+    'done' ({"relevant_knowledge": [...], "prompt_tokens": ..., "time_to_first_token_ms": ..., "total_ms": ...})
+    or 'error' ({"error": ...}). The conversation id is sent in the
+    X-Conversation-Id header.
+    """
+    serializer = ChatRequestSerializer(data=request.data)
+    
+    if not serializer.is_valid():
+        return Response(
+            serializer.errors, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    conversation_id = get_conversation_id(request, serializer.validated_data.get('conversation_id'))
+    events = stream_response(serializer.validated_data['message'], conversation_id)
+    response = StreamingHttpResponse(
+        (_format_sse(event) for event in events),
+        content_type='text/event-stream'
+    )
+    response['X-Conversation-Id'] = conversation_id
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx)
+    return response
+
+
+def _parse_chat_request(request):
+    """
+    Validate a JSON chat request body for the async views (which bypass DRF).
+    
+    Returns:
+        Tuple of (validated data, error response); exactly one is None
+    """
+    try:
+        data = json.loads(request.body or b'{}')
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None, JsonResponse({'error': 'Invalid JSON body'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = ChatRequestSerializer(data=data)
+    if not serializer.is_valid():
+        return None, JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    return serializer.validated_data, None
+
+
+# The async views are plain Django views because DRF views are sync-only.
+# Like the DRF views above, they are exempt from CSRF checks.
+@csrf_exempt
+@require_POST
+async def chat_async(request):
+    """
+    POST /api/chat/async/
+    Async version of POST /api/chat/ for ASGI deployments.
+    """
+    data, error_response = _parse_chat_request(request)
+    if error_response:
+        return error_response
+    
+    conversation_id = await aget_conversation_id(request, data.get('conversation_id'))
+    try:
+        result = await agenerate_response(data['message'], conversation_id)
+        result['conversation_id'] = conversation_id
+        response_serializer = ChatResponseSerializer(result)
+        return JsonResponse(response_serializer.data, status=status.HTTP_200_OK)
+    except Exception as e:
+        return JsonResponse(
+            {'error': str(e)}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@csrf_exempt
+@require_POST
+async def chat_stream_async(request):
+    """
+    POST /api/chat/async/stream/
+    Async version of POST /api/chat/stream/ for ASGI deployments.
+    """
+    data, error_response = _parse_chat_request(request)
+    if error_response:
+        return error_response
+    
+    conversation_id = await aget_conversation_id(request, data.get('conversation_id'))
+    
+    async def events():
+        async for event in astream_response(data['message'], conversation_id):
+            yield _format_sse(event)
+    
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['X-Conversation-Id'] = conversation_id
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx)
+    return response
+
+
 @api_view(['GET'])
 def get_memory(request):
     """
-    GET /api/memory/
-    Retrieve stored memories.
+    GET /api/memory/?limit=50&before=<cursor>&type=<knowledge|memory>&conversation_id=<id>
+    Retrieve stored memories, newest first, one page at a time.
+    
+    Knowledge rows are shared; chat memory is only returned for one
+    conversation: the given conversation_id, or the session's.
     """
-    memories = AssistantMemory.objects.all().order_by('-created_at')[:50]
-    serializer = MemorySerializer(memories, many=True)
-    return Response({'memories': serializer.data}, status=status.HTTP_200_OK)
+    try:
+        limit = parse_limit(request.query_params.get('limit'), settings.HISTORY_PAGE_SIZE, settings.HISTORY_MAX_PAGE_SIZE)
+        conversation_id = get_conversation_id(request, request.query_params.get('conversation_id'))
+        memories = AssistantMemory.objects.filter(
+            Q(type='knowledge') | Q(type='memory', conversation_id=conversation_id)
+        )
+        memory_type = request.query_params.get('type')
+        if memory_type:
+            memories = memories.filter(type=memory_type)
+        page, next_cursor = paginate_before(memories, limit, request.query_params.get('before'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = MemorySerializer(page, many=True)
+    return Response({'memories': serializer.data, 'next_cursor': next_cursor}, status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
 def get_chat_history(request):
     """
-    GET /api/chat/history/
-    Retrieve chat history (user messages and assistant responses).
-    """
-    # Get only memory type entries (chat messages), ordered by creation time
-    memories = AssistantMemory.objects.filter(type='memory').order_by('created_at')
-    
-    # Parse messages from content (format: "User: message" or "Assistant: message")
-    chat_messages = []
-    for memory in memories:
-        content = memory.content
-        if content.startswith('User: '):
-            chat_messages.append({
-                'text': content.replace('User: ', '', 1),
-                'isUser': True,
-                'created_at': memory.created_at.isoformat()
-            })
-        elif content.startswith('Assistant: '):
-            chat_messages.append({
-                'text': content.replace('Assistant: ', '', 1),
-                'isUser': False,
-                'created_at': memory.created_at.isoformat()
-            })
-    
-    return Response({'messages': chat_messages}, status=status.HTTP_200_OK)
+    GET /api/chat/history/?limit=50&before=<cursor>&conversation_id=<id>
+    Retrieve chat history (user messages and assistant responses) of one
+    conversation: the given conversation_id, or the session's.
+    
+    Returns the most recent page in chronological order; pass next_cursor
+    as `before` to load the page of older messages.
+    """
+    try:
+        limit = parse_limit(request.query_params.get('limit'), settings.HISTORY_PAGE_SIZE, settings.HISTORY_MAX_PAGE_SIZE)
+        conversation_id = get_conversation_id(request, request.query_params.get('conversation_id'))
+        # Only this conversation's chat messages (not summaries); served by the (conversation_id, created_at) index
+        memories = AssistantMemory.objects.filter(
+            type='memory', role__in=('user', 'assistant'), conversation_id=conversation_id
+        ).only('id', 'content', 'role', 'created_at')
+        page, next_cursor = paginate_before(memories, limit, request.query_params.get('before'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    chat_messages = [
+        {
+            'text': memory.content,
+            'isUser': memory.role == 'user',
+            'created_at': memory.created_at.isoformat()
+        }
+        for memory in reversed(page)
+    ]
+    
+    return Response({'messages': chat_messages, 'next_cursor': next_cursor}, status=status.HTTP_200_OK)
+
+
+@require_GET
+def metrics(request):
+    """
+    GET /metrics
+    Latency histograms (p50/p95/p99) and request counters of this worker
+    in the Prometheus text format.
+    """
+    return HttpResponse(registry.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 @ensure_csrf_cookie
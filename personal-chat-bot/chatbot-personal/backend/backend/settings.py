@@ -61,6 +61,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'assistant.middleware.TimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -186,6 +187,132 @@ if not OPENAI_API_KEY:
 else:
     print(f"[ENV] ✓ OPENAI_API_KEY is configured")
 
+# OpenAI client: one pooled client per process, shared by embeddings and completions.
+# OPENAI_BASE_URL can point at a local stub server for benchmarks.
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', '')
+OPENAI_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', '100'))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('OPENAI_MAX_KEEPALIVE_CONNECTIONS', '20'))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', '30'))  # seconds
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '60'))  # seconds
+OPENAI_CONNECT_TIMEOUT = float(os.getenv('OPENAI_CONNECT_TIMEOUT', '5'))  # seconds
+OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '2'))
+
+# Chat completion
+CHAT_MODEL = 'gpt-3.5-turbo'
+CHAT_TEMPERATURE = 0.7
+CHAT_MAX_TOKENS = 500
+
+# Latency metrics (see assistant/services/metrics.py): observations kept per histogram
+# for p50/p95/p99
+METRICS_WINDOW_SIZE = int(os.getenv('METRICS_WINDOW_SIZE', '2048'))
+
+# Chat memory retention (see assistant/services/retention.py, run by `python manage.py compact_memory`
+# or in each worker every MEMORY_RETENTION_INTERVAL seconds, 0 = off): messages older than
+# MEMORY_RETENTION_DAYS or beyond the latest MEMORY_RETENTION_MAX_MESSAGES of a conversation are
+# summarized (MEMORY_SUMMARY_INPUT_TOKENS of transcript per summary) and deleted
+MEMORY_RETENTION_INTERVAL = float(os.getenv('MEMORY_RETENTION_INTERVAL', '0'))  # seconds
+MEMORY_RETENTION_DAYS = int(os.getenv('MEMORY_RETENTION_DAYS', '30'))
+MEMORY_RETENTION_MAX_MESSAGES = int(os.getenv('MEMORY_RETENTION_MAX_MESSAGES', '200'))
+MEMORY_SUMMARY_ENABLED = os.getenv('MEMORY_SUMMARY_ENABLED', 'true').lower() == 'true'  # false: delete only
+MEMORY_SUMMARY_INPUT_TOKENS = int(os.getenv('MEMORY_SUMMARY_INPUT_TOKENS', '3000'))
+MEMORY_SUMMARY_MAX_TOKENS = int(os.getenv('MEMORY_SUMMARY_MAX_TOKENS', '200'))
+MEMORY_MAX_SUMMARIES = int(os.getenv('MEMORY_MAX_SUMMARIES', '20'))  # per conversation; older ones are folded
+MEMORY_SUMMARY_RETENTION_DAYS = int(os.getenv('MEMORY_SUMMARY_RETENTION_DAYS', '365'))  # 0 = keep forever
+# Deleted rows are appended to gzipped JSON lines files here first (empty = no archive)
+MEMORY_ARCHIVE_DIR = os.getenv('MEMORY_ARCHIVE_DIR', '')
+MEMORY_RETENTION_DELETE_BATCH = int(os.getenv('MEMORY_RETENTION_DELETE_BATCH', '500'))
+MEMORY_RETENTION_BATCH_PAUSE = float(os.getenv('MEMORY_RETENTION_BATCH_PAUSE', '0.05'))  # seconds
+
+# Knowledge base state (see assistant/services/knowledge_base.py): how often workers
+# re-read the version record, whether an empty knowledge base is ingested in the
+# background (retried after AUTO_INGEST_RETRY_INTERVAL if it did not succeed), and after
+# how many seconds an unfinished auto-ingestion claim expires
+KB_STATE_CHECK_INTERVAL = float(os.getenv('KB_STATE_CHECK_INTERVAL', '10'))  # seconds
+AUTO_INGEST_ENABLED = os.getenv('AUTO_INGEST_ENABLED', 'true').lower() == 'true'
+AUTO_INGEST_RETRY_INTERVAL = float(os.getenv('AUTO_INGEST_RETRY_INTERVAL', '300'))  # seconds
+AUTO_INGEST_LOCK_TIMEOUT = int(os.getenv('AUTO_INGEST_LOCK_TIMEOUT', '600'))  # seconds
+
+# Prompt assembly (see assistant/services/prompt_builder.py): token budget for the
+# retrieved context, the part of it reserved for chat memory, the MMR relevance weight
+# and the similarity above which a retrieved row counts as a duplicate
+PROMPT_CONTEXT_TOKENS = int(os.getenv('PROMPT_CONTEXT_TOKENS', '1500'))
+PROMPT_MEMORY_TOKENS = int(os.getenv('PROMPT_MEMORY_TOKENS', '300'))
+PROMPT_MMR_LAMBDA = float(os.getenv('PROMPT_MMR_LAMBDA', '0.7'))
+PROMPT_DUPLICATE_THRESHOLD = float(os.getenv('PROMPT_DUPLICATE_THRESHOLD', '0.95'))
+
+# Chat memory search scores at most this many of a conversation's most recent messages
+CONVERSATION_MEMORY_SCAN_LIMIT = int(os.getenv('CONVERSATION_MEMORY_SCAN_LIMIT', '1000'))
+
+# Chat history / memory listing page sizes (keyset pagination)
+HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', '50'))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv('HISTORY_MAX_PAGE_SIZE', '200'))
+
+# Semantic response cache: reuse answers to questions within this cosine similarity
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '500'))
+RESPONSE_CACHE_THRESHOLD = float(os.getenv('RESPONSE_CACHE_THRESHOLD', '0.95'))
+
+# Write-behind queue for conversation memory (see assistant/services/memory_writer.py)
+MEMORY_WRITE_BATCH_SIZE = int(os.getenv('MEMORY_WRITE_BATCH_SIZE', '32'))
+MEMORY_WRITE_FLUSH_INTERVAL = float(os.getenv('MEMORY_WRITE_FLUSH_INTERVAL', '1.0'))  # seconds
+MEMORY_WRITE_QUEUE_SIZE = int(os.getenv('MEMORY_WRITE_QUEUE_SIZE', '1000'))  # rows beyond this are dropped
+
+# In-process vector index (see assistant/services/vector_index.py): how often a search checks
+# whether another process added or deleted rows, and how many ids below the newest indexed
+# row are re-scanned on catch-up (rows whose transactions committed out of id order)
+VECTOR_INDEX_CHECK_INTERVAL = float(os.getenv('VECTOR_INDEX_CHECK_INTERVAL', '1'))  # seconds
+VECTOR_INDEX_CATCHUP_WINDOW = int(os.getenv('VECTOR_INDEX_CATCHUP_WINDOW', '5000'))  # ids
+
+# Vector search backend: 'numpy' (in-process index) or 'pgvector' (HNSW search in PostgreSQL).
+# Falls back to 'numpy' when the pgvector column has not been created (see check_pgvector.py).
+VECTOR_SEARCH_BACKEND = os.getenv('VECTOR_SEARCH_BACKEND', 'numpy')
+EMBEDDING_MODEL = 'text-embedding-ada-002'
+EMBEDDING_DIMENSIONS = 1536
+
+# Embedding provider: 'openai' (EMBEDDING_MODEL over the API) or 'hashing' (in-process hashed n-gram
+# encoder on the CPU: no network, sub-millisecond queries, coarser retrieval; see services/embedding_providers.py).
+# Vectors are stored with their provider's name and search only uses the active provider's vectors;
+# re-run `python manage.py ingest_resume` after switching. pgvector needs EMBEDDING_DIMENSIONS vectors.
+EMBEDDING_PROVIDER = os.getenv('EMBEDDING_PROVIDER', 'openai')
+HASHING_EMBEDDING_DIMENSIONS = int(os.getenv('HASHING_EMBEDDING_DIMENSIONS', '512'))
+
+# Storage encoding for new embeddings: 'float32' (exact), 'float16' (half size) or 'int8' (quarter size, scaled)
+# Existing rows can be converted with: python manage.py reencode_embeddings --dtype <dtype>
+EMBEDDING_STORAGE_DTYPE = os.getenv('EMBEDDING_STORAGE_DTYPE', 'float32')
+
+# Memory-mapped index snapshots written by `python manage.py build_vector_snapshot`
+VECTOR_SNAPSHOT_DIR = os.getenv('VECTOR_SNAPSHOT_DIR', str(BASE_DIR / 'vector_snapshot'))
+
+# Hybrid retrieval: vector results are fused with PostgreSQL full-text results (reciprocal rank fusion).
+# Each retriever contributes limit * HYBRID_CANDIDATE_MULTIPLIER candidates.
+HYBRID_SEARCH_ENABLED = os.getenv('HYBRID_SEARCH_ENABLED', 'true').lower() == 'true'
+HYBRID_CANDIDATE_MULTIPLIER = int(os.getenv('HYBRID_CANDIDATE_MULTIPLIER', '2'))
+RRF_K = int(os.getenv('RRF_K', '60'))
+# Give up on embedding the chat query after this many seconds and answer from full-text search alone
+QUERY_EMBEDDING_TIMEOUT = float(os.getenv('QUERY_EMBEDDING_TIMEOUT', '5'))
+
+# Embedding cache: in-memory LRU (size/TTL bounded) backed by the assistant_embedding_cache table
+EMBEDDING_CACHE_SIZE = int(os.getenv('EMBEDDING_CACHE_SIZE', '10000'))
+EMBEDDING_CACHE_TTL = int(os.getenv('EMBEDDING_CACHE_TTL', '86400'))  # seconds
+EMBEDDING_CACHE_PERSISTENT = os.getenv('EMBEDDING_CACHE_PERSISTENT', 'true').lower() == 'true'
+# Persistent entries older than this are ignored and deleted by `manage.py compact_memory` (0 = keep forever)
+EMBEDDING_CACHE_PERSISTENT_DAYS = float(os.getenv('EMBEDDING_CACHE_PERSISTENT_DAYS', '90'))
+
+# Knowledge base chunking (token budgets per chunk and overlap between consecutive chunks)
+CHUNK_MAX_TOKENS = int(os.getenv('CHUNK_MAX_TOKENS', '200'))
+CHUNK_OVERLAP_TOKENS = int(os.getenv('CHUNK_OVERLAP_TOKENS', '30'))
+
+# Ingestion pipeline: documents processed concurrently and chunks per embed/insert batch
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', '4'))
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', '256'))
+
+# Batched embedding requests (get_embeddings)
+EMBEDDING_BATCH_MAX_INPUTS = int(os.getenv('EMBEDDING_BATCH_MAX_INPUTS', '256'))
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv('EMBEDDING_BATCH_MAX_TOKENS', '50000'))
+EMBEDDING_CONCURRENCY = int(os.getenv('EMBEDDING_CONCURRENCY', '4'))
+EMBEDDING_MAX_RETRIES = int(os.getenv('EMBEDDING_MAX_RETRIES', '3'))
+EMBEDDING_RETRY_BASE_DELAY = float(os.getenv('EMBEDDING_RETRY_BASE_DELAY', '1.0'))  # seconds
+
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
@@ -3,9 +3,11 @@ URL configuration for backend project.
 """
 from django.contrib import admin
 from django.urls import path, include
+from assistant import views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', views.metrics, name='metrics'),  # GET /metrics (Prometheus)
     path('api/', include('assistant.urls')),
     path('', include('assistant.urls')),
 ]
@@ -1,5 +1,10 @@
 """
 Quick script to check if pgvector extension is available in PostgreSQL
+and which vector search backend the app will use.
+
+Usage:
+    python check_pgvector.py           # report status
+    python check_pgvector.py --enable  # create the vector column/indexes and backfill it
 """
 import os
 import sys
@@ -10,7 +15,9 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 django.setup()
 
+from django.conf import settings
 from django.db import connection
+from assistant.services import pgvector_search
 
 try:
     with connection.cursor() as cursor:
@@ -39,11 +46,28 @@ try:
                 print("[OK] pgvector extension is INSTALLED in the database")
             else:
                 print("[WARNING] pgvector extension is available but NOT installed")
-                print("  You can install it by running: CREATE EXTENSION vector;")
+                print("  You can install it by running: python check_pgvector.py --enable")
         else:
             print("[ERROR] pgvector extension is NOT AVAILABLE")
             print("  You need to install pgvector on your PostgreSQL server first.")
             print("  See PGVECTOR_SETUP.md for instructions.")
+    
+    if available and '--enable' in sys.argv:
+        print("Creating vector column and HNSW indexes...")
+        pgvector_search.create_vector_column()
+        print("Backfilling vector column from stored embeddings...")
+        pgvector_search.backfill_vectors()
+        print("[OK] pgvector search is ready")
+    
+    # Check which search backend will be used
+    column_ready = pgvector_search.is_available()
+    if column_ready:
+        print(f"[OK] {pgvector_search.VECTOR_COLUMN} column exists; the 'pgvector' search backend is available")
+    elif available:
+        print(f"[WARNING] {pgvector_search.VECTOR_COLUMN} column is missing; run: python check_pgvector.py --enable")
+    
+    active = 'pgvector' if settings.VECTOR_SEARCH_BACKEND == 'pgvector' and column_ready else 'numpy'
+    print(f"VECTOR_SEARCH_BACKEND={settings.VECTOR_SEARCH_BACKEND!r} -> using the '{active}' backend")
             
 except Exception as e:
     print(f"Error checking pgvector: {e}")